@@ -0,0 +1,40 @@
+"""
+Compare the scalar and lane-parallel rust batch kernels on one core.
+
+Prints models per second per core for a batch of identical indices
+and for a batch of indices spread over 0 <= n <= 4.
+"""
+from time import perf_counter
+import numpy as np
+
+from polysolver import solve_batch
+
+N_MODELS = 256
+X_INIT = 1e-10
+STEP = 1e-3
+MAX_ITER = 100000
+REPEAT = 3
+
+BATCHES = {
+    'uniform-n': np.full(N_MODELS, 1.5),
+    'mixed-n': np.linspace(0, 4, N_MODELS),
+}
+
+
+def models_per_second(ns, lanes):
+    """
+    Time the best of ``REPEAT`` batch solves on a single thread.
+    """
+    best = np.inf
+    for _ in range(REPEAT):
+        start = perf_counter()
+        solve_batch(X_INIT, ns, STEP, MAX_ITER, impl='rust', n_threads=1, analytic=False, lanes=lanes)
+        best = min(best, perf_counter() - start)
+    return len(ns)/best
+
+
+if __name__ in '__main__':
+    for name, ns in BATCHES.items():
+        scalar = models_per_second(ns, lanes=False)
+        lanes = models_per_second(ns, lanes=True)
+        print(f'{name:>10}: scalar {scalar:8.1f} models/s, lanes {lanes:8.1f} models/s, speedup {lanes/scalar:.2f}')
@@ -0,0 +1,216 @@
+"""
+Peak memory of long solves and of the derived properties of a Star.
+
+Every measurement runs in a fresh process, which reports the peak of
+the allocations traced by ``tracemalloc`` (Python objects and numpy
+buffers) and the growth of its peak resident set size, which also sees
+the allocations of the rust extension. Each case is run for several
+``max_iter`` and the cost per step is the slope between the smallest
+and the largest, so fixed overheads do not count.
+
+Run with ``--check`` to fail when a case needs more bytes per step than
+its threshold in ``THRESHOLDS``, or has no threshold, and with
+``--save`` to store the measured values, with ``SLACK`` of headroom, as
+the new thresholds. The committed thresholds cover the python engine
+only, so ``--check`` fails for rust until its thresholds are saved with
+the extension built.
+The peak RSS of the properties can only be separated from that of the
+solve before them on Linux.
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import sys
+import tracemalloc
+from pathlib import Path
+from time import perf_counter
+import numpy as np
+
+N = 4.
+X_INIT = 1e-10
+# The profiles end before the surface, so every run takes max_iter steps.
+X_END = 14.
+MAX_ITERS = (10**4, 10**5, 10**6)
+CASES = ('solve', 'xi1', 'theta_prime', 'rho_c_over_rho', 'dense')
+
+THRESHOLDS = Path(__file__).with_name('memory_thresholds.json')
+SLACK = 1.25
+# Thresholds are never below one float per step.
+FLOOR = 8.
+
+
+def current_rss()->int:
+    """
+    The resident set size of this process in bytes.
+    """
+    with open('/proc/self/statm', encoding='utf-8') as f:
+        return int(f.read().split()[1])*resource.getpagesize()
+
+
+def reset_peak_rss()->bool:
+    """
+    Reset the peak resident set size, which only Linux allows.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w', encoding='utf-8') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss()->int:
+    """
+    The peak resident set size of this process in bytes.
+    """
+    try:
+        with open('/proc/self/status', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])*1024
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss*scale
+
+
+def measure(case:str,impl:str,max_iter:int)->dict:
+    """
+    Measure one case in the current process.
+    """
+    from polysolver import solve, Star
+    h = (X_END - X_INIT)/max_iter
+    def run():
+        return solve(X_INIT,N,h,max_iter,impl=impl,analytic=False)
+    if case != 'solve':
+        star = Star(*run(),N)
+        def run():
+            return getattr(star,case)
+    if not reset_peak_rss() and case != 'solve':
+        raise RuntimeError('the peak RSS cannot be reset on this platform')
+    rss = current_rss()
+    tracemalloc.start()
+    start = perf_counter()
+    run()
+    elapsed = perf_counter() - start
+    _, traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'traced': traced, 'rss': max(peak_rss() - rss,0), 'time': elapsed}
+
+
+def measure_fresh(case:str,impl:str,max_iter:int)->dict:
+    """
+    Measure one case in a new process, so its peak RSS is its own.
+    """
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1) as pool:
+        return pool.apply(measure,(case,impl,max_iter))
+
+
+def run(impls,cases,max_iters)->dict:
+    """
+    Measure every case for every engine and size.
+
+    Returns
+    -------
+    dict
+        The measurements, and the traced and RSS bytes per step, keyed
+        by ``'impl/case'``.
+    """
+    results = {}
+    for impl in impls:
+        for case in cases:
+            sizes = {m: measure_fresh(case,impl,m) for m in max_iters}
+            small, large = min(max_iters), max(max_iters)
+            steps = large - small
+            results[f'{impl}/{case}'] = {
+                'sizes': sizes,
+                'traced_per_step': (sizes[large]['traced'] - sizes[small]['traced'])/steps,
+                'rss_per_step': (sizes[large]['rss'] - sizes[small]['rss'])/steps,
+            }
+    return results
+
+
+def table(results)->str:
+    """
+    Format the results as a text table.
+    """
+    lines = [f'{"case":<28} {"max_iter":>9} {"traced/MB":>10} {"RSS/MB":>9} {"time/s":>8}']
+    for key, res in results.items():
+        for max_iter, size in res['sizes'].items():
+            lines.append(
+                f'{key:<28} {max_iter:>9d} {size["traced"]/2**20:>10.2f} '
+                f'{size["rss"]/2**20:>9.2f} {size["time"]:>8.3f}'
+            )
+        lines.append(
+            f'{"":<28} {"per step":>9} {res["traced_per_step"]:>9.1f}B '
+            f'{res["rss_per_step"]:>8.1f}B'
+        )
+    return '\n'.join(lines)
+
+
+def check(results,thresholds)->list:
+    """
+    Compare the bytes per step with the thresholds.
+
+    Returns
+    -------
+    list of str
+        A description of every case over its threshold or without one.
+    """
+    problems = []
+    for key, res in results.items():
+        if key not in thresholds:
+            problems.append(f'{key}: no threshold, run with --save')
+            continue
+        for measure_ in ('traced_per_step', 'rss_per_step'):
+            limit = thresholds[key][measure_]
+            if res[measure_] > limit:
+                problems.append(f'{key}: {measure_} {res[measure_]:.1f} > {limit:.1f} bytes')
+    return problems
+
+
+def main(argv=None):
+    """
+    Run the benchmark from the command line.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--impl', nargs='+', default=['rust', 'python'])
+    parser.add_argument('--cases', nargs='+', default=list(CASES), choices=CASES)
+    parser.add_argument('--max-iter', nargs='+', type=int, default=list(MAX_ITERS))
+    parser.add_argument('--check', action='store_true', help='Fail on cases over their threshold.')
+    parser.add_argument('--save', action='store_true', help='Store the measurements as thresholds.')
+    parser.add_argument('--thresholds', type=Path, default=THRESHOLDS)
+    args = parser.parse_args(argv)
+    if len(set(args.max_iter)) < 2:
+        parser.error('--max-iter needs at least two sizes')
+    if 'rust' in args.impl:
+        try:
+            # pylint: disable-next=no-name-in-module,unused-import
+            from polysolver import polysolver_rust
+        except ImportError:
+            parser.error('the rust extension is not built; build it or pass --impl python')
+    results = run(args.impl,args.cases,args.max_iter)
+    print(table(results))
+    thresholds = {}
+    if args.thresholds.exists():
+        thresholds = json.loads(args.thresholds.read_text(encoding='utf-8'))
+    if args.save:
+        for key, res in results.items():
+            thresholds[key] = {
+                measure_: float(np.ceil(max(SLACK*res[measure_],FLOOR)))
+                for measure_ in ('traced_per_step', 'rss_per_step')
+            }
+        args.thresholds.write_text(json.dumps(thresholds,indent=1,sort_keys=True),encoding='utf-8')
+    if args.check:
+        problems = check(results,thresholds)
+        for problem in problems:
+            print(problem, file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ in '__main__':
+    sys.exit(main())
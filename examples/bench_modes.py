@@ -0,0 +1,57 @@
+"""
+Time the radial pulsation eigensolvers as the grid is refined.
+
+Prints, for an n=3 polytrope, the time to find the lowest ``K`` modes
+with the banded and sparse solvers, a dense eigensolver on the same
+matrix for comparison, and the fundamental frequency, which converges
+at second order in the grid spacing.
+"""
+from time import perf_counter
+import numpy as np
+from scipy.linalg import eigh
+
+from polysolver import Star, StarEnsemble
+from polysolver.modes import radial_modes, radial_modes_ensemble, pulsation_matrix
+
+N = 3
+K = 3
+GRIDS = (250, 500, 1000, 2000, 4000, 8000, 16000)
+DENSE_MAX = 2000
+REPEAT = 3
+
+
+def best_time(fun):
+    """
+    The best of ``REPEAT`` calls.
+    """
+    best = np.inf
+    for _ in range(REPEAT):
+        start = perf_counter()
+        fun()
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def dense_modes(star, n_grid):
+    """
+    The same discretisation solved as a full matrix.
+    """
+    xi = np.linspace(0, star.dense.xi1, n_grid+1)
+    theta = star.dense(np.clip(xi, star.x[0], xi[-1]))
+    theta[-1] = 0
+    diag, off, _ = pulsation_matrix(xi, theta, star.n, 5/3)
+    return eigh(np.diag(diag) + np.diag(off, 1) + np.diag(off, -1), eigvals_only=True, subset_by_index=(0, K-1))
+
+
+if __name__ in '__main__':
+    star = Star.from_soln(1e-10, N, 1e-3, max_iter=100000)
+    print(f'{"grid":>6} {"banded/ms":>10} {"arpack/ms":>10} {"dense/ms":>10} {"omega2_0":>12}')
+    for n_grid in GRIDS:
+        banded = best_time(lambda: radial_modes(star, K, n_grid=n_grid))
+        arpack = best_time(lambda: radial_modes(star, K, n_grid=n_grid, method='arpack'))
+        dense = best_time(lambda: dense_modes(star, n_grid)) if n_grid <= DENSE_MAX else np.nan
+        omega2 = radial_modes(star, K, n_grid=n_grid)[0]
+        print(f'{n_grid:>6} {banded*1e3:>10.2f} {arpack*1e3:>10.2f} {dense*1e3:>10.2f} {omega2:>12.8f}')
+    ensemble = StarEnsemble.from_soln(1e-10, np.linspace(0, 4.5, 64), 1e-3, max_iter=100000)
+    elapsed = best_time(lambda: radial_modes_ensemble(ensemble, K, n_grid=1000))
+    print(f'ensemble of {len(ensemble)}: {len(ensemble)/elapsed:.1f} models/s')
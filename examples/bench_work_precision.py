@@ -0,0 +1,266 @@
+"""
+Work-precision diagrams for every engine and method.
+
+For each configuration (engine, method and step or tolerance) the
+surface quantities of a set of polytropes are computed and compared
+with reference values, and the cost is measured both as wall time and
+as evaluations of the right-hand side. The fixed-step engines are swept
+over ``h``; the adaptive scipy methods over ``rtol``.
+
+The references are the values tabulated in ``src/scripts/tab7.py``
+where they are exact (:math:`n=0` and :math:`n=1`). The other tabulated
+values have only five significant figures, so the errors are measured
+against ``surrogate.reference`` and the tabulated values are only
+checked against it. :math:`\\rho_c/\\langle\\rho\\rangle` is computed
+as :math:`\\xi_1/3|\\theta'(\\xi_1)|` from the surface values of each
+engine, which is exact, rather than by integrating the mass on the
+output grid, whose quadrature error would hide the integrator's.
+
+Run with ``--save`` to add the results to the baseline and with
+``--check`` to compare with it: the command fails if any configuration
+got less accurate, or needs more evaluations, or (with ``--time``)
+got more than ``TIME_SLACK`` times slower, or has no baseline. The
+committed baseline covers the python and scipy engines; save one for
+rust with the extension built.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from time import perf_counter
+import numpy as np
+
+from polysolver import solve, Star
+from polysolver import derivatives
+from polysolver.polysolver import solve_scipy
+from polysolver.surrogate import reference
+
+NS = (0., 1., 1.5, 2., 3., 4.)
+X_INIT = 1e-10
+MAX_ITER = 10**7
+REPEAT = 3
+
+# The values of tab7.py; only n=0 and n=1 are exact.
+TABULATED = {
+    0.0: {'xi1': np.sqrt(6), 'dtheta': np.sqrt(6)/3, 'rho': 1},
+    1.0: {'xi1': np.pi, 'dtheta': 1/np.pi, 'rho': np.pi**2/3},
+    1.5: {'xi1': 3.6538, 'dtheta': 0.20330, 'rho': 5.9907},
+    2.0: {'xi1': 4.3529, 'dtheta': 0.12725, 'rho': 11.402},
+    3.0: {'xi1': 6.8969, 'dtheta': 0.04243, 'rho': 54.183},
+    4.0: {'xi1': 14.972, 'dtheta': 0.00802, 'rho': 622.41},
+}
+EXACT = (0., 1.)
+# The tabulated values are rounded to at most five figures.
+TABULATED_RTOL = 5e-4
+QUANTITIES = ('xi1', 'dtheta', 'rho')
+
+CONFIGS = {
+    ('rust', 'RK4'): {'h': np.logspace(-4, -1, 7)},
+    ('python', 'RK4'): {'h': np.logspace(-3, -1, 5)},
+    ('scipy', 'DOP853'): {'rtol': np.logspace(-13, -5, 5)},
+    ('scipy', 'LSODA'): {'rtol': np.logspace(-12, -4, 5)},
+    ('scipy', 'Radau'): {'rtol': np.logspace(-12, -4, 5)},
+}
+# The output grid of the adaptive methods, on which the mass is integrated.
+SCIPY_GRID = 1e-3
+
+BASELINE = Path(__file__).with_name('work_precision_baseline.json')
+ERROR_SLACK = 1.5
+TIME_SLACK = 2.
+
+
+def references():
+    """
+    The reference surface quantities of every index in ``NS``.
+    """
+    refs = {}
+    for n in NS:
+        if n in EXACT:
+            refs[n] = dict(TABULATED[n])
+            continue
+        sol = reference(n, impl='python')
+        xi1 = float(sol.x[-1])
+        dtheta = -float(sol.z[-1])
+        refs[n] = {'xi1': xi1, 'dtheta': dtheta, 'rho': xi1/(3*dtheta)}
+        for key in QUANTITIES:
+            tab = TABULATED[n][key]
+            if abs(refs[n][key] - tab) > TABULATED_RTOL*tab:
+                raise RuntimeError(f'reference {key} for n={n} disagrees with tab7.py')
+    return refs
+
+
+class _Counter:
+    """
+    Count evaluations of the vectorised right-hand side, one per state.
+    """
+    def __init__(self):
+        self.count = 0
+        self._get = derivatives.get_zprime_vectorized
+    def __enter__(self):
+        def get(n):
+            zprime = self._get(n)
+            def counted(x, y, z):
+                self.count += np.shape(y)[-1] if np.ndim(y) else 1
+                return zprime(x, y, z)
+            return counted
+        derivatives.get_zprime_vectorized = get
+        return self
+    def __exit__(self, *exc):
+        derivatives.get_zprime_vectorized = self._get
+
+
+def run_one(engine, method, setting, n):
+    """
+    Solve one model, returning the profile and the number of evaluations.
+    """
+    if engine == 'scipy':
+        with _Counter() as counter:
+            x, y, z = solve_scipy(X_INIT, n, SCIPY_GRID, MAX_ITER, method, rtol=setting)
+        return (x, y, z), counter.count
+    x, y, z = solve(X_INIT, n, setting, MAX_ITER, impl=engine, analytic=False)
+    # Four stages per RK4 step.
+    return (x, y, z), 4*(len(x) - 1)
+
+
+def measure(engine, method, setting, refs):
+    """
+    The cost and the worst relative error over ``NS`` of one configuration.
+    """
+    elapsed = 0.
+    evaluations = 0
+    errors = dict.fromkeys(QUANTITIES, 0.)
+    for n in NS:
+        best = np.inf
+        for _ in range(REPEAT):
+            start = perf_counter()
+            profile, count = run_one(engine, method, setting, n)
+            best = min(best, perf_counter() - start)
+        elapsed += best
+        evaluations += count
+        star = Star(*profile, n)
+        values = {'xi1': star.xi1, 'dtheta': star.theta_prime, 'rho': star.xi1/(3*star.theta_prime)}
+        for key in QUANTITIES:
+            err = abs(float(values[key]) - refs[n][key])/refs[n][key]
+            errors[key] = max(errors[key], err)
+    return {'time': elapsed, 'evaluations': evaluations, **errors}
+
+
+def run(engines, refs):
+    """
+    Measure every configuration of ``engines``.
+
+    Returns
+    -------
+    dict
+        The results keyed by ``'engine/method/setting'``.
+    """
+    results = {}
+    for (engine, method), sweep in CONFIGS.items():
+        if engine not in engines:
+            continue
+        (param, values), = sweep.items()
+        for value in values:
+            key = f'{engine}/{method}/{param}={value:.3g}'
+            results[key] = measure(engine, method, float(value), refs)
+    return results
+
+
+def table(results):
+    """
+    Format the results as a text table.
+    """
+    lines = [f'{"configuration":<28} {"time/ms":>10} {"RHS evals":>10} '
+             f'{"err xi1":>9} {"err dtheta":>10} {"err rho":>9}']
+    for key, res in results.items():
+        lines.append(
+            f'{key:<28} {res["time"]*1e3:>10.2f} {res["evaluations"]:>10d} '
+            f'{res["xi1"]:>9.2e} {res["dtheta"]:>10.2e} {res["rho"]:>9.2e}'
+        )
+    return '\n'.join(lines)
+
+
+def plot(results, path):
+    """
+    Plot error against wall time and against evaluations.
+    """
+    import matplotlib.pyplot as plt
+    fig, axes = plt.subplots(2, 3, figsize=(12, 7), sharey='col')
+    configs = sorted({key.rsplit('/', 1)[0] for key in results})
+    for config in configs:
+        rows = [res for key, res in results.items() if key.rsplit('/', 1)[0] == config]
+        for j, quantity in enumerate(QUANTITIES):
+            err = [res[quantity] for res in rows]
+            axes[0, j].plot([res['time'] for res in rows], err, 'o-', label=config)
+            axes[1, j].plot([res['evaluations'] for res in rows], err, 'o-', label=config)
+    for j, quantity in enumerate(QUANTITIES):
+        axes[0, j].set_title(f'relative error in {quantity}')
+        axes[1, j].set_xlabel('RHS evaluations')
+        axes[0, j].set_xlabel('time / s')
+        for ax in axes[:, j]:
+            ax.set_xscale('log')
+            ax.set_yscale('log')
+    axes[0, 0].legend(fontsize='small')
+    fig.tight_layout()
+    fig.savefig(path)
+
+
+def check(results, baseline, with_time):
+    """
+    Compare with a baseline.
+
+    Returns
+    -------
+    list of str
+        A description of every regression.
+    """
+    problems = []
+    for key, res in results.items():
+        if key not in baseline:
+            problems.append(f'{key}: no baseline, run with --save')
+            continue
+        old = baseline[key]
+        for quantity in QUANTITIES:
+            # Errors at round-off level are noise.
+            if res[quantity] > ERROR_SLACK*old[quantity] + 1e-14:
+                problems.append(f'{key}: {quantity} error {old[quantity]:.2e} -> {res[quantity]:.2e}')
+        if res['evaluations'] > old['evaluations']:
+            problems.append(f'{key}: evaluations {old["evaluations"]} -> {res["evaluations"]}')
+        if with_time and res['time'] > TIME_SLACK*old['time']:
+            problems.append(f'{key}: time {old["time"]*1e3:.2f} ms -> {res["time"]*1e3:.2f} ms')
+    return problems
+
+
+def main(argv=None):
+    """
+    Run the benchmark from the command line.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--engines', nargs='+', default=['rust', 'python', 'scipy'])
+    parser.add_argument('--plot', help='Save the work-precision diagram here.')
+    parser.add_argument('--save', action='store_true', help='Store the results as the baseline.')
+    parser.add_argument('--check', action='store_true', help='Fail on regressions from the baseline.')
+    parser.add_argument('--time', action='store_true', help='Also check the wall time.')
+    parser.add_argument('--baseline', type=Path, default=BASELINE)
+    args = parser.parse_args(argv)
+    if args.check and not args.save and not args.baseline.exists():
+        parser.error(f'{args.baseline} does not exist; create it with --save')
+    results = run(args.engines, references())
+    print(table(results))
+    if args.plot:
+        plot(results, args.plot)
+    baseline = {}
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+    if args.save:
+        baseline.update(results)
+        args.baseline.write_text(json.dumps(baseline, indent=1, sort_keys=True), encoding='utf-8')
+    if args.check:
+        problems = check(results, baseline, args.time)
+        for problem in problems:
+            print(problem, file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ in '__main__':
+    sys.exit(main())
@@ -3,5 +3,8 @@ Polysolver
 """
 # from . import polysolver_rust
 
-from .polysolver import solve
-from .analysis import Star
+from .polysolver import solve, solve_batch, solve_equation, solve_batch_equation, solve_from, solve_composite
+from .analysis import Star, CompositeStar
+from .dense import DenseSolution, CompositeDense
+from .ensemble import StarEnsemble
+from .fit import fit_n
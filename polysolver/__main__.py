@@ -0,0 +1,6 @@
+"""
+Run the command line interface with ``python -m polysolver``.
+"""
+from polysolver.server import main
+
+main()
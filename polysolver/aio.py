@@ -0,0 +1,289 @@
+"""
+Asyncio interface to the solvers.
+
+The coroutines here run the solve in an executor so the event loop is
+never blocked. The rust engine releases the GIL, so it runs on a thread
+pool; the python engine holds the GIL and runs on a process pool. Both
+pools have a bounded number of workers, see ``configure``.
+
+Identical requests made while one is already running share a single
+computation. Each coalesced caller receives its own copy of the result.
+Requests with arguments that cannot be hashed, such as ``out`` buffers,
+are never coalesced. Once every caller of a computation has been
+cancelled or has timed out, the solve itself is told to stop through the
+``cancel`` hook of ``polysolver.solve``.
+
+Examples
+--------
+>>> x, y, z = await aio.solve(1e-10, 1.5, 1e-3, max_iter=100000, timeout=5)
+>>> star = await aio.Star.from_soln(1e-10, 1.5, 1e-3, max_iter=100000)
+"""
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+import copy
+from functools import partial
+import multiprocessing
+import os
+import threading
+
+from polysolver import polysolver
+from polysolver import analysis
+
+_EXECUTORS = {}
+_MAX_WORKERS = {'thread': None, 'process': None}
+_INFLIGHT = {}
+_MANAGER = []
+# Arguments with which polysolver.solve cannot take a cancel hook.
+_NOT_CANCELLABLE = ('integrals', 'out')
+
+
+def configure(max_threads:int=None, max_processes:int=None):
+    """
+    Set the number of workers used by the executors.
+
+    Executors that already exist are shut down and recreated on next use.
+
+    Parameters
+    ----------
+    max_threads : int, optional
+        The number of threads used for the rust engine.
+        The default is the number of CPUs.
+    max_processes : int, optional
+        The number of processes used for the python engine.
+        The default is the number of CPUs.
+    """
+    _MAX_WORKERS['thread'] = max_threads
+    _MAX_WORKERS['process'] = max_processes
+    shutdown()
+
+
+def shutdown():
+    """
+    Shut down the executors without waiting for running work.
+    """
+    for executor in _EXECUTORS.values():
+        executor.shutdown(wait=False)
+    _EXECUTORS.clear()
+    for manager in _MANAGER:
+        manager.shutdown()
+    _MANAGER.clear()
+
+
+def _get_executor(impl:str) -> Executor:
+    """
+    Get the executor suited to an implementation.
+    """
+    kind = 'process' if impl == 'python' else 'thread'
+    if kind not in _EXECUTORS:
+        workers = _MAX_WORKERS[kind] or os.cpu_count() or 1
+        if kind == 'process':
+            _EXECUTORS[kind] = ProcessPoolExecutor(max_workers=workers)
+        else:
+            _EXECUTORS[kind] = ThreadPoolExecutor(
+                max_workers=workers,
+                thread_name_prefix='polysolver'
+            )
+    return _EXECUTORS[kind]
+
+
+def _new_event(impl:str):
+    """
+    Get an event that the executor of ``impl`` can see being set.
+    """
+    if impl != 'python':
+        return threading.Event()
+    # The python engine runs in another process.
+    if not _MANAGER:
+        _MANAGER.append(multiprocessing.Manager())
+    return _MANAGER[0].Event()
+
+
+class _AnyEvent:
+    """
+    Set when either of two events is set.
+    """
+    def __init__(self, first, second):
+        self.first = first
+        self.second = second
+    def is_set(self) -> bool:
+        return self.first.is_set() or self.second.is_set()
+
+
+class _Shared:
+    """
+    A computation awaited by one or more callers.
+    """
+    def __init__(self, future:asyncio.Future, cancel=None):
+        self.future = future
+        self.cancel = cancel
+        self.waiters = 0
+        self.callers = 0
+
+
+def _with_cancel(func, impl:str, kwargs:dict):
+    """
+    Add a cancel hook to a call of ``func`` if it can take one.
+
+    Returns
+    -------
+    func : Callable
+        The call to run.
+    event : object
+        The event that stops it, or None.
+    """
+    if impl not in ('rust', 'python') or any(
+        kwargs.get(name) is not None for name in _NOT_CANCELLABLE
+    ):
+        return partial(func, **kwargs), None
+    event = _new_event(impl)
+    user = kwargs.get('cancel')
+    cancel = event if user is None else _AnyEvent(event, user)
+    return partial(func, **{**kwargs, 'cancel': cancel}), event
+
+
+async def _coalesced(key:tuple, impl:str, func, timeout:float=None, cancel=None):
+    """
+    Run ``func`` in an executor, sharing it with identical requests.
+
+    The computation is cancelled once every caller awaiting it has been
+    cancelled or has timed out. If it is already running, ``cancel`` is
+    set so that the solve stops at its next check. A ``key`` of None
+    never shares.
+    """
+    loop = asyncio.get_running_loop()
+    entry = None if key is None else _INFLIGHT.get((loop, key))
+    if entry is None:
+        entry = _Shared(loop.run_in_executor(_get_executor(impl), func), cancel)
+        if key is not None:
+            key = (loop, key)
+            _INFLIGHT[key] = entry
+            def _forget(_, entry=entry):
+                if _INFLIGHT.get(key) is entry:
+                    del _INFLIGHT[key]
+            entry.future.add_done_callback(_forget)
+    entry.waiters += 1
+    entry.callers += 1
+    try:
+        result = await asyncio.wait_for(asyncio.shield(entry.future), timeout)
+    finally:
+        entry.waiters -= 1
+        if entry.waiters == 0 and not entry.future.done():
+            entry.future.cancel()
+            if entry.cancel is not None:
+                entry.cancel.set()
+    # Callers may change what they get, e.g. with Star.extend.
+    return copy.deepcopy(result) if entry.callers > 1 else result
+
+
+def _freeze(value):
+    """
+    Make an argument hashable so it can be part of a request key.
+    """
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+
+def _request_key(kind:str, x_init, n, h, max_iter:int, impl:str, kwargs:dict):
+    """
+    The key identical requests share, or None if an argument cannot be
+    hashed.
+    """
+    key = (kind, _freeze(x_init), _freeze(n), _freeze(h), int(max_iter), impl) + tuple(
+        (k, _freeze(v)) for k, v in sorted(kwargs.items())
+    )
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+async def solve(
+    x_init:float,
+    n:float,
+    h:float,
+    max_iter:int=1000,
+    impl:str='rust',
+    timeout:float=None,
+    **kwargs
+):
+    """
+    Solve the Lane-Emden equation without blocking the event loop.
+
+    Parameters
+    ----------
+    x_init : float
+        The initial x value. Choose something small.
+    n : float
+        The index of the polytrope.
+    h : float
+        The step size. This should be less than the pressure scale height.
+    max_iter : int, optional
+        The maximum number of iterations. The default is 1000.
+    impl : str, optional
+        The implementation to use. The default is 'rust'.
+    timeout : float, optional
+        The time in seconds to wait before raising ``asyncio.TimeoutError``.
+        The default is to wait forever.
+    **kwargs
+        Passed to ``polysolver.solve``.
+
+    Returns
+    -------
+    tuple
+        The result of ``polysolver.solve``.
+    """
+    key = _request_key('solve', x_init, n, h, max_iter, impl, kwargs)
+    func, cancel = _with_cancel(partial(polysolver.solve, x_init, n, h, max_iter, impl), impl, kwargs)
+    return await _coalesced(key, impl, func, timeout, cancel)
+
+
+class Star:
+    """
+    Coroutine constructors for ``polysolver.Star``.
+    """
+    @staticmethod
+    async def from_soln(
+        x_init:float,
+        n:float,
+        h:float,
+        max_iter:int=1000,
+        impl:str='rust',
+        timeout:float=None,
+        **kwargs
+    ) -> analysis.Star:
+        """
+        Create a star from a solution to the Lane-Emden equation
+        without blocking the event loop.
+
+        Parameters
+        ----------
+        x_init : float
+            The initial x value. Choose something small.
+        n : float
+            The index of the polytrope.
+        h : float
+            The step size. This should be less than the pressure scale height.
+        max_iter : int, optional
+            The maximum number of iterations. The default is 1000.
+        impl : str, optional
+            The implementation to use. The default is 'rust'.
+        timeout : float, optional
+            The time in seconds to wait before raising
+            ``asyncio.TimeoutError``. The default is to wait forever.
+        **kwargs
+            Passed to ``polysolver.Star.from_soln``.
+
+        Returns
+        -------
+        polysolver.Star
+            The star.
+        """
+        key = _request_key('star', x_init, n, h, max_iter, impl, kwargs)
+        func, cancel = _with_cancel(
+            partial(analysis.Star.from_soln, x_init, n, h, max_iter, impl), impl, kwargs
+        )
+        return await _coalesced(key, impl, func, timeout, cancel)
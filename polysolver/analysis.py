@@ -29,6 +29,11 @@ import numpy as np
 from scipy.interpolate import interp1d, CubicSpline
 
 from polysolver import solve
+from polysolver.polysolver import analytic_yz, solve_from, get_status, envelope_yz, solve_composite
+from polysolver.dense import DenseSolution, CompositeDense
+from polysolver import storage
+
+SURFACE = ('xi1', 'theta_prime', 'rho_c_over_rho')
 
 def get_rho_norm(y:np.ndarray,n:float)->np.ndarray:
     """
@@ -50,7 +55,41 @@ def get_rho_norm(y:np.ndarray,n:float)->np.ndarray:
     rho_over_rho_c = y**n
     return rho_over_rho_c
 
-def norm_mass(x:np.ndarray,y:np.ndarray,n:float)->float:
+class Workspace:
+    """
+    Scratch arrays reused by the analysis functions, so that a sweep
+    over many models does not allocate a new set of arrays for each one.
+    
+    The arrays grow to the longest profile seen and are never shrunk.
+    
+    Examples
+    --------
+    >>> work = Workspace()
+    >>> for n in ns:
+    ...     length = solve(x_init, n, h, max_iter, out=(x, y, z))
+    ...     rho = central_over_mean_density(x[:length], y[:length], n, workspace=work)
+    """
+    def __init__(self,size:int=0):
+        self._buffers = {}
+        self.size = 0
+        self.reserve(size)
+    def reserve(self,size:int):
+        """
+        Make sure every scratch array holds at least ``size`` values.
+        """
+        if size > self.size:
+            self.size = size
+            self._buffers.clear()
+    def get(self,name:str,size:int)->np.ndarray:
+        """
+        Get a scratch array of length ``size``.
+        """
+        self.reserve(size)
+        if name not in self._buffers:
+            self._buffers[name] = np.empty(self.size)
+        return self._buffers[name][:size]
+
+def norm_mass(x:np.ndarray,y:np.ndarray,n:float,workspace:Workspace=None)->float:
     """
     Get the mass divided by the central density.
     
@@ -63,6 +102,8 @@ def norm_mass(x:np.ndarray,y:np.ndarray,n:float)->float:
         and :math:`\\rho(r) = \\rho_c \\theta^n(r)`
     n : float
         The index of the polytrope.
+    workspace : Workspace, optional
+        Scratch arrays to use instead of allocating new ones.
     
     Returns
     -------
@@ -70,6 +111,8 @@ def norm_mass(x:np.ndarray,y:np.ndarray,n:float)->float:
         The mass divided by the central density.
     """
     xi1 = xi_1(x,y)
+    if workspace is not None:
+        return _norm_mass_into(x,y,n,xi1,workspace)
     x = np.append(x[:-1],xi1)
     y = np.append(y[:-1],0)
     r = x
@@ -78,6 +121,26 @@ def norm_mass(x:np.ndarray,y:np.ndarray,n:float)->float:
     dm_over_rho_c = dv*rho_over_rho_c
     mass_over_rho_c = np.trapz(dm_over_rho_c,r)
     return mass_over_rho_c
+def _norm_mass_into(x,y,n,xi1,workspace:Workspace)->float:
+    """
+    ``norm_mass`` using the scratch arrays of ``workspace``.
+    """
+    size = len(x)
+    r = workspace.get('r',size)
+    dm = workspace.get('dm',size)
+    dr = workspace.get('dr',size-1)
+    r[:] = x
+    r[-1] = xi1
+    dm[:] = y
+    dm[-1] = 0
+    np.power(dm,n,out=dm)
+    dm *= r
+    dm *= r
+    np.subtract(r[1:],r[:-1],out=dr)
+    seg = workspace.get('seg',size-1)
+    np.add(dm[1:],dm[:-1],out=seg)
+    seg *= dr
+    return 4*np.pi*0.5*float(seg.sum())
 def volume(x:np.ndarray,y:np.ndarray)->float:
     """
     Get the volume in units of x.
@@ -130,7 +193,7 @@ def theta_prime_xi1(z,y):
     interp = CubicSpline(-y[-3:],z[-3:])
     return -interp(0)
 
-def central_over_mean_density(x,y,n):
+def central_over_mean_density(x,y,n,workspace:Workspace=None):
     """
     Get the central density as a fraction of the mean density.
     
@@ -143,6 +206,8 @@ def central_over_mean_density(x,y,n):
         and :math:`\\rho(r) = \\rho_c \\theta^n(r)`
     n : float
         The index of the polytrope.
+    workspace : Workspace, optional
+        Scratch arrays to use instead of allocating new ones.
     
     Returns
     -------
@@ -156,10 +221,40 @@ def central_over_mean_density(x,y,n):
         \\rho = \\rho_c y^n
         
     """
-    mass_over_rhoc = norm_mass(x,y,n)
+    mass_over_rhoc = norm_mass(x,y,n,workspace)
     vol = volume(x,y)
     return vol/mass_over_rhoc
 
+def central_pressure(
+    n:float,
+    theta_prime:float,
+    mass:float,
+    radius:float
+):
+    """
+    Get the central pressure in
+    dyne cm-2
+    
+    Parameters
+    ----------
+    n : float
+        The index of the polytrope.
+    theta_prime : float
+        :math:`-\\frac{d\\theta_n}{d\\xi}` at the surface.
+    mass : float
+        The mass of the star in solar masses.
+    radius : float
+        The radius of the star in solar radii.
+    
+    Returns
+    -------
+    float
+        The central pressure in dyne cm-2.
+    """
+    num = 8.952e14
+    den = (n+1)*theta_prime**2
+    return num/den * mass**2 * radius**-4
+
 class Star:
     """
     A polytropic star
@@ -175,18 +270,28 @@ class Star:
         The z values. Recall that :math:`z=\\frac{d\\theta_n}{d\\xi}`
     n : float
         The index of the polytrope.
+    integrals : dict, optional
+        Structural integrals accumulated by the solver.
+        See ``polysolver.integrals``.
+    h : float, optional
+        The step size of the integration, used by ``extend``.
     """
     def __init__(
         self,
         x:np.ndarray,
         y:np.ndarray,
         z:np.ndarray,
-        n:float
+        n:float,
+        integrals:dict=None,
+        h:float=None
     ):
         self.x = x
         self.y = y
         self.z = z
         self.n = n
+        self.integrals = {} if integrals is None else integrals
+        self.h = h
+        self._surface = {}
     @classmethod
     def from_soln(
         cls,
@@ -194,11 +299,21 @@ class Star:
         n:float,
         h:float,
         max_iter:int=1000,
-        impl:str='rust'
+        impl:str='rust',
+        integrals=None,
+        keep_profile:bool=True,
+        analytic:bool=True,
+        stop_at_xi:float=None,
+        stop_at_theta:float=None,
+        stop_at_mass_fraction:float=None,
+        cancel=None
     ):
         """
         Create a star from a solution to the Lane-Emden equation.
         
+        For :math:`n=0`, 1 and 5 the closed-form solution is evaluated
+        on the integration grid unless ``analytic`` is False.
+        
         Parameters
         ----------
         x_init : float
@@ -211,14 +326,39 @@ class Star:
             The maximum number of iterations. The default is 1000.
         impl : str, optional
             The implementation to use. The default is 'rust'.
+        integrals : sequence of str, optional
+            Structural integrals to accumulate during the integration.
+            See ``polysolver.integrals``. The default is None.
+        keep_profile : bool, optional
+            If False, only the last three points of the profile are kept.
+            Only used when ``integrals`` is given. The default is True.
+        analytic : bool, optional
+            Use the closed-form solution when one exists.
+            The default is True.
+        stop_at_xi, stop_at_theta, stop_at_mass_fraction : float, optional
+            Only integrate the inner part of the star, up to the first of
+            these events. See ``polysolver.polysolver.solve_until``.
+            The surface quantities are not defined for such a star.
+        cancel : object, optional
+            Stop early once ``cancel.is_set()`` is true, see
+            ``polysolver.solve``. Not used with ``integrals``.
         
         Returns
         -------
         Star
             The star.
         """
-        x,y,z = solve(x_init,n,h,max_iter,impl)
-        return cls(x,y,z,n)
+        if integrals is None:
+            x,y,z = solve(
+                x_init,n,h,max_iter,impl,analytic=analytic,
+                stop_at_xi=stop_at_xi,
+                stop_at_theta=stop_at_theta,
+                stop_at_mass_fraction=stop_at_mass_fraction,
+                cancel=cancel
+            )
+            return cls(x,y,z,n,h=h)
+        x,y,z,values = solve(x_init,n,h,max_iter,impl,integrals,keep_profile)
+        return cls(x,y,z,n,values,h=h)
     @classmethod
     def _zero(cls,x:np.ndarray):
         """
@@ -292,6 +432,32 @@ class Star:
         z = np.where(x==0,0,(np.cos(x)-np.sinc(x/np.pi))/x)
         return cls(x,y,z,1)
     @classmethod
+    def _five(cls,x:np.ndarray):
+        """
+        Analytic solution to the Lane-Emden equation
+        for :math:`n=5`.
+        
+        Parameters
+        ----------
+        x : np.ndarray
+            The x values. Recall that :math:`x=\\xi=\\frac{r}{r_n}`
+        
+        Notes
+        -----
+        This is the Schuster solution, which has infinite radius.
+        
+        .. math::
+            y = \\left(1 + \\frac{x^2}{3}\\right)^{-1/2}
+        
+        .. math::
+            z = -\\frac{x}{3}\\left(1 + \\frac{x^2}{3}\\right)^{-3/2}
+        """
+        xmin = 0
+        if np.any(x<xmin):
+            warnings.warn(f'Analytic solution only valid for x>{xmin:.2f}',RuntimeWarning)
+        y, z = analytic_yz(x,5)
+        return cls(x,y,z,5)
+    @classmethod
     def analytic(
         cls,
         x:np.ndarray,
@@ -316,36 +482,242 @@ class Star:
             return cls._zero(x)
         elif n==1:
             return cls._one(x)
+        elif n==5:
+            return cls._five(x)
         else:
             raise NotImplementedError(f'There is no analytic solution for n={n:d}')
     @property
+    def status(self)->str:
+        """
+        Why the integration ended: 'surface', 'unbounded' for
+        :math:`n \\geq 5`, which has no surface, or 'stopped'.
+        """
+        return get_status(self.y,self.n)
+    @property
+    def unbounded(self)->bool:
+        """
+        True if the solution never reaches :math:`\\theta=0`.
+        """
+        return self.status == 'unbounded'
+    def envelope(self,x:np.ndarray):
+        """
+        Continue an unbounded solution past the end of the integration.
+        
+        Parameters
+        ----------
+        x : np.ndarray
+            The x values, from one step before the last point, so that
+            ``UNBOUNDED_XI`` itself can be included.
+        
+        Returns
+        -------
+        Star
+            The outer envelope. See
+            ``polysolver.polysolver.envelope_yz``.
+        """
+        if not self.unbounded:
+            raise ValueError('Only unbounded solutions have an envelope')
+        step = self.x[-1] - self.x[-2]
+        y, z = envelope_yz(x,self.n,self.x[-1],self.y[-1],self.z[-1],x_tol=step)
+        return type(self)(np.asarray(x),y,z,self.n)
+    @property
+    def truncated(self)->bool:
+        """
+        True if the integration stopped at ``max_iter`` before the surface.
+        """
+        return bool(self.y[-1] > 0)
+    def extend(
+        self,
+        additional_iter:int,
+        impl:str='rust'
+    ):
+        """
+        Continue a truncated integration from its last point.
+        
+        The result is the same as a single run with the larger ``max_iter``.
+        
+        Parameters
+        ----------
+        additional_iter : int
+            The maximum number of additional iterations.
+        impl : str, optional
+            The implementation to use. The default is 'rust'.
+        
+        Returns
+        -------
+        Star
+            The extended star.
+        
+        Raises
+        ------
+        ValueError
+            If the star already reaches the surface, or if it has
+            accumulated integrals, which are not continued.
+        """
+        if not self.truncated:
+            raise ValueError('The integration already reached the surface')
+        if self.unbounded:
+            raise ValueError('The solution has no surface, see envelope')
+        if self.integrals:
+            raise ValueError('Stars with accumulated integrals cannot be extended')
+        h = self.h if self.h is not None else self.x[-1] - self.x[-2]
+        x,y,z = solve_from(self.x[-1],self.y[-1],self.z[-1],self.n,h,additional_iter,impl)
+        return type(self)(
+            np.concatenate([self.x,x[1:]]),
+            np.concatenate([self.y,y[1:]]),
+            np.concatenate([self.z,z[1:]]),
+            self.n,
+            h=h
+        )
+    @property
     def xi1(self)->float:
         """
         Get the value of :math:`\\xi` at the surface.
+        Infinite for unbounded solutions.
         """
+        if 'xi1' in self._surface:
+            return self._surface['xi1']
+        if self.unbounded:
+            return np.inf
         return xi_1(self.x,self.y)
     @property
     def theta_prime(self)->float:
         """
         Get :math:`-\\frac{d\\theta_n}{d\\xi}` at the surface.
+        Zero for unbounded solutions.
         """
+        if 'theta_prime' in self._surface:
+            return self._surface['theta_prime']
+        if self.unbounded:
+            return 0.
         return theta_prime_xi1(self.z,self.y)
     @property
     def rho_c_over_rho(self)->float:
         """
         Get the central density divided by the
         mean density.
+        
+        Uses the accumulated mass or mean density if available.
+        Infinite for unbounded solutions.
         """
+        if 'rho_c_over_rho' in self._surface:
+            return self._surface['rho_c_over_rho']
+        if self.unbounded:
+            return np.inf
+        if 'mean_density' in self.integrals:
+            return 1/self.integrals['mean_density']
+        if 'mass' in self.integrals:
+            return volume(self.x,self.y)/self.integrals['mass']
         return central_over_mean_density(self.x,self.y,self.n)
+    def to_bytes(self,dtype:str='<f8',x_encoding:str='auto')->bytes:
+        """
+        Serialise the star in the layout of ``polysolver.storage``.
+        
+        The surface quantities are computed once and kept in the header.
+        
+        Parameters
+        ----------
+        dtype : str, optional
+            '<f8' or '<f4' for the profile. The default is '<f8'.
+        x_encoding : str, optional
+            How to store x, see ``storage.encode_x``. The default is 'auto'.
+        
+        Returns
+        -------
+        bytes
+            The buffer.
+        """
+        return storage.pack(*self._to_storage(dtype,x_encoding))
+    def _to_storage(self,dtype:str,x_encoding:str)->tuple:
+        if dtype not in storage.DTYPES:
+            raise ValueError(f'dtype must be one of {storage.DTYPES}')
+        meta, arrays = storage.encode_x(np.asarray(self.x),self.h,x_encoding)
+        surface = {}
+        if self.status != 'stopped':
+            surface = {key: float(getattr(self,key)) for key in SURFACE}
+        header = {
+            'kind': 'star',
+            'n': float(self.n),
+            'h': self.h,
+            'length': len(self.y),
+            'integrals': {key: float(val) for key, val in self.integrals.items()},
+            'surface': surface,
+            **meta
+        }
+        arrays = {key: np.asarray(val,dtype=dtype) for key, val in arrays.items()}
+        arrays['y'] = np.asarray(self.y,dtype=dtype)
+        arrays['z'] = np.asarray(self.z,dtype=dtype)
+        return header, arrays
+    @classmethod
+    def _from_storage(cls,header:dict,arrays:dict):
+        if header.get('kind') != 'star':
+            raise ValueError(f'Expected a star, got {header.get("kind")}')
+        if header['x_encoding'] == 'uniform':
+            x = storage.decode_x(header['x0'],header['dx'],header['length'],header['x_rule'])
+        else:
+            x = arrays['x']
+        star = cls(x,arrays['y'],arrays['z'],header['n'],header['integrals'] or None,header['h'])
+        star._surface = dict(header['surface'])
+        return star
+    @classmethod
+    def from_bytes(cls,buffer):
+        """
+        Create a star from the output of ``to_bytes`` without copying
+        the profile.
+        
+        Parameters
+        ----------
+        buffer : bytes-like
+            The buffer.
+        
+        Returns
+        -------
+        Star
+            The star, with read-only arrays.
+        """
+        return cls._from_storage(*storage.unpack(buffer))
+    def save(self,path,dtype:str='<f8',x_encoding:str='auto'):
+        """
+        Write the star to a file. See ``to_bytes``.
+        """
+        storage.save(path,self.to_bytes(dtype,x_encoding))
+    @classmethod
+    def load(cls,path,mmap:bool=True):
+        """
+        Read a star written by ``save``.
+        
+        Parameters
+        ----------
+        path : str or Path
+            The file.
+        mmap : bool, optional
+            Map the profile from the file instead of reading it.
+            The default is True.
+        
+        Returns
+        -------
+        Star
+            The star.
+        """
+        return cls._from_storage(*storage.load(path,mmap))
+    @property
+    def dense(self)->DenseSolution:
+        """
+        Get the continuous solution through the profile.
+        """
+        return DenseSolution(self.x,self.y,self.z,self.n)
     def resample_y(
         self,
         x:np.ndarray
     ):
         """
         Resample the y values.
+        
+        Uses the dense output of the solution, see ``dense``. Like
+        ``StarEnsemble.resample_y``, points outside the profile are
+        extrapolated from its first or last interval.
         """
-        interp = CubicSpline(self.x,self.y)
-        return interp(x)
+        return self.dense.theta(x,extrapolate=True)
     def central_pressure(
         self,
         mass:float,
@@ -367,6 +739,213 @@ class Star:
         float
             The central pressure in dyne cm-2.
         """
-        num = 8.952e14
-        den = (self.n+1)*self.theta_prime**2
-        return num/den * mass**2 * radius**-4
\ No newline at end of file
+        return central_pressure(self.n,self.theta_prime,mass,radius)
+
+
+class CompositeStar(Star):
+    """
+    A star made of polytropic zones with different indices, see
+    ``polysolver.polysolver.solve_composite``.
+    
+    Radii are in units of the length scale :math:`a_1` of the central
+    zone, densities and pressures in units of their central values and
+    masses in units of :math:`4\\pi\\rho_c a_1^3`, so that a single zone
+    is an ordinary polytrope and the surface quantities keep their usual
+    meaning.
+    
+    Parameters
+    ----------
+    x : np.ndarray
+        The radii, in units of :math:`a_1`.
+    y : np.ndarray
+        The :math:`\\theta` of each zone, which is 1 at its inner interface.
+    z : np.ndarray
+        The :math:`\\frac{d\\theta}{d\\xi}` of each zone, in its own units.
+    info : dict
+        'ns', 'starts', 'scales', 'densities' and 'pressures' of each
+        zone, as returned by ``solve_composite``.
+    h : float, optional
+        The step size of the integration.
+    """
+    def __init__(
+        self,
+        x:np.ndarray,
+        y:np.ndarray,
+        z:np.ndarray,
+        info:dict,
+        h:float=None
+    ):
+        super().__init__(x,y,z,info['ns'][0],h=h)
+        self.info = info
+        self.ns = list(info['ns'])
+    @classmethod
+    def from_soln(
+        cls,
+        x_init:float,
+        zones:list,
+        h:float,
+        max_iter:int=100000,
+        impl:str='rust'
+    ):
+        """
+        Create a composite star by integrating its zones.
+        
+        Parameters
+        ----------
+        x_init : float
+            The initial x value. Choose something small.
+        zones : list of dict
+            The zones from the centre outwards, see ``solve_composite``.
+        h : float
+            The step size, in units of :math:`a_1`.
+        max_iter : int, optional
+            The maximum number of iterations over all zones.
+            The default is 100000.
+        impl : str, optional
+            The implementation to use. The default is 'rust'.
+        
+        Returns
+        -------
+        CompositeStar
+            The star.
+        """
+        x,y,z,info = solve_composite(x_init,zones,h,max_iter,impl)
+        return cls(x,y,z,info,h=h)
+    @property
+    def n_zones(self)->int:
+        """
+        The number of zones reached by the integration.
+        """
+        return len(self.info['starts'])
+    def _part(self,k:int)->slice:
+        starts = list(self.info['starts']) + [len(self.x)]
+        return slice(starts[k],starts[k+1])
+    def zone(self,k:int)->Star:
+        """
+        Get one zone as a polytrope in its own units, :math:`\\xi_k = r/a_k`.
+        """
+        part = self._part(range(self.n_zones)[k])
+        x = np.asarray(self.x[part])/self.info['scales'][k]
+        return Star(x,self.y[part],self.z[part],self.ns[k])
+    def density(self)->np.ndarray:
+        """
+        Get :math:`\\rho/\\rho_c` at every point, zero past the surface.
+        """
+        rho = np.empty(len(self.x))
+        for k in range(self.n_zones):
+            part = self._part(k)
+            y = np.clip(self.y[part],0,None)
+            rho[part] = self.info['densities'][k]*y**self.ns[k]
+        return rho
+    def pressure(self)->np.ndarray:
+        """
+        Get :math:`P/P_c` at every point, zero past the surface.
+        """
+        p = np.empty(len(self.x))
+        for k in range(self.n_zones):
+            part = self._part(k)
+            y = np.clip(self.y[part],0,None)
+            p[part] = self.info['pressures'][k]*y**(self.ns[k] + 1)
+        return p
+    @property
+    def status(self)->str:
+        """
+        'surface' if the outer zone reached :math:`\\theta=0`, else 'stopped'.
+        """
+        return 'surface' if self.y[-1] <= 0 else 'stopped'
+    @property
+    def xi1(self)->float:
+        """
+        Get the radius of the surface in units of :math:`a_1`.
+        """
+        if 'xi1' in self._surface:
+            return self._surface['xi1']
+        return self.zone(-1).xi1*self.info['scales'][-1]
+    @property
+    def mass(self)->float:
+        """
+        Get the mass in units of :math:`4\\pi\\rho_c a_1^3`.
+        """
+        outer = self.zone(-1)
+        scale = self.info['scales'][-1]
+        return self.info['densities'][-1]*scale**3*outer.xi1**2*outer.theta_prime
+    @property
+    def theta_prime(self)->float:
+        """
+        Get the equivalent of :math:`-\\frac{d\\theta_n}{d\\xi}` at the
+        surface, :math:`M/\\xi_1^2` in the units above, which keeps the
+        usual mass and central pressure relations.
+        """
+        if 'theta_prime' in self._surface:
+            return self._surface['theta_prime']
+        return self.mass/self.xi1**2
+    @property
+    def rho_c_over_rho(self)->float:
+        """
+        Get the central density divided by the mean density.
+        """
+        if 'rho_c_over_rho' in self._surface:
+            return self._surface['rho_c_over_rho']
+        return self.xi1**3/(3*self.mass)
+    @property
+    def dense(self)->CompositeDense:
+        """
+        Get the continuous solution through the profile, zone by zone.
+        """
+        return CompositeDense(self.x,self.y,self.z,self.info)
+    def extend(self,additional_iter:int,impl:str='rust'):
+        """
+        Continue a truncated integration of the outer zone from its last point.
+        
+        Parameters
+        ----------
+        additional_iter : int
+            The maximum number of additional iterations.
+        impl : str, optional
+            The implementation to use. The default is 'rust'.
+        
+        Returns
+        -------
+        CompositeStar
+            The extended star.
+        
+        Raises
+        ------
+        ValueError
+            If the star already reaches the surface, or stopped before
+            its outer zone, whose interface is not kept.
+        """
+        if not self.truncated:
+            raise ValueError('The integration already reached the surface')
+        if self.n_zones < len(self.ns):
+            raise ValueError('The integration stopped before the outer zone; solve again with a larger max_iter')
+        scale = self.info['scales'][-1]
+        h = self.h if self.h is not None else self.x[-1] - self.x[-2]
+        x,y,z = solve_from(self.x[-1]/scale,self.y[-1],self.z[-1],self.ns[-1],h/scale,additional_iter,impl)
+        return type(self)(
+            np.concatenate([self.x,x[1:]*scale]),
+            np.concatenate([self.y,y[1:]]),
+            np.concatenate([self.z,z[1:]]),
+            self.info,
+            h=self.h
+        )
+    def _to_storage(self,dtype:str,x_encoding:str)->tuple:
+        header, arrays = super()._to_storage(dtype,x_encoding)
+        header['kind'] = 'composite'
+        header['zones'] = {
+            'ns': [float(n) for n in self.ns],
+            'starts': [int(start) for start in self.info['starts']],
+            **{
+                key: [float(val) for val in self.info[key]]
+                for key in ('scales', 'densities', 'pressures')
+            }
+        }
+        return header, arrays
+    @classmethod
+    def _from_storage(cls,header:dict,arrays:dict):
+        if header.get('kind') != 'composite':
+            raise ValueError(f'Expected a composite star, got {header.get("kind")}')
+        star = Star._from_storage({**header, 'kind': 'star'},arrays)
+        composite = cls(star.x,star.y,star.z,header['zones'],h=header['h'])
+        composite._surface = star._surface
+        return composite
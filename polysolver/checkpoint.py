@@ -0,0 +1,135 @@
+"""
+Long integrations with periodic on-disk checkpoints.
+
+The profile is written to ``path`` as raw little-endian float64 rows of
+``(x, y, z)``, and the parameters of the run to ``path + '.json'``.
+Every ``every`` iterations the new rows are appended and flushed, so an
+interrupted run can be resumed from its last complete row by calling
+``solve_checkpointed`` again with the same arguments.
+
+Examples
+--------
+>>> x, y, z = solve_checkpointed('n4.bin', 1e-10, 4.0, 1e-6, max_iter=10**8)
+>>> x, y, z = load_checkpoint('n4.bin')
+"""
+import json
+import os
+
+import numpy as np
+
+from polysolver.polysolver import solve, solve_from
+
+_DTYPE = np.dtype('<f8')
+_ROW = 3*_DTYPE.itemsize
+
+
+def _read_meta(path:str)->dict:
+    with open(path + '.json', 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def load_checkpoint(path:str, mmap:bool=False):
+    """
+    Load the profile stored in a checkpoint file.
+
+    Parameters
+    ----------
+    path : str
+        The checkpoint file.
+    mmap : bool, optional
+        Map the file instead of reading it. The default is False.
+
+    Returns
+    -------
+    x, y, z : np.ndarray
+        The profile, up to the last complete row.
+    """
+    rows = os.path.getsize(path)//_ROW
+    if mmap:
+        data = np.memmap(path, dtype=_DTYPE, mode='r', shape=(rows, 3))
+    else:
+        data = np.fromfile(path, dtype=_DTYPE, count=3*rows).reshape(rows, 3)
+    return data[:, 0], data[:, 1], data[:, 2]
+
+
+def solve_checkpointed(
+    path:str,
+    x_init:float,
+    n:float,
+    h:float,
+    max_iter:int=1000,
+    every:int=100000,
+    impl:str='rust'
+):
+    """
+    Solve the Lane-Emden equation, checkpointing the profile to disk.
+
+    If ``path`` already holds a checkpoint of the same run, the
+    integration resumes from its last complete row.
+
+    Parameters
+    ----------
+    path : str
+        The checkpoint file.
+    x_init : float
+        The initial x value. Choose something small.
+    n : float
+        The index of the polytrope.
+    h : float
+        The step size.
+    max_iter : int, optional
+        The maximum number of iterations in total. The default is 1000.
+    every : int, optional
+        The number of iterations between checkpoints. The default is 100000.
+    impl : str, optional
+        The implementation to use. The default is 'rust'.
+
+    Returns
+    -------
+    x, y, z : np.ndarray
+        The profile, mapped from the checkpoint file.
+
+    Raises
+    ------
+    ValueError
+        If ``path`` holds a checkpoint of a different run.
+    """
+    meta = {'x_init': float(x_init), 'n': float(n), 'h': float(h)}
+    rows = 0
+    if os.path.exists(path) and os.path.exists(path + '.json'):
+        old = _read_meta(path)
+        if {key: old.get(key) for key in meta} != meta:
+            raise ValueError(f'{path} is a checkpoint of a different run: {old}')
+        rows = os.path.getsize(path)//_ROW
+    with open(path + '.json', 'w', encoding='utf-8') as file:
+        json.dump(meta, file)
+    with open(path, 'r+b' if rows else 'wb') as file:
+        # Drop a partial row left by an interrupted write.
+        file.truncate(rows*_ROW)
+        file.seek(rows*_ROW)
+        if rows:
+            last = np.fromfile(path, dtype=_DTYPE, count=3, offset=(rows-1)*_ROW)
+            done = rows - 1
+        else:
+            last = None
+            done = 0
+        while done < max_iter and (last is None or last[1] > 0):
+            chunk = min(every, max_iter - done)
+            if last is None:
+                x, y, z = solve(x_init, n, h, chunk, impl, analytic=False)
+                start = 0
+            else:
+                x, y, z = solve_from(last[0], last[1], last[2], n, h, chunk, impl)
+                start = 1
+            # No steps means the run already ended, e.g. at x_max for n >= 5.
+            if len(x) <= start:
+                break
+            rows_new = np.stack([x[start:], y[start:], z[start:]], axis=1)
+            file.write(np.ascontiguousarray(rows_new, dtype=_DTYPE).tobytes())
+            file.flush()
+            os.fsync(file.fileno())
+            done += len(x) - 1
+            last = rows_new[-1]
+            if len(x) - 1 < chunk:
+                break
+    return load_checkpoint(path, mmap=True)
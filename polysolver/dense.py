@@ -0,0 +1,282 @@
+"""
+Dense output for solutions of the Lane-Emden equation.
+
+Between two grid points the solution is a quintic Hermite polynomial
+matching :math:`\\theta`, :math:`\\theta^\\prime` and
+:math:`\\theta^{\\prime\\prime}` at both ends. The second derivative comes
+from the Lane-Emden equation itself (it is the first Runge-Kutta stage of
+each step), so no spline has to be fitted over the trajectory and the
+interpolant is more accurate than the fourth-order integration.
+"""
+import numpy as np
+
+
+def _second_derivative(x:np.ndarray,y:np.ndarray,z:np.ndarray,n:float)->np.ndarray:
+    """
+    :math:`\\frac{dz}{dx}` at every grid point, with the same sign
+    convention as ``derivatives.get_zprime`` past the surface.
+    """
+    rho = np.sign(y)*np.abs(y)**n
+    with np.errstate(divide='ignore',invalid='ignore'):
+        zprime = -rho - 2*z/x
+    # The limit at the centre is -1/3.
+    return np.where(x==0,-1/3,zprime)
+
+
+class DenseSolution:
+    """
+    A continuous solution to the Lane-Emden equation.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        The x values. Recall that :math:`x=\\xi=\\frac{r}{r_n}`
+    y : np.ndarray
+        The y values. Recall that :math:`y=\\theta_n`
+    z : np.ndarray
+        The z values. Recall that :math:`z=\\frac{d\\theta_n}{d\\xi}`
+    n : float
+        The index of the polytrope.
+
+    Notes
+    -----
+    Evaluation is vectorised, and each point is located with a binary
+    search. Points outside ``[x[0], x[-1]]`` evaluate to NaN, unless
+    ``extrapolate`` is given, in which case the polynomial of the first
+    or last interval is used.
+
+    Examples
+    --------
+    >>> sol = solve(1e-10, 1.5, 1e-3, max_iter=100000, dense=True)
+    >>> sol(np.linspace(0, sol.xi1, 100))
+    """
+    def __init__(
+        self,
+        x:np.ndarray,
+        y:np.ndarray,
+        z:np.ndarray,
+        n:float
+    ):
+        self.x = np.asarray(x,dtype=np.float64)
+        self.y = np.asarray(y,dtype=np.float64)
+        self.z = np.asarray(z,dtype=np.float64)
+        self.n = n
+        self.a = _second_derivative(self.x,self.y,self.z,n)
+    def _locate(self,xi):
+        xi = np.asarray(xi,dtype=np.float64)
+        i = np.searchsorted(self.x,xi,side='right') - 1
+        i = np.clip(i,0,len(self.x)-2)
+        dx = self.x[i+1] - self.x[i]
+        t = (xi - self.x[i])/dx
+        outside = (xi < self.x[0]) | (xi > self.x[-1])
+        return i, dx, t, outside
+    def _eval(self,i,dx,t,deriv:bool):
+        t2 = t*t
+        t3 = t2*t
+        t4 = t3*t
+        t5 = t4*t
+        y0, y1 = self.y[i], self.y[i+1]
+        z0, z1 = self.z[i]*dx, self.z[i+1]*dx
+        a0, a1 = self.a[i]*dx**2, self.a[i+1]*dx**2
+        if not deriv:
+            return (
+                (1 - 10*t3 + 15*t4 - 6*t5)*y0
+                + (t - 6*t3 + 8*t4 - 3*t5)*z0
+                + 0.5*(t2 - 3*t3 + 3*t4 - t5)*a0
+                + (10*t3 - 15*t4 + 6*t5)*y1
+                + (-4*t3 + 7*t4 - 3*t5)*z1
+                + 0.5*(t3 - 2*t4 + t5)*a1
+            )
+        return (
+            (-30*t2 + 60*t3 - 30*t4)*(y0 - y1)
+            + (1 - 18*t2 + 32*t3 - 15*t4)*z0
+            + 0.5*(2*t - 9*t2 + 12*t3 - 5*t4)*a0
+            + (-12*t2 + 28*t3 - 15*t4)*z1
+            + 0.5*(3*t2 - 8*t3 + 5*t4)*a1
+        )/dx
+    def theta(self,xi,extrapolate:bool=False)->np.ndarray:
+        """
+        Get :math:`\\theta_n(\\xi)`.
+
+        Parameters
+        ----------
+        xi : float or np.ndarray
+            The x values.
+        extrapolate : bool, optional
+            Extrapolate outside ``[x[0], x[-1]]`` instead of returning NaN.
+            The default is False.
+
+        Returns
+        -------
+        np.ndarray
+            The y values.
+        """
+        i, dx, t, outside = self._locate(xi)
+        values = self._eval(i,dx,t,False)
+        return values if extrapolate else np.where(outside,np.nan,values)
+    __call__ = theta
+    def theta_prime(self,xi,extrapolate:bool=False)->np.ndarray:
+        """
+        Get :math:`\\frac{d\\theta_n}{d\\xi}(\\xi)`.
+
+        Parameters
+        ----------
+        xi : float or np.ndarray
+            The x values.
+        extrapolate : bool, optional
+            Extrapolate outside ``[x[0], x[-1]]`` instead of returning NaN.
+            The default is False.
+
+        Returns
+        -------
+        np.ndarray
+            The z values.
+        """
+        i, dx, t, outside = self._locate(xi)
+        values = self._eval(i,dx,t,True)
+        return values if extrapolate else np.where(outside,np.nan,values)
+    def rho(self,xi)->np.ndarray:
+        """
+        Get the density as a fraction of the central density,
+        :math:`\\rho/\\rho_c = \\theta_n^n`, which is zero past the surface.
+
+        Parameters
+        ----------
+        xi : float or np.ndarray
+            The x values.
+
+        Returns
+        -------
+        np.ndarray
+            The density as a fraction of the central density.
+        """
+        y = self.theta(xi)
+        return np.where(y > 0,np.abs(y)**self.n,np.where(np.isnan(y),np.nan,0.))
+    @property
+    def xi1(self)->float:
+        """
+        Get the value of :math:`\\xi` at the surface, the root of the
+        interpolant in the last interval. NaN if the surface was not reached.
+        """
+        if self.y[-1] > 0 or len(self.x) < 2:
+            return np.nan
+        i = len(self.x) - 2
+        dx = self.x[-1] - self.x[-2]
+        t = self.y[-2]/(self.y[-2] - self.y[-1])
+        for _ in range(8):
+            step = self._eval(i,dx,t,False)/(self._eval(i,dx,t,True)*dx)
+            t = min(max(t - step,0.),1.)
+            if abs(step) < 1e-15:
+                break
+        return float(self.x[i] + t*dx)
+
+
+class CompositeDense:
+    """
+    A continuous composite polytrope, with one ``DenseSolution`` per zone.
+
+    Radii are in units of the length scale of the first zone, and each
+    point is evaluated in the zone that contains it, in that zone's own
+    units, as in ``polysolver.analysis.CompositeStar``.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        The radii.
+    y : np.ndarray
+        The :math:`\\theta` of each zone.
+    z : np.ndarray
+        The :math:`\\frac{d\\theta}{d\\xi}` of each zone, in its own units.
+    info : dict
+        'ns', 'starts', 'scales' and 'densities' of each zone, as returned
+        by ``polysolver.polysolver.solve_composite``.
+    """
+    def __init__(
+        self,
+        x:np.ndarray,
+        y:np.ndarray,
+        z:np.ndarray,
+        info:dict
+    ):
+        x = np.asarray(x,dtype=np.float64)
+        starts = list(info['starts'])
+        self.ns = list(info['ns'])[:len(starts)]
+        self.scales = np.asarray(info['scales'],dtype=np.float64)
+        self.densities = np.asarray(info['densities'],dtype=np.float64)
+        self.inner = x[starts]
+        self.zones = [
+            DenseSolution(x[lo:hi]/scale,y[lo:hi],z[lo:hi],n)
+            for lo, hi, scale, n in zip(starts,starts[1:] + [len(x)],self.scales,self.ns)
+        ]
+    def _each(self,xi,get):
+        """
+        Evaluate ``get(k, zone, xi_k)`` for the points in each zone ``k``.
+        """
+        xi = np.asarray(xi,dtype=np.float64)
+        k = np.clip(np.searchsorted(self.inner,xi,side='right') - 1,0,len(self.zones) - 1)
+        out = np.empty(xi.shape)
+        for j, zone in enumerate(self.zones):
+            mask = k == j
+            if np.any(mask):
+                out[mask] = get(j,zone,xi[mask]/self.scales[j])
+        return out
+    def theta(self,xi,extrapolate:bool=False)->np.ndarray:
+        """
+        Get the :math:`\\theta` of the zone that contains each radius.
+
+        Parameters
+        ----------
+        xi : float or np.ndarray
+            The radii.
+        extrapolate : bool, optional
+            Extrapolate inside the first point and past the last instead
+            of returning NaN. The default is False.
+
+        Returns
+        -------
+        np.ndarray
+            The y values.
+        """
+        return self._each(xi,lambda k, zone, xi_k: zone.theta(xi_k,extrapolate))
+    __call__ = theta
+    def theta_prime(self,xi,extrapolate:bool=False)->np.ndarray:
+        """
+        Get the :math:`\\frac{d\\theta}{d\\xi}` of the zone that contains
+        each radius, in that zone's units.
+
+        Parameters
+        ----------
+        xi : float or np.ndarray
+            The radii.
+        extrapolate : bool, optional
+            Extrapolate inside the first point and past the last instead
+            of returning NaN. The default is False.
+
+        Returns
+        -------
+        np.ndarray
+            The z values.
+        """
+        return self._each(xi,lambda k, zone, xi_k: zone.theta_prime(xi_k,extrapolate))
+    def rho(self,xi)->np.ndarray:
+        """
+        Get the density as a fraction of the central density, which is
+        zero past the surface.
+
+        Parameters
+        ----------
+        xi : float or np.ndarray
+            The radii.
+
+        Returns
+        -------
+        np.ndarray
+            The density as a fraction of the central density.
+        """
+        return self._each(xi,lambda k, zone, xi_k: self.densities[k]*zone.rho(xi_k))
+    @property
+    def xi1(self)->float:
+        """
+        Get the radius of the surface, NaN if it was not reached.
+        """
+        return self.zones[-1].xi1*self.scales[-1]
@@ -3,8 +3,10 @@
 Derivates to use in the Runge-Kutta method.
 
 """
-from typing import Callable
+from typing import Callable, Tuple
 import cmath
+import math
+import numpy as np
 
 
 def get_yprime() -> Callable:
@@ -52,6 +54,8 @@ def get_zprime(n) -> Callable:
     Callable
         The zprime function
     """
+    # A numpy index would turn a negative y**n into NaN instead of complex.
+    n = float(n)
     def zprime(
         x:float,
         y:float,
@@ -81,3 +85,202 @@ def get_zprime(n) -> Callable:
             a = -abs(a)
         return -a - 2/x*z
     return zprime
+
+
+def get_zprime_vectorized(n) -> Callable:
+    """
+    Get the zprime function for arrays of states, with the same sign
+    convention as ``get_zprime`` past the surface.
+
+    Parameters
+    ----------
+    n : float
+        The index of the polytrope.
+
+    Returns
+    -------
+    Callable
+        The zprime function, taking arrays of ``y`` and ``z``.
+    """
+    def zprime(x, y, z):
+        a = np.where(y >= 0, 1., -1.)*np.abs(y)**n
+        return -a - 2/x*z
+    return zprime
+
+
+def get_log_rhs(n) -> Callable:
+    """
+    Get the right-hand side of the Lane-Emden equation
+    in the coordinate :math:`t = \\ln x`.
+
+    Parameters
+    ----------
+    n : float
+        The index of the polytrope.
+
+    Returns
+    -------
+    Callable
+        The function ``rhs(t, state)`` where ``state`` is
+        :math:`(y, v)` with :math:`v = x\\frac{dy}{dx}`.
+
+    Notes
+    -----
+    .. math::
+        \\frac{dy}{dt} = v \\\\
+        \\frac{dv}{dt} = -v - e^{2t} y^n
+    """
+    def rhs(t:float, state):
+        y, v = state
+        source = -abs(y)**n if y >= 0 else abs(y)**n
+        return (v, -v + math.exp(2*t)*source)
+    return rhs
+
+
+def get_sensitivity_rhs(n) -> Callable:
+    """
+    Get the right-hand side of the Lane-Emden equation extended
+    with the forward sensitivities with respect to :math:`n`.
+
+    Parameters
+    ----------
+    n : float
+        The index of the polytrope.
+
+    Returns
+    -------
+    Callable
+        The function ``rhs(x, state)`` where ``state`` is
+        :math:`(y, z, s, w)` with :math:`s=\\frac{\\partial y}{\\partial n}`
+        and :math:`w=\\frac{\\partial z}{\\partial n}`.
+
+    Notes
+    -----
+    .. math::
+        s' = w \\\\
+        w' = -\\theta^n \\ln\\theta - n\\theta^{n-1} s - \\frac{2}{x} w
+    """
+    def rhs(x:float, state):
+        y, z, s, w = state
+        abs_y = abs(y)
+        source = -abs_y**n if y >= 0 else abs_y**n
+        if abs_y > 0:
+            dsource_dn = source*math.log(abs_y)
+            dsource_dy = -n*abs_y**(n-1)
+        else:
+            dsource_dn = 0.
+            dsource_dy = 0.
+        return (
+            z,
+            source - 2/x*z,
+            w,
+            dsource_dn + dsource_dy*s - 2/x*w
+        )
+    return rhs
+
+
+
+def get_sensitivity_tail_rhs(n) -> Callable:
+    """
+    Get the sensitivity equations near the surface, with
+    :math:`u=\\theta^n` as the independent variable.
+
+    For :math:`0<n<1` the term :math:`n\\theta^{n-1}s` of
+    ``get_sensitivity_rhs`` is singular at the surface. Its integral is
+    finite, and with :math:`du = n\\theta^{n-1}d\\theta` it becomes regular.
+
+    Parameters
+    ----------
+    n : float
+        The index of the polytrope, with :math:`0<n<1`.
+
+    Returns
+    -------
+    Callable
+        The function ``rhs(u, state)`` where ``state`` is
+        :math:`(x, z, s, w)`, integrated from :math:`u=\\theta^n` down
+        to the surface at :math:`u=0`.
+
+    Notes
+    -----
+    .. math::
+        \\frac{dx}{du} = \\frac{\\theta^{1-n}}{nz} \\\\
+        \\frac{dz}{du} = -\\frac{\\theta + 2z\\theta^{1-n}/x}{nz} \\\\
+        \\frac{ds}{du} = \\frac{w\\theta^{1-n}}{nz} \\\\
+        \\frac{dw}{du} = -\\frac{\\theta\\ln\\theta + 2w\\theta^{1-n}/x}{nz} - \\frac{s}{z}
+    """
+    def rhs(u:float, state):
+        x, z, s, w = state
+        y = max(u,0.)**(1/n)
+        a = y**(1-n)
+        y_log_y = y*math.log(y) if y > 0 else 0.
+        return (
+            a/(n*z),
+            -(y + 2*z*a/x)/(n*z),
+            w*a/(n*z),
+            -(y_log_y + 2*w*a/x)/(n*z) - s/z
+        )
+    return rhs
+
+EQUATIONS = ('lane_emden', 'isothermal', 'white_dwarf', 'emden_fowler')
+
+
+def get_equation(name:str, params) -> Tuple[Callable,float,float]:
+    """
+    Get an equation family from the registry.
+
+    Every family is a second order equation written as
+    :math:`y'=z` and :math:`z'=f(x,y,z)`, integrated from
+    :math:`y=y_{init}`, :math:`z=0` until :math:`y \\leq y_{surface}`.
+
+    Parameters
+    ----------
+    name : str
+        The name of the family. One of ``EQUATIONS``.
+
+        * ``lane_emden``, params ``[n]``:
+          :math:`z' = -y^n - \\frac{2}{x}z`
+        * ``isothermal``, no params:
+          :math:`z' = e^{-y} - \\frac{2}{x}z` where :math:`y=\\psi`.
+          There is no surface.
+        * ``white_dwarf``, params ``[c]`` with :math:`c=1/y_0^2`:
+          :math:`z' = -(y^2-c)^{3/2} - \\frac{2}{x}z`,
+          with the surface at :math:`y=\\sqrt{c}`.
+        * ``emden_fowler``, params ``[n, a, b]``:
+          :math:`z' = -x^b y^n - \\frac{a}{x}z`
+    params : sequence of float
+        The parameters of the family.
+
+    Returns
+    -------
+    zprime : Callable
+        The zprime function.
+    y_init : float
+        The initial y value.
+    y_surface : float
+        The y value at the surface.
+    """
+    params = [float(p) for p in params]
+    counts = {'lane_emden': 1, 'isothermal': 0, 'white_dwarf': 1, 'emden_fowler': 3}
+    if name not in counts:
+        raise ValueError(f'Unknown equation {name}, expected one of {EQUATIONS}')
+    if len(params) != counts[name]:
+        raise ValueError(f'{name} takes {counts[name]} parameters, got {len(params)}')
+    if name == 'lane_emden':
+        return get_zprime(params[0]), 1., 0.
+    if name == 'isothermal':
+        return lambda x, y, z: math.exp(-y) - 2/x*z, 0., -math.inf
+    if name == 'white_dwarf':
+        c = params[0]
+        if not 0 < c < 1:
+            raise ValueError('white_dwarf requires 0 < c < 1')
+        def zprime(x, y, z):
+            d = y*y - c
+            source = abs(d)**1.5
+            return (-source if d >= 0 else source) - 2/x*z
+        return zprime, 1., math.sqrt(c)
+    n, a, b = params
+    def zprime(x, y, z):
+        source = x**b * abs(y)**n
+        return (-source if y >= 0 else source) - a/x*z
+    return zprime, 1., 0.
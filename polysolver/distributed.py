@@ -0,0 +1,552 @@
+"""
+Parameter sweeps shared between processes through a directory.
+
+A coordinator splits a grid of models into shards and writes them to a
+directory that every worker can see, e.g. on a shared filesystem::
+
+    python -m polysolver.distributed create /shared/sweep --n 0 4 1000 --h 1e-3
+    python -m polysolver.distributed work /shared/sweep      # on every node
+    python -m polysolver.distributed merge /shared/sweep out.npz
+
+Layout
+------
+``sweep.json``
+    The settings of the sweep and the shape of the grid.
+``todo/``
+    Shards waiting for a worker, each an ``.npz`` of the global index,
+    ``x_init``, ``n`` and ``h`` of its models.
+``claimed/``
+    Shards being solved. A worker claims a shard by renaming it from
+    ``todo/``, which is atomic, so only one worker gets it. The worker
+    touches the file while it works; a shard untouched for longer than
+    the lease is assumed lost with its worker and is moved back.
+``done/``
+    The results of each shard: the surface quantities, and optionally
+    the profiles as a ``StarEnsemble`` file. Results are written under
+    a temporary name and renamed, so a partial file is never seen.
+
+A shard solved twice (by a worker thought dead and by the one that took
+over) gives identical results, so the duplicate is harmless.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+from pathlib import Path
+import socket
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from polysolver.polysolver import solve_batch
+from polysolver.ensemble import StarEnsemble
+
+SETTINGS = 'sweep.json'
+QUANTITIES = ('xi1', 'theta_prime', 'rho_c_over_rho')
+LEASE = 600.
+POLL = 1.
+
+
+def _paths(root:Path)->dict:
+    """
+    The directories of a sweep.
+    """
+    return {name: root / name for name in ('todo', 'claimed', 'done')}
+
+
+def _write_atomic(path:Path,write):
+    """
+    Write a file under a temporary name and rename it into place.
+    """
+    tmp = path.with_name(f'.{path.name}.{uuid.uuid4().hex}.tmp')
+    try:
+        write(tmp)
+        os.replace(tmp,path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def _save_npz(path:Path,**arrays):
+    """
+    ``np.savez`` to exactly ``path``, atomically.
+    """
+    def write(tmp):
+        with open(tmp,'wb') as file:
+            np.savez(file,**arrays)
+    _write_atomic(path,write)
+
+
+def load_settings(root)->dict:
+    """
+    Read the settings of a sweep.
+    """
+    return json.loads((Path(root) / SETTINGS).read_text(encoding='utf-8'))
+
+
+def create(
+    root,
+    x_init,
+    n,
+    h,
+    max_iter:int=1000,
+    analytic:bool=True,
+    shard_size:int=256,
+    profiles:bool=False,
+    impl:str='rust'
+)->dict:
+    """
+    Split a grid of models into shards.
+
+    Parameters
+    ----------
+    root : str or Path
+        The directory of the sweep. It must not hold another sweep.
+    x_init, n, h : float or array-like
+        The models, broadcast against each other into the grid.
+    max_iter : int, optional
+        The maximum number of iterations. The default is 1000.
+    analytic : bool, optional
+        Use the closed-form solution when one exists. The default is True.
+    shard_size : int, optional
+        The number of models in a shard. The default is 256.
+    profiles : bool, optional
+        Keep the profiles as well as the surface quantities.
+        The default is False.
+    impl : str, optional
+        The implementation the workers use. The default is 'rust'.
+
+    Returns
+    -------
+    dict
+        The settings of the sweep.
+    """
+    root = Path(root)
+    if (root / SETTINGS).exists():
+        raise FileExistsError(f'{root} already holds a sweep')
+    if impl not in ('rust', 'python'):
+        raise NotImplementedError('impl must be "rust" or "python"')
+    x_init, n, h = np.broadcast_arrays(
+        np.asarray(x_init,dtype=np.float64),
+        np.asarray(n,dtype=np.float64),
+        np.asarray(h,dtype=np.float64)
+    )
+    paths = _paths(root)
+    for path in paths.values():
+        path.mkdir(parents=True,exist_ok=True)
+    size = x_init.size
+    n_shards = -(-size // shard_size)
+    width = max(5,len(str(n_shards)))
+    for k in range(n_shards):
+        index = np.arange(k*shard_size,min((k+1)*shard_size,size))
+        _save_npz(
+            paths['todo'] / f'shard-{k:0{width}d}.npz',
+            index=index,
+            x_init=x_init.ravel()[index],
+            n=n.ravel()[index],
+            h=h.ravel()[index]
+        )
+    settings = {
+        'shape': list(x_init.shape),
+        'n_shards': n_shards,
+        'max_iter': int(max_iter),
+        'analytic': bool(analytic),
+        'profiles': bool(profiles),
+        'impl': impl,
+    }
+    # Written last: workers wait for it, so they never see half the shards.
+    _write_atomic(
+        root / SETTINGS,
+        lambda tmp: tmp.write_text(json.dumps(settings,indent=1),encoding='utf-8')
+    )
+    return settings
+
+
+def status(root)->dict:
+    """
+    Count the shards in each state.
+    """
+    paths = _paths(Path(root))
+    patterns = {'todo': 'shard-*.npz', 'claimed': 'shard-*.npz.*', 'done': 'shard-*.npz'}
+    return {
+        name: sum(1 for _ in paths[name].glob(pattern))
+        for name, pattern in patterns.items()
+    }
+
+
+def requeue_stale(root,lease:float=LEASE)->int:
+    """
+    Move shards whose worker has not touched them for ``lease`` seconds
+    back to ``todo/``.
+
+    Returns
+    -------
+    int
+        The number of shards moved.
+    """
+    paths = _paths(Path(root))
+    now = time.time()
+    moved = 0
+    for path in paths['claimed'].glob('shard-*.npz.*'):
+        shard = path.name.split('.npz.')[0] + '.npz'
+        try:
+            if now - path.stat().st_mtime < lease:
+                continue
+            if (paths['done'] / shard).exists():
+                path.unlink()
+                continue
+            os.rename(path,paths['todo'] / shard)
+            moved += 1
+        except FileNotFoundError:
+            # Finished, or taken back by someone else, in the meantime.
+            continue
+    return moved
+
+
+def _claim(paths:dict,worker:str):
+    """
+    Claim any shard of ``todo/``, or return None if there is none.
+    """
+    for path in sorted(paths['todo'].glob('shard-*.npz')):
+        claimed = paths['claimed'] / f'{path.name}.{worker}'
+        try:
+            os.rename(path,claimed)
+            # A rename keeps the old mtime, which would look stale.
+            os.utime(claimed)
+        except FileNotFoundError:
+            continue
+        return claimed
+    return None
+
+
+class _Heartbeat:
+    """
+    Touch a claimed shard every ``interval`` seconds, on a thread.
+    """
+    def __init__(self,path:Path,interval:float):
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run,daemon=True)
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                os.utime(self.path)
+            except FileNotFoundError:
+                return
+    def __enter__(self):
+        self._thread.start()
+        return self
+    def __exit__(self,*args):
+        self._stop.set()
+        self._thread.join()
+
+
+def solve_shard(root,claimed:Path,settings:dict,n_threads:int=None):
+    """
+    Solve one claimed shard and write its results to ``done/``.
+    """
+    paths = _paths(Path(root))
+    shard = claimed.name.split('.npz.')[0] + '.npz'
+    with np.load(claimed) as data:
+        index, x_init, n, h = (data[key] for key in ('index', 'x_init', 'n', 'h'))
+    x, y, z, offsets = solve_batch(
+        x_init,
+        n,
+        h,
+        max_iter=settings['max_iter'],
+        impl=settings['impl'],
+        n_threads=n_threads,
+        analytic=settings['analytic']
+    )
+    ensemble = StarEnsemble(x,y,z,offsets,n)
+    surface = {key: getattr(ensemble,key) for key in QUANTITIES}
+    surface['length'] = ensemble.lengths
+    if settings['profiles']:
+        # The profiles go first, so a shard is only done with both files.
+        _write_atomic(paths['done'] / f'{shard[:-4]}.ens',ensemble.save)
+    _save_npz(paths['done'] / shard,index=index,x_init=x_init,n=n,h=h,**surface)
+    try:
+        claimed.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def work(
+    root,
+    worker:str=None,
+    lease:float=LEASE,
+    poll:float=POLL,
+    n_threads:int=None,
+    max_shards:int=None,
+    wait:float=None
+)->int:
+    """
+    Solve shards until the sweep is finished.
+
+    A worker that finds no shard to claim requeues stale shards and
+    waits for the ones still being solved, so it can take over from a
+    worker that died.
+
+    Parameters
+    ----------
+    root : str or Path
+        The directory of the sweep.
+    worker : str, optional
+        A name for this worker, unique across the sweep, without ".".
+        The default is the host name, with "." replaced by "_", and the
+        process id.
+    lease : float, optional
+        Seconds after which a shard nobody touched is solved again.
+        The default is ``LEASE``.
+    poll : float, optional
+        Seconds between looks for work. The default is ``POLL``.
+    n_threads : int, optional
+        The number of threads used by the rust implementation.
+    max_shards : int, optional
+        Stop after this many shards. The default is no limit.
+    wait : float, optional
+        Seconds to wait for the sweep to be created. The default is
+        not to wait.
+
+    Returns
+    -------
+    int
+        The number of shards this worker solved.
+    """
+    root = Path(root)
+    if worker is None:
+        # Fully qualified host names contain dots.
+        worker = f'{socket.gethostname().replace(".","_")}-{os.getpid()}'
+    if '.' in worker:
+        raise ValueError('worker must not contain "."')
+    deadline = time.monotonic() + (wait or 0.)
+    while not (root / SETTINGS).exists():
+        if time.monotonic() >= deadline:
+            raise FileNotFoundError(f'{root} holds no sweep')
+        time.sleep(poll)
+    settings = load_settings(root)
+    paths = _paths(root)
+    solved = 0
+    while max_shards is None or solved < max_shards:
+        claimed = _claim(paths,worker)
+        if claimed is None:
+            if status(root)['done'] >= settings['n_shards']:
+                break
+            if requeue_stale(root,lease) == 0:
+                time.sleep(poll)
+            continue
+        with _Heartbeat(claimed,lease/4):
+            solve_shard(root,claimed,settings,n_threads)
+        solved += 1
+    return solved
+
+
+def merge(root)->dict:
+    """
+    Gather the results of a finished sweep.
+
+    Returns
+    -------
+    dict
+        The grid (``x_init``, ``n`` and ``h``), the surface quantities and
+        the number of points in each profile, all with the shape of the
+        grid, and ``ensemble``, a ``StarEnsemble`` of every model in
+        flattened grid order, if the sweep kept the profiles.
+    """
+    root = Path(root)
+    settings = load_settings(root)
+    paths = _paths(root)
+    shards = sorted(paths['done'].glob('shard-*.npz'))
+    if len(shards) < settings['n_shards']:
+        raise RuntimeError(f'{len(shards)} of {settings["n_shards"]} shards are done')
+    size = int(np.prod(settings['shape'],dtype=np.int64))
+    out = {key: np.full(size,np.nan) for key in ('x_init', 'n', 'h') + QUANTITIES}
+    out['length'] = np.zeros(size,dtype=np.int64)
+    members = []
+    for path in shards:
+        with np.load(path) as data:
+            index = data['index']
+            for key in out:
+                out[key][index] = data[key]
+        if settings['profiles']:
+            members.append((index,StarEnsemble.load(path.with_suffix('.ens'),mmap=False)))
+    result = {key: val.reshape(settings['shape']) for key, val in out.items()}
+    if members:
+        members.sort(key=lambda item: item[0][0])
+        parts = [ensemble for _, ensemble in members]
+        lengths = np.concatenate([ens.lengths for ens in parts])
+        offsets = np.zeros(len(lengths)+1,dtype=np.int64)
+        offsets[1:] = np.cumsum(lengths)
+        result['ensemble'] = StarEnsemble(
+            np.concatenate([ens.x for ens in parts]),
+            np.concatenate([ens.y for ens in parts]),
+            np.concatenate([ens.z for ens in parts]),
+            offsets,
+            np.concatenate([ens.n for ens in parts])
+        )
+    return result
+
+
+def coordinate(
+    root,
+    lease:float=LEASE,
+    poll:float=POLL,
+    timeout:float=None,
+    workers=()
+)->dict:
+    """
+    Wait for a sweep to finish, requeueing stale shards, and merge it.
+
+    Parameters
+    ----------
+    root : str or Path
+        The directory of the sweep.
+    lease : float, optional
+        See ``work``. The default is ``LEASE``.
+    poll : float, optional
+        Seconds between checks. The default is ``POLL``.
+    timeout : float, optional
+        Give up with a ``TimeoutError`` after this many seconds.
+    workers : sequence of multiprocessing.Process, optional
+        Local workers. If they have all exited before the sweep is
+        finished, nobody is left to finish it and a ``RuntimeError``
+        is raised.
+
+    Returns
+    -------
+    dict
+        See ``merge``.
+    """
+    settings = load_settings(root)
+    start = time.monotonic()
+    while status(root)['done'] < settings['n_shards']:
+        if timeout is not None and time.monotonic() - start > timeout:
+            raise TimeoutError(f'the sweep in {root} did not finish in {timeout} s')
+        if workers and not any(proc.is_alive() for proc in workers):
+            if status(root)['done'] >= settings['n_shards']:
+                break
+            raise RuntimeError('every worker exited before the sweep finished')
+        requeue_stale(root,lease)
+        time.sleep(poll)
+    return merge(root)
+
+
+def run_local(
+    root,
+    x_init,
+    n,
+    h,
+    max_iter:int=1000,
+    n_workers:int=None,
+    lease:float=LEASE,
+    poll:float=POLL,
+    timeout:float=None,
+    **kwargs
+)->dict:
+    """
+    Create a sweep, solve it with worker processes on this machine and
+    merge it. Useful on one node, and to test a setup before going wide.
+
+    Parameters
+    ----------
+    root : str or Path
+        The directory of the sweep.
+    x_init, n, h, max_iter :
+        See ``create``.
+    n_workers : int, optional
+        The number of worker processes, each solving on one thread.
+        The default is the number of CPUs.
+    lease, poll, timeout :
+        See ``coordinate``.
+    **kwargs :
+        Passed to ``create``.
+
+    Returns
+    -------
+    dict
+        See ``merge``.
+    """
+    create(root,x_init,n,h,max_iter,**kwargs)
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    context = multiprocessing.get_context('spawn')
+    workers = [
+        context.Process(
+            target=work,
+            args=(str(root),),
+            kwargs={'worker': f'local{k}', 'lease': lease, 'poll': poll, 'n_threads': 1}
+        )
+        for k in range(n_workers)
+    ]
+    for proc in workers:
+        proc.start()
+    try:
+        return coordinate(root,lease,poll,timeout,workers)
+    finally:
+        for proc in workers:
+            proc.join(poll)
+            if proc.is_alive():
+                proc.terminate()
+
+
+def main(argv=None):
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(prog='python -m polysolver.distributed')
+    commands = parser.add_subparsers(dest='command',required=True)
+    new = commands.add_parser('create',help='Split a grid of models into shards.')
+    new.add_argument('root')
+    new.add_argument('--x-init',type=float,default=1e-10)
+    new.add_argument('--n',type=float,nargs=3,metavar=('START','STOP','NUM'),required=True)
+    new.add_argument('--h',type=float,nargs='+',required=True)
+    new.add_argument('--max-iter',type=int,default=100000)
+    new.add_argument('--shard-size',type=int,default=256)
+    new.add_argument('--profiles',action='store_true')
+    new.add_argument('--no-analytic',action='store_true')
+    new.add_argument('--impl',default='rust',choices=('rust', 'python'))
+    worker = commands.add_parser('work',help='Solve shards until the sweep is finished.')
+    worker.add_argument('root')
+    worker.add_argument('--name',default=None)
+    worker.add_argument('--lease',type=float,default=LEASE)
+    worker.add_argument('--threads',type=int,default=None)
+    worker.add_argument('--wait',type=float,default=None)
+    show = commands.add_parser('status',help='Count the shards in each state.')
+    show.add_argument('root')
+    gather = commands.add_parser('merge',help='Wait for the sweep and merge it.')
+    gather.add_argument('root')
+    gather.add_argument('output')
+    gather.add_argument('--lease',type=float,default=LEASE)
+    args = parser.parse_args(argv)
+    if args.command == 'create':
+        start, stop, num = args.n
+        settings = create(
+            args.root,
+            args.x_init,
+            np.linspace(start,stop,int(num))[:,None],
+            np.asarray(args.h)[None,:],
+            args.max_iter,
+            analytic=not args.no_analytic,
+            shard_size=args.shard_size,
+            profiles=args.profiles,
+            impl=args.impl
+        )
+        print(f'{settings["n_shards"]} shards in {args.root}')
+    elif args.command == 'work':
+        solved = work(args.root,args.name,args.lease,n_threads=args.threads,wait=args.wait)
+        print(f'solved {solved} shards')
+    elif args.command == 'status':
+        print(json.dumps(status(args.root)))
+    elif args.command == 'merge':
+        result = coordinate(args.root,args.lease)
+        ensemble = result.pop('ensemble',None)
+        np.savez(args.output,**result)
+        if ensemble is not None:
+            ensemble.save(str(Path(args.output).with_suffix('.ens')))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,400 @@
+"""
+Containers for many polytropes at once.
+
+The profiles of every member are stored back to back in flat arrays.
+Member ``i`` occupies ``offsets[i]:offsets[i+1]`` of ``x``, ``y`` and ``z``
+(a ragged layout), so that derived quantities can be computed for every
+member with a handful of NumPy calls instead of one Python call per star.
+"""
+import numpy as np
+
+from polysolver.polysolver import solve_batch, UNBOUNDED_N
+from polysolver.analysis import Star, SURFACE
+from polysolver import storage
+
+
+class StarEnsemble:
+    """
+    A collection of polytropic stars in a ragged layout.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        The concatenated x values. Recall that :math:`x=\\xi=\\frac{r}{r_n}`
+    y : np.ndarray
+        The concatenated y values. Recall that :math:`y=\\theta_n`
+    z : np.ndarray
+        The concatenated z values. Recall that :math:`z=\\frac{d\\theta_n}{d\\xi}`
+    offsets : np.ndarray
+        The start of each member in the flat arrays, followed by the
+        total length. Member ``i`` occupies ``offsets[i]:offsets[i+1]``.
+    n : np.ndarray
+        The index of each member.
+
+    Notes
+    -----
+    Every member must have at least three points, and the last point of
+    each member must have :math:`y \\leq 0` for the surface quantities
+    to be meaningful, just as for ``Star``. Unbounded members
+    (:math:`n \\geq 5`) have no surface and are reported as ``Star``
+    reports them.
+    """
+    def __init__(
+        self,
+        x:np.ndarray,
+        y:np.ndarray,
+        z:np.ndarray,
+        offsets:np.ndarray,
+        n:np.ndarray
+    ):
+        self.x = x
+        self.y = y
+        self.z = z
+        self.offsets = np.asarray(offsets,dtype=np.int64)
+        self.n = np.asarray(n,dtype=np.float64)
+        if len(self.offsets) != len(self.n)+1:
+            raise ValueError('offsets must have one more entry than n')
+        self._surface = {}
+    @classmethod
+    def from_soln(
+        cls,
+        x_init:float,
+        ns:np.ndarray,
+        h:float,
+        max_iter:int=1000,
+        impl:str='rust',
+        n_threads:int=None,
+        analytic:bool=True
+    ):
+        """
+        Create an ensemble from a batch solution to the Lane-Emden equation.
+
+        The members are sorted by index.
+
+        Parameters
+        ----------
+        x_init : float
+            The initial x value. Choose something small.
+        ns : np.ndarray
+            The indices of the polytropes.
+        h : float
+            The step size. This should be less than the pressure scale height.
+        max_iter : int, optional
+            The maximum number of iterations. The default is 1000.
+        impl : str, optional
+            The implementation to use. The default is 'rust'.
+        n_threads : int, optional
+            The number of threads used by the rust implementation.
+        analytic : bool, optional
+            Use the closed-form solution when one exists.
+            The default is True.
+
+        Returns
+        -------
+        StarEnsemble
+            The ensemble.
+        """
+        ns = np.sort(np.asarray(ns,dtype=np.float64))
+        x,y,z,offsets = solve_batch(x_init,ns,h,max_iter,impl,n_threads,analytic)
+        return cls(x,y,z,offsets,ns)
+    @classmethod
+    def from_stars(cls,stars):
+        """
+        Create an ensemble by copying a sequence of stars.
+
+        Parameters
+        ----------
+        stars : sequence of Star
+            The stars.
+
+        Returns
+        -------
+        StarEnsemble
+            The ensemble.
+        """
+        offsets = np.zeros(len(stars)+1,dtype=np.int64)
+        offsets[1:] = np.cumsum([len(star.x) for star in stars])
+        return cls(
+            np.concatenate([star.x for star in stars]),
+            np.concatenate([star.y for star in stars]),
+            np.concatenate([star.z for star in stars]),
+            offsets,
+            [star.n for star in stars]
+        )
+    def __len__(self)->int:
+        return len(self.n)
+    def __getitem__(self,key):
+        """
+        Get a single member as a ``Star``, or a contiguous range of
+        members as a ``StarEnsemble``. Neither copies the profiles.
+        """
+        if isinstance(key,slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError('Only contiguous slices are supported')
+            stop = max(start,stop)
+            lo = self.offsets[start]
+            hi = self.offsets[stop]
+            return StarEnsemble(
+                self.x[lo:hi],
+                self.y[lo:hi],
+                self.z[lo:hi],
+                self.offsets[start:stop+1] - lo,
+                self.n[start:stop]
+            )
+        i = range(len(self))[key]
+        lo = self.offsets[i]
+        hi = self.offsets[i+1]
+        return Star(self.x[lo:hi],self.y[lo:hi],self.z[lo:hi],self.n[i])
+    def select_n(self,n_min:float,n_max:float):
+        """
+        Get the members with :math:`n_{min} \\leq n \\leq n_{max}`
+        without copying the profiles.
+
+        Parameters
+        ----------
+        n_min : float
+            The smallest index to include.
+        n_max : float
+            The largest index to include.
+
+        Returns
+        -------
+        StarEnsemble
+            A view of the selected members.
+        """
+        if np.any(np.diff(self.n)<0):
+            raise ValueError('The members must be sorted by n to select by n')
+        start = np.searchsorted(self.n,n_min,side='left')
+        stop = np.searchsorted(self.n,n_max,side='right')
+        return self[start:stop]
+    @property
+    def lengths(self)->np.ndarray:
+        """
+        The number of points in each member.
+        """
+        return np.diff(self.offsets)
+    @property
+    def status(self)->np.ndarray:
+        """
+        Why the integration of each member ended, as ``Star.status``.
+        """
+        return np.where(
+            self.y[self.offsets[1:]-1] <= 0,
+            'surface',
+            np.where(self.n >= UNBOUNDED_N,'unbounded','stopped')
+        )
+    @property
+    def unbounded(self)->np.ndarray:
+        """
+        True for the members that never reach :math:`\\theta=0`.
+        """
+        return (self.y[self.offsets[1:]-1] > 0) & (self.n >= UNBOUNDED_N)
+    def _last_three(self,values:np.ndarray)->np.ndarray:
+        """
+        Interpolate ``values`` to :math:`y=0` through the last three points
+        of each member. This matches ``xi_1`` and ``theta_prime_xi1``.
+        Members with fewer than three points give NaN.
+        """
+        ok = self.lengths >= 3
+        ends = self.offsets[1:][ok]
+        u = np.stack([-self.y[ends-3],-self.y[ends-2],-self.y[ends-1]])
+        v = np.stack([values[ends-3],values[ends-2],values[ends-1]])
+        l0 = u[1]*u[2]/((u[0]-u[1])*(u[0]-u[2]))
+        l1 = u[0]*u[2]/((u[1]-u[0])*(u[1]-u[2]))
+        l2 = u[0]*u[1]/((u[2]-u[0])*(u[2]-u[1]))
+        out = np.full(len(self),np.nan)
+        out[ok] = l0*v[0] + l1*v[1] + l2*v[2]
+        return out
+    @property
+    def xi1(self)->np.ndarray:
+        """
+        Get the value of :math:`\\xi` at the surface of each member.
+        Infinite for unbounded members.
+        """
+        if 'xi1' in self._surface:
+            return self._surface['xi1']
+        return np.where(self.unbounded,np.inf,self._last_three(self.x))
+    @property
+    def theta_prime(self)->np.ndarray:
+        """
+        Get :math:`-\\frac{d\\theta_n}{d\\xi}` at the surface of each member.
+        Zero for unbounded members.
+        """
+        if 'theta_prime' in self._surface:
+            return self._surface['theta_prime']
+        return np.where(self.unbounded,0.,-self._last_three(self.z))
+    @property
+    def rho_c_over_rho(self)->np.ndarray:
+        """
+        Get the central density divided by the
+        mean density of each member.
+
+        Notes
+        -----
+        Like ``norm_mass``, the last point of each member is moved to the
+        surface and the mass is integrated with the trapezoid rule.
+        Infinite for unbounded members.
+        """
+        if 'rho_c_over_rho' in self._surface:
+            return self._surface['rho_c_over_rho']
+        starts = self.offsets[:-1]
+        ends = self.offsets[1:]
+        unbounded = self.unbounded
+        # Keep the last point of unbounded members, which are replaced below.
+        xi1 = np.where(unbounded,self.x[ends-1],self.xi1)
+        x = self.x.copy()
+        y = self.y.copy()
+        x[ends-1] = xi1
+        y[ends-1] = 0
+        n = np.repeat(self.n,self.lengths)
+        dm = 4*np.pi * x**2 * y**n
+        seg = 0.5*(dm[1:]+dm[:-1]) * np.diff(x)
+        seg[ends[:-1]-1] = 0
+        cum = np.concatenate([[0.],np.cumsum(seg)])
+        mass = cum[ends-1] - cum[starts]
+        return np.where(unbounded,np.inf,4/3*np.pi*xi1**3/mass)
+    def resample_y(self,x:np.ndarray)->np.ndarray:
+        """
+        Resample the y values of every member.
+
+        Uses cubic Hermite interpolation with the derivatives ``z``.
+        Like ``Star.resample_y``, points outside a profile are
+        extrapolated from its first or last interval.
+
+        Parameters
+        ----------
+        x : np.ndarray
+            The x values, either shape ``(m,)`` to use the same points
+            for every member or shape ``(len(self), m)``.
+
+        Returns
+        -------
+        np.ndarray
+            The y values, shape ``(len(self), m)``.
+        """
+        x = np.broadcast_to(np.asarray(x,dtype=np.float64),(len(self),np.shape(x)[-1]))
+        starts = self.offsets[:-1]
+        ends = self.offsets[1:]
+        # Shift each member so that the flat array is globally sorted.
+        span = np.ptp(self.x) + 1
+        member = np.repeat(np.arange(len(self)),self.lengths)
+        keys = self.x + member*span
+        query = x + np.arange(len(self))[:,None]*span
+        i = np.searchsorted(keys,query,side='right') - 1
+        i = np.clip(i,starts[:,None],ends[:,None]-2)
+        x0 = self.x[i]
+        dx = self.x[i+1] - x0
+        t = (x - x0)/dx
+        h00 = (1+2*t)*(1-t)**2
+        h10 = t*(1-t)**2
+        h01 = t**2*(3-2*t)
+        h11 = t**2*(t-1)
+        return (
+            h00*self.y[i] + h10*dx*self.z[i]
+            + h01*self.y[i+1] + h11*dx*self.z[i+1]
+        )
+    def to_bytes(self,dtype:str='<f8',x_encoding:str='auto')->bytes:
+        """
+        Serialise the ensemble in the layout of ``polysolver.storage``.
+        
+        The surface quantities of every member are computed once and
+        stored, unless some member does not reach its surface.
+        
+        Parameters
+        ----------
+        dtype : str, optional
+            '<f8' or '<f4' for the profiles. The default is '<f8'.
+        x_encoding : str, optional
+            How to store x, see ``storage.encode_x``. Uniform grids are
+            only used if every member has one. The default is 'auto'.
+        
+        Returns
+        -------
+        bytes
+            The buffer.
+        """
+        if dtype not in storage.DTYPES:
+            raise ValueError(f'dtype must be one of {storage.DTYPES}')
+        header = {'kind': 'ensemble', 'size': len(self)}
+        arrays = {'n': self.n, 'offsets': self.offsets}
+        metas = []
+        if x_encoding != 'raw':
+            for lo, hi in zip(self.offsets[:-1],self.offsets[1:]):
+                meta, _ = storage.encode_x(np.asarray(self.x[lo:hi]),None,'auto')
+                if meta['x_encoding'] != 'uniform':
+                    break
+                metas.append(meta)
+        if len(self) and len(metas) == len(self):
+            header['x_encoding'] = 'uniform'
+            header['x_rule'] = [meta['x_rule'] for meta in metas]
+            arrays['x0'] = np.array([meta['x0'] for meta in metas])
+            arrays['dx'] = np.array([meta['dx'] for meta in metas])
+        elif x_encoding == 'uniform':
+            raise ValueError('x is not a uniform grid for every member')
+        else:
+            header['x_encoding'] = 'raw'
+            arrays['x'] = np.asarray(self.x,dtype=dtype)
+        arrays['y'] = np.asarray(self.y,dtype=dtype)
+        arrays['z'] = np.asarray(self.z,dtype=dtype)
+        header['surface'] = []
+        if len(self) and np.all(self.y[self.offsets[1:]-1] <= 0):
+            header['surface'] = list(SURFACE)
+            for key in SURFACE:
+                arrays[key] = getattr(self,key)
+        return storage.pack(header,arrays)
+    @classmethod
+    def _from_storage(cls,header:dict,arrays:dict):
+        if header.get('kind') != 'ensemble':
+            raise ValueError(f'Expected an ensemble, got {header.get("kind")}')
+        offsets = arrays['offsets']
+        if header['x_encoding'] == 'uniform':
+            x = np.empty(offsets[-1])
+            for i, (lo, hi) in enumerate(zip(offsets[:-1],offsets[1:])):
+                x[lo:hi] = storage.decode_x(arrays['x0'][i],arrays['dx'][i],hi-lo,header['x_rule'][i])
+        else:
+            x = arrays['x']
+        ensemble = cls(x,arrays['y'],arrays['z'],offsets,arrays['n'])
+        ensemble._surface = {key: arrays[key] for key in header['surface']}
+        return ensemble
+    @classmethod
+    def from_bytes(cls,buffer):
+        """
+        Create an ensemble from the output of ``to_bytes`` without
+        copying the profiles.
+        
+        Parameters
+        ----------
+        buffer : bytes-like
+            The buffer.
+        
+        Returns
+        -------
+        StarEnsemble
+            The ensemble, with read-only arrays.
+        """
+        return cls._from_storage(*storage.unpack(buffer))
+    def save(self,path,dtype:str='<f8',x_encoding:str='auto'):
+        """
+        Write the ensemble to a file. See ``to_bytes``.
+        """
+        storage.save(path,self.to_bytes(dtype,x_encoding))
+    @classmethod
+    def load(cls,path,mmap:bool=True):
+        """
+        Read an ensemble written by ``save``.
+        
+        Parameters
+        ----------
+        path : str or Path
+            The file.
+        mmap : bool, optional
+            Map the profiles from the file instead of reading them.
+            The default is True.
+        
+        Returns
+        -------
+        StarEnsemble
+            The ensemble.
+        """
+        return cls._from_storage(*storage.load(path,mmap))
@@ -0,0 +1,140 @@
+"""
+Fit the polytropic index to an observed quantity.
+
+The surface quantities and their derivatives with respect to :math:`n`
+come from the forward sensitivity equations, so each Newton iteration
+costs a single solve.
+
+Recall that at the surface :math:`\\theta(\\xi_1; n) = 0`, so
+
+.. math::
+    \\frac{d\\xi_1}{dn} = -\\frac{\\partial\\theta/\\partial n}{\\theta^\\prime}
+
+and, because :math:`\\theta^{\\prime\\prime}(\\xi_1) = -\\frac{2}{\\xi_1}\\theta^\\prime(\\xi_1)`,
+
+.. math::
+    \\frac{d\\theta^\\prime(\\xi_1)}{dn} = \\frac{\\partial\\theta^\\prime}{\\partial n}
+    - \\frac{2}{\\xi_1}\\theta^\\prime\\frac{d\\xi_1}{dn}
+
+Finally :math:`\\rho_c/\\langle\\rho\\rangle = \\xi_1 / (-3\\theta^\\prime(\\xi_1))`.
+"""
+import numpy as np
+
+from polysolver.polysolver import solve_sensitivity
+
+TARGETS = ('xi1', 'theta_prime', 'rho_c_over_rho')
+N_MAX = 5.
+
+
+def surface_gradient(
+    x_init:float,
+    n:float,
+    h:float,
+    max_iter:int=100000,
+    impl:str='rust'
+):
+    """
+    Get the surface quantities and their derivatives with respect to n.
+
+    Parameters
+    ----------
+    x_init : float
+        The initial x value. Choose something small.
+    n : float
+        The index of the polytrope.
+    h : float
+        The step size.
+    max_iter : int, optional
+        The maximum number of iterations. The default is 100000.
+    impl : str, optional
+        The implementation to use. The default is 'rust'.
+
+    Returns
+    -------
+    values : dict
+        ``xi1``, ``theta_prime`` (:math:`-\\theta^\\prime(\\xi_1)`) and
+        ``rho_c_over_rho``.
+    gradients : dict
+        The derivative of each value with respect to n.
+    """
+    *_, surface = solve_sensitivity(x_init,n,h,max_iter,impl)
+    xi1, z1, s1, w1 = surface
+    if not np.isfinite(xi1):
+        raise RuntimeError(f'The surface was not reached for n={n} within max_iter steps')
+    dxi1 = -s1/z1
+    dz1 = w1 - 2/xi1*z1*dxi1
+    rho = xi1/(-3*z1)
+    values = {
+        'xi1': xi1,
+        'theta_prime': -z1,
+        'rho_c_over_rho': rho,
+    }
+    gradients = {
+        'xi1': dxi1,
+        'theta_prime': -dz1,
+        'rho_c_over_rho': rho*(dxi1/xi1 - dz1/z1),
+    }
+    return values, gradients
+
+
+def fit_n(
+    target:str,
+    value:float,
+    n0:float=1.5,
+    x_init:float=1e-10,
+    h:float=1e-3,
+    max_iter:int=100000,
+    impl:str='rust',
+    rtol:float=1e-10,
+    max_newton:int=20
+)->float:
+    """
+    Find the index of the polytrope that has a given surface quantity.
+
+    Parameters
+    ----------
+    target : str
+        The quantity to match. One of ``TARGETS``.
+    value : float
+        The value of the quantity.
+    n0 : float, optional
+        The initial guess. The default is 1.5.
+    x_init : float, optional
+        The initial x value. The default is 1e-10.
+    h : float, optional
+        The step size. The default is 1e-3.
+    max_iter : int, optional
+        The maximum number of iterations of each solve. The default is 100000.
+    impl : str, optional
+        The implementation to use. The default is 'rust'.
+    rtol : float, optional
+        The relative tolerance on the quantity. The default is 1e-10.
+    max_newton : int, optional
+        The maximum number of Newton iterations. The default is 20.
+
+    Returns
+    -------
+    float
+        The index of the polytrope.
+
+    Notes
+    -----
+    The Newton iteration is done on the logarithm of the quantity,
+    which is much closer to linear in n. Steps that would leave
+    :math:`0 \\leq n < 5` are halved.
+    """
+    if target not in TARGETS:
+        raise ValueError(f'target must be one of {TARGETS}')
+    if value <= 0:
+        raise ValueError('value must be positive')
+    n = n0
+    for _ in range(max_newton):
+        values, gradients = surface_gradient(x_init,n,h,max_iter,impl)
+        resid = np.log(values[target]) - np.log(value)
+        if abs(resid) <= rtol:
+            return n
+        step = -resid*values[target]/gradients[target]
+        while not 0 <= n + step < N_MAX:
+            step /= 2
+        n += step
+    raise RuntimeError(f'fit_n did not converge after {max_newton} iterations')
@@ -0,0 +1,111 @@
+"""
+Structural integrals that can be accumulated during the integration.
+
+All quantities are in units of the central density and the scale length:
+
+.. math::
+    \\frac{M}{\\rho_c r_n^3} = \\int_0^{\\xi_1} 4\\pi\\xi^2\\theta^n d\\xi
+
+.. math::
+    \\frac{W}{G \\rho_c^2 r_n^5} = -\\int_0^{\\xi_1} \\frac{m(\\xi)}{\\xi} 4\\pi\\xi^2\\theta^n d\\xi
+    = \\int_0^{\\xi_1} 16\\pi^2\\xi^3\\theta^\\prime\\theta^n d\\xi
+
+.. math::
+    \\frac{I}{\\rho_c r_n^5} = \\int_0^{\\xi_1} \\frac{8\\pi}{3}\\xi^4\\theta^n d\\xi
+
+where we have used :math:`m(\\xi) = -4\\pi\\xi^2\\theta^\\prime`.
+The mean density :math:`\\langle\\rho\\rangle/\\rho_c` is derived from the mass.
+"""
+from typing import Callable, Dict, List, Sequence
+import numpy as np
+
+INTEGRALS = ('mass', 'potential_energy', 'moment_of_inertia')
+DERIVED = {'mean_density': ('mass',)}
+
+
+def get_integrand(name:str, n:float) -> Callable:
+    """
+    Get the integrand of a structural integral.
+    
+    Parameters
+    ----------
+    name : str
+        The name of the integral. One of ``INTEGRALS``.
+    n : float
+        The index of the polytrope.
+    
+    Returns
+    -------
+    Callable
+        The integrand, with the same signature as the derivatives.
+    """
+    if name == 'mass':
+        return lambda x, y, z: 4*np.pi * x**2 * abs(y)**n
+    if name == 'potential_energy':
+        return lambda x, y, z: 16*np.pi**2 * x**3 * z * abs(y)**n
+    if name == 'moment_of_inertia':
+        return lambda x, y, z: 8*np.pi/3 * x**4 * abs(y)**n
+    raise ValueError(f'Unknown integral {name}')
+
+
+def get_base(names:Sequence[str]) -> List[str]:
+    """
+    Get the integrals the engines must accumulate to provide ``names``.
+    
+    Parameters
+    ----------
+    names : sequence of str
+        The requested integrals, including derived quantities.
+    
+    Returns
+    -------
+    list of str
+        The integrals to accumulate, without duplicates.
+    """
+    base = []
+    for name in names:
+        if name in DERIVED:
+            required = DERIVED[name]
+        elif name in INTEGRALS:
+            required = (name,)
+        else:
+            raise ValueError(f'Unknown integral {name}')
+        for req in required:
+            if req not in base:
+                base.append(req)
+    return base
+
+
+def get_values(
+    names:Sequence[str],
+    base:Sequence[str],
+    totals:Sequence[float],
+    xi1:float
+) -> Dict[str,float]:
+    """
+    Collect the requested integrals, computing derived quantities.
+    
+    Parameters
+    ----------
+    names : sequence of str
+        The requested integrals.
+    base : sequence of str
+        The accumulated integrals, as returned by ``get_base``.
+    totals : sequence of float
+        The accumulated values, in the order of ``base``.
+    xi1 : float
+        The surface.
+    
+    Returns
+    -------
+    dict
+        The value of each requested integral.
+    """
+    values = dict(zip(base, [float(t) for t in totals]))
+    out = {}
+    for name in names:
+        if name == 'mean_density':
+            out[name] = values['mass'] / (4/3*np.pi*xi1**3)
+        else:
+            out[name] = values[name]
+    return out
@@ -0,0 +1,233 @@
+"""
+Adiabatic radial pulsation modes of polytropes.
+
+The linear adiabatic wave equation for :math:`\\zeta=\\delta r/r` is
+
+.. math::
+    -\\frac{d}{d\\xi}\\left(\\Gamma_1\\theta^{n+1}\\xi^4\\frac{d\\zeta}{d\\xi}\\right)
+    - (3\\Gamma_1-4)(n+1)\\xi^3\\theta^n\\frac{d\\theta}{d\\xi}\\zeta
+    = \\Omega^2 (n+1)\\theta^n\\xi^4\\zeta
+
+with :math:`\\Omega^2 = \\omega^2/4\\pi G\\rho_c`. It is discretised with
+linear finite elements and a lumped (diagonal) mass matrix between the
+centre and the surface, where the regularity and free-surface conditions
+are natural, so the problem is a symmetric tridiagonal eigenproblem.
+Frequencies are returned as :math:`\\omega^2 R^3/GM`, for which a
+homogeneous star (:math:`n=0`) has a fundamental mode of :math:`3\\Gamma_1-4`.
+"""
+import numpy as np
+from scipy.linalg import eigh_tridiagonal
+from scipy.sparse import diags
+from scipy.sparse.linalg import eigsh
+
+GAMMA1 = 5/3
+METHODS = ('banded', 'arpack')
+
+
+def pulsation_matrix(xi:np.ndarray,theta:np.ndarray,n,gamma1):
+    """
+    Assemble the symmetric tridiagonal form of the wave equation.
+
+    Every argument broadcasts along the leading axes, so many models
+    (or many :math:`\\Gamma_1`) are assembled at once.
+
+    Parameters
+    ----------
+    xi : np.ndarray
+        The grid, from the centre to the surface, shape ``(..., J)``.
+    theta : np.ndarray
+        :math:`\\theta` on the grid, zero at the surface.
+    n : float or np.ndarray
+        The index, shape ``(...)``.
+    gamma1 : float or np.ndarray
+        The adiabatic exponent, shape ``(...)``.
+
+    Returns
+    -------
+    diag : np.ndarray
+        The diagonal, shape ``(..., J)``.
+    off : np.ndarray
+        The off-diagonal, shape ``(..., J-1)``.
+    mass : np.ndarray
+        The lumped mass matrix. The eigenvectors of the tridiagonal
+        matrix divided by :math:`\\sqrt{mass}` are :math:`\\zeta`.
+    """
+    n = np.asarray(n,dtype=np.float64)[...,None]
+    gamma1 = np.asarray(gamma1,dtype=np.float64)[...,None]
+    theta = np.clip(theta,0,None)
+    pressure = theta**(n+1)
+    stiff = gamma1*pressure*xi**4
+    inertia = (n+1)*theta**n*xi**4
+    h = np.diff(xi,axis=-1)
+    mid = 0.5*(xi[...,1:] + xi[...,:-1])
+    stiff_e = 0.5*(stiff[...,1:] + stiff[...,:-1])/h
+    mass_e = 0.25*(inertia[...,1:] + inertia[...,:-1])*h
+    # (n+1) theta^n theta' is the slope of theta^(n+1) over the element.
+    buoy_e = -0.5*(3*gamma1-4)*mid**3*np.diff(pressure,axis=-1)
+    def nodes(per_element):
+        pad = [(0,0)]*(per_element.ndim-1)
+        return np.pad(per_element,pad+[(1,0)]) + np.pad(per_element,pad+[(0,1)])
+    mass = nodes(mass_e)
+    scale = np.sqrt(mass)
+    diag = (nodes(stiff_e) + nodes(buoy_e))/mass
+    off = -stiff_e/(scale[...,1:]*scale[...,:-1])
+    return diag, off, mass
+
+
+def _lowest(diag:np.ndarray,off:np.ndarray,mass:np.ndarray,k:int,method:str,vectors:bool):
+    """
+    The lowest ``k`` eigenpairs of one matrix from ``pulsation_matrix``.
+    """
+    if method == 'banded':
+        return eigh_tridiagonal(
+            diag,off,eigvals_only=not vectors,select='i',select_range=(0,k-1)
+        )
+    if method == 'arpack':
+        # The stiffness is positive semi-definite, so the buoyancy term
+        # alone bounds the spectrum from below. Shifting just under that
+        # makes the nearest modes the lowest, unstable ones included.
+        stiff_e = -off*np.sqrt(mass[1:]*mass[:-1])
+        stiff = np.pad(stiff_e,(1,0)) + np.pad(stiff_e,(0,1))
+        sigma = min(np.min(diag - stiff/mass),0.) - 1e-2
+        matrix = diags([off,diag,off],[-1,0,1],format='csc')
+        result = eigsh(matrix,k=k,sigma=sigma,which='LM',return_eigenvectors=vectors)
+        if not vectors:
+            return np.sort(result)
+        order = np.argsort(result[0])
+        return result[0][order], result[1][:,order]
+    raise ValueError(f'method must be one of {METHODS}')
+
+
+def _solve(xi,theta,n,gamma1,xi1,theta_prime,k,method,vectors):
+    """
+    Solve every model of a batch assembled by ``pulsation_matrix``.
+    """
+    diag, off, mass = pulsation_matrix(xi,theta,n,gamma1)
+    shape = diag.shape[:-1]
+    diag = diag.reshape(-1,diag.shape[-1])
+    off = off.reshape(-1,off.shape[-1])
+    to_dynamical = np.broadcast_to(xi1/theta_prime,shape).reshape(-1)
+    omega2 = np.empty((len(diag),k))
+    zeta = np.empty((len(diag),k,diag.shape[-1])) if vectors else None
+    mass = np.broadcast_to(mass,shape+mass.shape[-1:]).reshape(len(diag),-1)
+    for i in range(len(diag)):
+        result = _lowest(diag[i],off[i],mass[i],k,method,vectors)
+        if vectors:
+            values, vecs = result
+            vecs = (vecs/np.sqrt(mass[i])[:,None]).T
+            zeta[i] = vecs/vecs[:,-1:]
+        else:
+            values = result
+        omega2[i] = values*to_dynamical[i]
+    omega2 = omega2.reshape(shape+(k,))
+    if vectors:
+        return omega2, zeta.reshape(shape+(k,-1))
+    return omega2
+
+
+def radial_modes(
+    star,
+    k:int=3,
+    gamma1=GAMMA1,
+    n_grid:int=1000,
+    method:str='banded',
+    vectors:bool=False
+):
+    """
+    Get the lowest radial pulsation modes of a star.
+
+    Parameters
+    ----------
+    star : Star
+        The star. It must reach its surface.
+    k : int, optional
+        The number of modes. The default is 3.
+    gamma1 : float or np.ndarray, optional
+        The adiabatic exponent. An array gives the modes for each value.
+        The default is ``GAMMA1``.
+    n_grid : int, optional
+        The number of elements of a uniform grid in :math:`\\xi`, filled
+        from the dense output of the star. None uses the points of the
+        profile itself. The default is 1000.
+    method : str, optional
+        'banded' for the LAPACK tridiagonal solver or 'arpack' for a
+        sparse shift-invert Lanczos solver. The default is 'banded'.
+    vectors : bool, optional
+        Also return the eigenfunctions. The default is False.
+
+    Returns
+    -------
+    omega2 : np.ndarray
+        :math:`\\omega^2 R^3/GM` of each mode, shape ``(k,)``, or
+        ``(len(gamma1), k)`` for an array of ``gamma1``.
+    xi : np.ndarray
+        The grid. Only if ``vectors``.
+    zeta : np.ndarray
+        :math:`\\delta r/r` of each mode on the grid, 1 at the surface.
+        Only if ``vectors``.
+
+    Examples
+    --------
+    >>> star = Star.from_soln(1e-10, 3, 1e-3, max_iter=100000)
+    >>> radial_modes(star, k=2)
+    """
+    if star.status != 'surface':
+        raise ValueError('The star must reach its surface')
+    dense = star.dense
+    xi1 = dense.xi1
+    if n_grid is None:
+        inside = np.asarray(star.x)[np.asarray(star.y) > 0]
+        if xi1 - inside[-1] < 0.5*(inside[-1] - inside[-2]):
+            inside = inside[:-1]
+        xi = np.append(inside,xi1)
+    else:
+        xi = np.linspace(0,xi1,n_grid+1)
+    theta = dense(np.clip(xi,star.x[0],xi1))
+    theta[-1] = 0
+    result = _solve(xi,theta,star.n,gamma1,xi1,-dense.theta_prime(xi1),k,method,vectors)
+    if vectors:
+        return result[0], xi, result[1]
+    return result
+
+
+def radial_modes_ensemble(
+    ensemble,
+    k:int=3,
+    gamma1=GAMMA1,
+    n_grid:int=1000,
+    method:str='banded'
+)->np.ndarray:
+    """
+    Get the lowest radial pulsation modes of every member of an ensemble.
+
+    The profiles are resampled onto a uniform grid for every member at
+    once and the matrices are assembled together; only the eigensolves
+    are done member by member.
+
+    Parameters
+    ----------
+    ensemble : StarEnsemble
+        The stars. Every member must reach its surface.
+    k : int, optional
+        The number of modes. The default is 3.
+    gamma1 : float or np.ndarray, optional
+        The adiabatic exponent, or one for each member.
+        The default is ``GAMMA1``.
+    n_grid : int, optional
+        The number of elements of each grid. The default is 1000.
+    method : str, optional
+        See ``radial_modes``. The default is 'banded'.
+
+    Returns
+    -------
+    np.ndarray
+        :math:`\\omega^2 R^3/GM`, shape ``(len(ensemble), k)``.
+    """
+    if np.any(ensemble.y[ensemble.offsets[1:]-1] > 0):
+        raise ValueError('Every member must reach its surface')
+    xi1 = ensemble.xi1
+    xi = xi1[:,None]*np.linspace(0,1,n_grid+1)
+    first = ensemble.x[ensemble.offsets[:-1]]
+    theta = ensemble.resample_y(np.maximum(xi,first[:,None]))
+    theta[:,-1] = 0
+    return _solve(xi,theta,ensemble.n,gamma1,xi1,ensemble.theta_prime,k,method,False)
@@ -25,11 +25,89 @@ We are left with:
 We will use a fourth-order Runge-Kutta method.
 
 """
+import os
+import warnings
+from time import perf_counter
 from typing import Tuple, List
 import numpy as np
 
 from polysolver import runge_kutta
 from polysolver import derivatives
+from polysolver import integrals as _integrals
+from polysolver.dense import DenseSolution
+
+SURFACE_NEWTON_ITER = 8
+ANALYTIC_INDICES = (0, 1, 5)
+UNBOUNDED_N = 5.
+"""Lane-Emden solutions with :math:`n \\geq 5` never reach :math:`\\theta=0`."""
+UNBOUNDED_XI = 20.
+"""Where integrations of unbounded solutions stop."""
+CHECK_EVERY = 10000
+"""Steps between checks for a timeout, progress or cancellation."""
+SENSITIVITY_TAIL = 10
+"""For :math:`0<n<1`, the sensitivities are integrated in :math:`\\theta^n`
+once the surface is this many steps away."""
+SENSITIVITY_TAIL_STEPS = 64
+"""The first step in :math:`\\theta^n` is this fraction of the way to the surface."""
+SENSITIVITY_TAIL_RTOL = 1e-12
+"""The relative error allowed per step in :math:`\\theta^n`."""
+SENSITIVITY_TAIL_MAX_STEPS = 100000
+"""The most steps in :math:`\\theta^n`, after which the surface is NaN."""
+
+
+class SolveInterrupted(KeyboardInterrupt):
+    """
+    A solve with a ``timeout``, ``progress`` or ``cancel`` was
+    interrupted with Ctrl-C. The profile up to the last check is kept in
+    ``x``, ``y`` and ``z`` and can be continued with ``solve_from``.
+    """
+    def __init__(self,x:np.ndarray,y:np.ndarray,z:np.ndarray):
+        super().__init__(f'The solve was interrupted at x={x[-1]:.6g}')
+        self.x = x
+        self.y = y
+        self.z = z
+
+
+def get_x_max(n:float)->float:
+    """
+    Get the largest x to integrate the Lane-Emden equation to.
+    
+    Parameters
+    ----------
+    n : float
+        The index of the polytrope.
+    
+    Returns
+    -------
+    float
+        ``UNBOUNDED_XI`` if the solution has no surface, otherwise infinity.
+    """
+    return UNBOUNDED_XI if n >= UNBOUNDED_N else np.inf
+
+
+def get_status(y:np.ndarray,n:float)->str:
+    """
+    Get the reason an integration of the Lane-Emden equation ended.
+    
+    Parameters
+    ----------
+    y : np.ndarray
+        The y values.
+    n : float
+        The index of the polytrope.
+    
+    Returns
+    -------
+    str
+        'surface' if the surface was reached, 'unbounded' if the solution
+        has no surface (:math:`n \\geq 5`) and 'stopped' otherwise, which
+        means ``max_iter`` or a stop condition ended the integration.
+    """
+    if y[-1] <= 0:
+        return 'surface'
+    if n >= UNBOUNDED_N:
+        return 'unbounded'
+    return 'stopped'
 
 
 def solve_python(x_init,n,h,max_iter=1000)->Tuple[List,List]:
@@ -47,16 +125,44 @@ def solve_python(x_init,n,h,max_iter=1000)->Tuple[List,List]:
     max_iter : int, optional
         The maximum number of iterations. The default is 1000.
     """
+    return solve_python_equation('lane_emden',[n],x_init,h,max_iter)
+
+
+def solve_python_equation(name,params,x_init,h,max_iter=1000,start=None):
+    """
+    Solve any equation family from the registry using a
+    fourth-order Runge-Kutta method.
+    
+    Parameters
+    ----------
+    name : str
+        The equation family. See ``derivatives.get_equation``.
+    params : sequence of float
+        The parameters of the family.
+    x_init : float
+        The initial x value.
+    h : float
+        The step size.
+    max_iter : int, optional
+        The maximum number of iterations. The default is 1000.
+    start : tuple, optional
+        The y and z values at ``x_init``, to continue an earlier run.
+        The default is the centre of the model.
+    """
+    zprime, y_init, y_surface = derivatives.get_equation(name,params)
+    x_max = get_x_max(params[0]) if name == 'lane_emden' else np.inf
     x_prev = x_init
-    y_prev = 1
-    z_prev = 0
+    if start is None:
+        y_prev = y_init
+        z_prev = 0
+    else:
+        y_prev, z_prev = start
     yprime = derivatives.get_yprime()
-    zprime = derivatives.get_zprime(n)
     n_iter = 0
     xs = []
     ys = []
     zs = []
-    while y_prev > 0 and n_iter < max_iter:
+    while y_prev > y_surface and n_iter < max_iter and x_prev < x_max:
         n_iter += 1
         xs.append(x_prev)
         ys.append(y_prev)
@@ -76,6 +182,242 @@ def solve_python(x_init,n,h,max_iter=1000)->Tuple[List,List]:
     return np.array(xs), np.array(ys), np.array(zs)
 
 
+def surface_step(yprime,zprime,x,y,z,h,y_next)->float:
+    """
+    Find the step from ``(x, y, z)`` at which a single Runge-Kutta
+    step lands on :math:`y=0`, given that a full step of ``h``
+    ends at ``y_next <= 0``.
+    
+    Parameters
+    ----------
+    yprime : Callable
+        The :math:`\\frac{dy}{dx}` function.
+    zprime : Callable
+        The :math:`\\frac{dz}{dx}` function.
+    x : float
+        The x value.
+    y : float
+        The y value.
+    z : float
+        The z value.
+    h : float
+        The step size.
+    y_next : float
+        The y value after a full step.
+    
+    Returns
+    -------
+    float
+        The step size that ends on the surface.
+    """
+    s = h*y/(y-y_next)
+    for _ in range(SURFACE_NEWTON_ITER):
+        _, y_s, z_s = runge_kutta.get_next_xyz(yprime,zprime,x,y,z,s)
+        if z_s == 0:
+            break
+        ds = y_s/z_s
+        s = min(max(s-ds,0),h)
+        if abs(ds) <= 1e-15*h:
+            break
+    return s
+
+
+STOPS = ('xi', 'theta', 'mass')
+
+
+def stop_value(kind:str,target:float,x:float,y:float,z:float)->float:
+    """
+    Evaluate a stop condition. The value is positive before the event
+    and non-positive once it has happened.
+    
+    Parameters
+    ----------
+    kind : str
+        One of ``STOPS``. 'mass' compares the enclosed mass
+        :math:`-x^2 z` with ``target``.
+    target : float
+        The value at which to stop.
+    x, y, z : float
+        The state.
+    """
+    if kind == 'xi':
+        return target - x
+    if kind == 'theta':
+        return y - target
+    if kind == 'mass':
+        return target + x*x*z
+    raise ValueError(f'kind must be one of {STOPS}')
+
+
+def event_step(yprime,zprime,kind,target,x,y,z,h)->float:
+    """
+    Find the step from ``(x, y, z)`` at which a single Runge-Kutta
+    step lands on a stop condition, given that a full step of ``h``
+    passes it. Uses the Illinois variant of regula falsi.
+    
+    Returns
+    -------
+    float
+        The step size that ends on the event.
+    """
+    if kind == 'xi':
+        return min(max(target-x,0),h)
+    def g(step):
+        return stop_value(kind,target,*runge_kutta.get_next_xyz(yprime,zprime,x,y,z,step))
+    a, b = 0., h
+    ga, gb = stop_value(kind,target,x,y,z), g(h)
+    side = 0
+    for _ in range(60):
+        c = (a*gb - b*ga)/(gb - ga)
+        gc = g(c)
+        if gc > 0:
+            a, ga = c, gc
+            if side == 1:
+                gb *= 0.5
+            side = 1
+        else:
+            b, gb = c, gc
+            if side == -1:
+                ga *= 0.5
+            side = -1
+        if gc == 0 or abs(b-a) <= 1e-15*h:
+            break
+    return b
+
+
+def solve_python_until(x_init,n,h,max_iter=1000,stops=(),start=None,x_max=None):
+    """
+    Solve the Lane-Emden equation until the surface or the first
+    stop condition, whichever comes first.
+    
+    Parameters
+    ----------
+    x_init : float
+        The initial x value.
+    n : float
+        The index of the polytrope.
+    h : float
+        The step size.
+    max_iter : int, optional
+        The maximum number of iterations. The default is 1000.
+    stops : sequence of tuple, optional
+        ``(kind, target)`` pairs, see ``stop_value``.
+    start : tuple, optional
+        ``(y, z)`` at ``x_init``. The default is the centre, ``(1, 0)``.
+    x_max : float, optional
+        Stop at this x. The default is ``get_x_max(n)``.
+    
+    Returns
+    -------
+    x, y, z : np.ndarray
+        The profile. The last point is exactly on the event.
+    hit : str or None
+        The kind of the stop that ended the integration.
+    """
+    yprime = derivatives.get_yprime()
+    zprime = derivatives.get_zprime(n)
+    y_start, z_start = (1., 0.) if start is None else map(float,start)
+    x_prev, y_prev, z_prev = x_init, y_start, z_start
+    xs = [x_prev]
+    ys = [y_prev]
+    zs = [z_prev]
+    for kind, target in stops:
+        if stop_value(kind,target,x_prev,y_prev,z_prev) <= 0:
+            return np.array(xs), np.array(ys), np.array(zs), kind
+    if x_max is None:
+        x_max = get_x_max(n)
+    n_iter = 0
+    while y_prev > 0 and n_iter < max_iter and x_prev < x_max:
+        n_iter += 1
+        x_next, y_next, z_next = runge_kutta.get_next_xyz(yprime,zprime,x_prev,y_prev,z_prev,h)
+        first = None
+        for kind, target in stops:
+            if stop_value(kind,target,x_next,y_next,z_next) <= 0:
+                step = event_step(yprime,zprime,kind,target,x_prev,y_prev,z_prev,h)
+                if first is None or step < first[0]:
+                    first = (step, kind)
+        if first is not None:
+            step, kind = first
+            _, y_event, z_event = runge_kutta.get_next_xyz(yprime,zprime,x_prev,y_prev,z_prev,step)
+            xs.append(x_prev + step)
+            ys.append(y_event)
+            zs.append(z_event)
+            return np.array(xs), np.array(ys), np.array(zs), kind
+        x_prev, y_prev, z_prev = x_next, y_next, z_next
+        xs.append(x_prev)
+        ys.append(y_prev)
+        zs.append(z_prev)
+    return np.array(xs), np.array(ys), np.array(zs), None
+
+
+def solve_python_integrals(x_init,n,h,max_iter=1000,integrals=(),keep_profile=True):
+    """
+    Solve the Lane-Emden equation while accumulating structural integrals.
+    
+    Parameters
+    ----------
+    x_init : float
+        The initial x value.
+    n : float
+        The index of the polytrope.
+    h : float
+        The step size.
+    max_iter : int, optional
+        The maximum number of iterations. The default is 1000.
+    integrals : sequence of str, optional
+        The integrals to accumulate. See ``polysolver.integrals.INTEGRALS``.
+    keep_profile : bool, optional
+        If False, only the last three points of the profile are kept.
+    
+    Returns
+    -------
+    x, y, z : np.ndarray
+        The profile.
+    totals : np.ndarray
+        The integrals evaluated at the surface.
+    xi1 : float
+        The surface, or NaN if ``max_iter`` is reached first.
+    """
+    x_prev = x_init
+    y_prev = 1
+    z_prev = 0
+    yprime = derivatives.get_yprime()
+    zprime = derivatives.get_zprime(n)
+    quads = [_integrals.get_integrand(name,n) for name in integrals]
+    totals = [0.]*len(quads)
+    xi1 = np.nan
+    n_iter = 0
+    xs = [x_prev]
+    ys = [y_prev]
+    zs = [z_prev]
+    x_max = get_x_max(n)
+    while y_prev > 0 and n_iter < max_iter and x_prev < x_max:
+        n_iter += 1
+        x_next, y_next, z_next, dq = runge_kutta.get_next_xyz_quad(
+            yprime,
+            zprime,
+            quads,
+            x_prev,
+            y_prev,
+            z_prev,
+            h
+        )
+        if y_next <= 0:
+            step = surface_step(yprime,zprime,x_prev,y_prev,z_prev,h,y_next)
+            *_, dq = runge_kutta.get_next_xyz_quad(
+                yprime,zprime,quads,x_prev,y_prev,z_prev,step
+            )
+            xi1 = x_prev + step
+        totals = [t+d for t,d in zip(totals,dq)]
+        x_prev, y_prev, z_prev = x_next, y_next, z_next
+        if not keep_profile and len(xs) == 3:
+            del xs[0], ys[0], zs[0]
+        xs.append(x_prev)
+        ys.append(y_prev)
+        zs.append(z_prev)
+    return np.array(xs), np.array(ys), np.array(zs), np.array(totals), xi1
+
+
 def solve_rust(
     x_init:float,
     n:float,
@@ -102,41 +444,1393 @@ def solve_rust(
     x,y,z = polysolver_rust.solve(x_init,n,h,max_iter)
     return np.array(x), np.array(y), np.array(z)
 
-def solve(
+SCIPY_METHODS = ('DOP853', 'LSODA', 'Radau', 'RK45', 'BDF')
+
+
+def solve_scipy(
     x_init:float,
     n:float,
     h:float,
     max_iter:int=1000,
-    impl:str='rust'
+    method:str='DOP853',
+    rtol:float=1e-10
 ):
     """
-    Solve the Lane-Emden equation using a fourth-order Runge-Kutta method.
+    Solve the Lane-Emden equation with ``scipy.integrate.solve_ivp``.
+    
+    The integration is adaptive and ends exactly on the surface with a
+    terminal event at :math:`\\theta=0`. The dense output of the
+    integrator is evaluated on the same grid of ``h`` the fixed-step
+    engines use, and the surface is added as the last point.
     
     Parameters
     ----------
     x_init : float
-        The initial x value. Choose something small.
+        The initial x value.
     n : float
         The index of the polytrope.
     h : float
-        The step size. This should be less than the pressure scale height.
+        The spacing of the output grid.
     max_iter : int, optional
-        The maximum number of iterations. The default is 1000.
+        The output grid ends at ``x_init + h*max_iter``, as for the
+        other engines. The default is 1000.
+    method : str, optional
+        The integrator, one of ``SCIPY_METHODS``. The default is 'DOP853'.
+    rtol : float, optional
+        The relative tolerance; the absolute tolerance is 100 times
+        smaller. The default is 1e-10.
+    
+    Returns
+    -------
+    x, y, z : np.ndarray
+        The profile.
+    """
+    from scipy.integrate import solve_ivp
+    if method not in SCIPY_METHODS:
+        raise ValueError(f'method must be one of {SCIPY_METHODS}')
+    zprime = derivatives.get_zprime_vectorized(n)
+    def rhs(x,state):
+        return np.stack([state[1],zprime(x,state[0],state[1])])
+    def surface(x,state):
+        return state[0]
+    surface.terminal = True
+    surface.direction = -1
+    x_end = min(x_init + h*max_iter,get_x_max(n))
+    soln = solve_ivp(
+        rhs,(x_init,x_end),[1.,0.],method=method,rtol=rtol,atol=1e-2*rtol,
+        events=surface,dense_output=True,vectorized=True
+    )
+    if not soln.success:
+        raise RuntimeError(soln.message)
+    # Rounding in (x_end - x_init)/h must not drop the last point.
+    size = min(max_iter,int((soln.t[-1] - x_init)/h + 1e-9)) + 1
+    grid = x_init + h*np.arange(size)
+    grid = grid[grid <= soln.t[-1]]
+    y, z = soln.sol(grid)
+    if soln.status == 1:
+        x_surface = soln.t_events[0][0]
+        z_surface = soln.y_events[0][0][1]
+        if grid[-1] < x_surface:
+            grid = np.append(grid,x_surface)
+            y = np.append(y,0.)
+            z = np.append(z,z_surface)
+        else:
+            y[-1], z[-1] = 0., z_surface
+    return grid, y, z
+
+
+def solve_out(
+    x_init:float,
+    n:float,
+    h:float,
+    max_iter:int,
+    out:tuple,
+    impl:str='rust'
+)->int:
+    """
+    Solve the Lane-Emden equation into preallocated arrays.
+    
+    Parameters
+    ----------
+    x_init : float
+        The initial x value.
+    n : float
+        The index of the polytrope.
+    h : float
+        The step size.
+    max_iter : int
+        The maximum number of iterations. The integration also stops
+        when the arrays are full.
+    out : tuple of np.ndarray
+        Writable, C-contiguous, 1-d float64 arrays for x, y and z that
+        do not share memory.
     impl : str, optional
         The implementation to use. The default is 'rust'.
     
     Returns
     -------
+    int
+        The number of points written.
+    """
+    x, y, z = out
+    for arr in out:
+        if not (
+            isinstance(arr,np.ndarray) and arr.dtype == np.float64 and arr.ndim == 1
+            and arr.flags.c_contiguous and arr.flags.writeable
+        ):
+            raise ValueError('out must be three writable, contiguous 1-d float64 arrays')
+    if np.shares_memory(x,y) or np.shares_memory(x,z) or np.shares_memory(y,z):
+        raise ValueError('out arrays must not overlap')
+    if impl == 'rust':
+        # pylint: disable-next=no-name-in-module
+        from polysolver import polysolver_rust
+        length, _ = polysolver_rust.solve_out(x_init,n,h,max_iter,x,y,z)
+        return length
+    if impl != 'python':
+        raise NotImplementedError('impl must be "rust" or "python"')
+    capacity = min(len(x),len(y),len(z))
+    if capacity == 0:
+        return 0
+    yprime = derivatives.get_yprime()
+    zprime = derivatives.get_zprime(n)
+    x_prev, y_prev, z_prev = float(x_init), 1., 0.
+    x[0], y[0], z[0] = x_prev, y_prev, z_prev
+    length = 1
+    x_max = get_x_max(n)
+    while y_prev > 0 and length <= max_iter and length < capacity and x_prev < x_max:
+        x_prev, y_prev, z_prev = runge_kutta.get_next_xyz(
+            yprime,
+            zprime,
+            x_prev,
+            y_prev,
+            z_prev,
+            h
+        )
+        x[length], y[length], z[length] = x_prev, y_prev, z_prev
+        length += 1
+    return length
+
+def solve_rust_integrals(
+    x_init:float,
+    n:float,
+    h:float,
+    max_iter:int=1000,
+    integrals=(),
+    keep_profile:bool=True
+):
+    """
+    Solve the Lane-Emden equation while accumulating structural integrals.
+    Implemented in rust.
+    
+    Parameters
+    ----------
+    x_init : float
+        The initial x value.
+    n : float
+        The index of the polytrope.
+    h : float
+        The step size.
+    max_iter : int, optional
+        The maximum number of iterations. The default is 1000.
+    integrals : sequence of str, optional
+        The integrals to accumulate. See ``polysolver.integrals.INTEGRALS``.
+    keep_profile : bool, optional
+        If False, only the last three points of the profile are kept.
+    """
+    # pylint: disable-next=no-name-in-module
+    from polysolver import polysolver_rust
+    x,y,z,totals,xi1 = polysolver_rust.solve_integrals(
+        x_init,n,h,max_iter,list(integrals),keep_profile
+    )
+    return np.array(x), np.array(y), np.array(z), np.array(totals), xi1
+
+def analytic_yz(x:np.ndarray,n:float):
+    """
+    Evaluate the closed-form solutions of the Lane-Emden equation.
+    
+    Parameters
+    ----------
+    x : np.ndarray
+        The x values.
+    n : float
+        The index of the polytrope. Must be in ``ANALYTIC_INDICES``.
+    
+    Returns
+    -------
+    y : np.ndarray
+        The y values.
+    z : np.ndarray
+        The z values.
+    
+    Notes
+    -----
+    .. math::
+        \\theta_0 = 1 - \\frac{\\xi^2}{6} \\\\
+        \\theta_1 = \\frac{\\sin\\xi}{\\xi} \\\\
+        \\theta_5 = \\left(1 + \\frac{\\xi^2}{3}\\right)^{-1/2}
+    """
+    if n == 0:
+        return 1 - x**2/6, -x/3
+    if n == 1:
+        y = np.sinc(x/np.pi)
+        return y, np.where(x==0,0,(np.cos(x)-y)/np.where(x==0,1,x))
+    if n == 5:
+        base = 1 + x**2/3
+        return base**-0.5, -x/3*base**-1.5
+    raise NotImplementedError(f'There is no analytic solution for n={n}')
+
+
+def envelope_yz(x:np.ndarray,n:float,x0:float,y0:float,z0:float,h:float=0.01,x_tol:float=0.):
+    """
+    Continue an unbounded solution (:math:`n \\geq 5`) into its outer
+    envelope, beyond the point ``(x0, y0, z0)``.
+    
+    Parameters
+    ----------
     x : np.ndarray
-        The x values. Recall that :math:`x=\\xi`.
+        The x values, at least ``x0 - x_tol``.
+    n : float
+        The index of the polytrope.
+    x0, y0, z0 : float
+        The last point of the integration.
+    h : float, optional
+        The step size in :math:`\\ln\\xi`. The default is 0.01.
+    x_tol : float, optional
+        How far below ``x0`` x may start, e.g. one step of the
+        integration, whose last point lies just past ``UNBOUNDED_XI``.
+        Such points are extrapolated from the first step of the
+        envelope. The default is 0.
+    
+    Returns
+    -------
     y : np.ndarray
-        The y values. Recall that :math:`y=\\theta_n`.
+        The y values.
     z : np.ndarray
-        The z values. Recall that :math:`z=\\frac{d\\theta_n}{d\\xi}`.
+        The z values.
+    
+    Notes
+    -----
+    For :math:`n=5` this is the Schuster solution. For :math:`n>5` the
+    solution oscillates about the singular solution
+    :math:`\\theta_s = A\\xi^{-2/(n-1)}` with an amplitude that decays as
+    a power of :math:`\\xi`, so it is continued with steps that are
+    uniform in :math:`\\ln\\xi` (see ``solve_log``) and the cost grows
+    only with :math:`\\ln(x/x_0)`.
     """
-    if impl == 'rust':
-        return solve_rust(x_init,n,h,max_iter)
-    if impl == 'python':
-        return solve_python(x_init,n,h,max_iter)
+    x = np.asarray(x,dtype=np.float64)
+    if n == 5:
+        return analytic_yz(x,5)
+    if n < UNBOUNDED_N:
+        raise ValueError(f'The solution for n={n} is bounded')
+    if np.any(x < x0 - x_tol):
+        raise ValueError('x must not be smaller than x0 - x_tol')
+    rhs = derivatives.get_log_rhs(n)
+    t_prev = np.log(x0)
+    t_max = np.log(np.max(x,initial=x0))
+    state = (y0, x0*z0)
+    xs = [x0]
+    ys = [y0]
+    zs = [z0]
+    while t_prev < t_max:
+        state = runge_kutta.get_next_state(rhs,t_prev,state,h)
+        t_prev += h
+        xs.append(np.exp(t_prev))
+        ys.append(state[0])
+        zs.append(state[1]/xs[-1])
+    if len(xs) == 1:
+        state = runge_kutta.get_next_state(rhs,t_prev,state,h)
+        xs.append(np.exp(t_prev + h))
+        ys.append(state[0])
+        zs.append(state[1]/xs[-1])
+    soln = DenseSolution(xs,ys,zs,n)
+    return soln.theta(x,extrapolate=True), soln.theta_prime(x,extrapolate=True)
+
+
+def solve_analytic(
+    x_init:float,
+    n:float,
+    h:float,
+    max_iter:int=1000
+):
+    """
+    Evaluate a closed-form solution on the grid the integrators would use.
+    
+    The returned arrays have the same layout as ``solve_python`` and
+    ``solve_rust``: points spaced by ``h`` from ``x_init``, ending at the
+    first point with :math:`y \\leq 0` (at ``UNBOUNDED_XI`` for
+    :math:`n=5`) or after ``max_iter`` steps.
+    
+    Parameters
+    ----------
+    x_init : float
+        The initial x value.
+    n : float
+        The index of the polytrope. Must be in ``ANALYTIC_INDICES``.
+    h : float
+        The step size.
+    max_iter : int, optional
+        The maximum number of iterations. The default is 1000.
+    """
+    xi1 = {0: np.sqrt(6), 1: np.pi, 5: UNBOUNDED_XI}[n]
+    n_iter = min(int(max_iter), max(int(np.ceil((xi1-x_init)/h)), 0))
+    x = x_init + h*np.arange(n_iter+1)
+    y, z = analytic_yz(x,n)
+    return x, y, z
+
+
+def solve_python_log(x_init,n,h,max_iter=1000):
+    """
+    Solve the Lane-Emden equation with uniform steps in :math:`t = \\ln x`.
+    
+    Parameters
+    ----------
+    x_init : float
+        The initial x value. Must be positive.
+    n : float
+        The index of the polytrope.
+    h : float
+        The step size in :math:`\\ln x`.
+    max_iter : int, optional
+        The maximum number of iterations. The default is 1000.
+    """
+    rhs = derivatives.get_log_rhs(n)
+    t_max = np.log(get_x_max(n))
+    t_prev = np.log(x_init)
+    state = (1 - x_init**2/6, -x_init**2/3)
+    n_iter = 0
+    xs = [x_init]
+    ys = [state[0]]
+    zs = [state[1]/x_init]
+    while state[0] > 0 and n_iter < max_iter and t_prev < t_max:
+        n_iter += 1
+        state = runge_kutta.get_next_state(rhs,t_prev,state,h)
+        t_prev += h
+        x = np.exp(t_prev)
+        xs.append(x)
+        ys.append(state[0])
+        zs.append(state[1]/x)
+    return np.array(xs), np.array(ys), np.array(zs)
+
+
+def solve_log(
+    x_init:float,
+    n:float,
+    h:float,
+    max_iter:int=1000,
+    impl:str='rust'
+):
+    """
+    Solve the Lane-Emden equation in the coordinate :math:`t = \\ln\\xi`.
+    
+    The steps are uniform in :math:`t`, so they grow geometrically with
+    :math:`\\xi` and the number of steps scales with
+    :math:`\\ln(\\xi_1/x_{init})` rather than :math:`\\xi_1`. The
+    integration starts from the series solution
+    :math:`\\theta \\approx 1 - \\xi^2/6` at ``x_init``, which avoids
+    the :math:`2/\\xi` term at the centre.
+    
+    Parameters
+    ----------
+    x_init : float
+        The initial x value. Must be positive.
+    n : float
+        The index of the polytrope.
+    h : float
+        The step size in :math:`\\ln\\xi`, e.g. 0.01.
+    max_iter : int, optional
+        The maximum number of iterations. The default is 1000.
+    impl : str, optional
+        The implementation to use. The default is 'rust'.
+    
+    Returns
+    -------
+    x, y, z : np.ndarray
+        The profile.
+    
+    Notes
+    -----
+    With :math:`v = \\xi\\theta^\\prime` the equation becomes
+    
+    .. math::
+        \\frac{d\\theta}{dt} = v \\\\
+        \\frac{dv}{dt} = -v - e^{2t}\\theta^n
+    """
+    if not x_init > 0:
+        raise ValueError("x_init must be positive for coord='log'")
+    if impl == 'rust':
+        # pylint: disable-next=no-name-in-module
+        from polysolver import polysolver_rust
+        x,y,z = polysolver_rust.solve_log(x_init,n,h,max_iter)
+        return np.array(x), np.array(y), np.array(z)
+    if impl == 'python':
+        return solve_python_log(float(x_init),float(n),h,max_iter)
+    else:
+        raise NotImplementedError('impl must be "rust" or "python"')
+
+
+def total_mass(n:float,impl:str='rust')->float:
+    """
+    Get the dimensionless mass :math:`-\\xi_1^2\\theta^\\prime(\\xi_1)`
+    of a polytrope from a quick solve in :math:`\\ln\\xi`.
+    
+    Parameters
+    ----------
+    n : float
+        The index of the polytrope.
+    impl : str, optional
+        The implementation to use. The default is 'rust'.
+    """
+    x,y,z = solve_log(1e-6,n,0.01,100000,impl)
+    soln = DenseSolution(x,y,z,n)
+    xi1 = soln.xi1
+    if not np.isfinite(xi1):
+        raise ValueError(f'The polytrope with n={n} has no surface')
+    return float(-xi1**2*soln.theta_prime(xi1))
+
+
+def solve_until(
+    x_init:float,
+    n:float,
+    h:float,
+    max_iter:int=1000,
+    impl:str='rust',
+    stop_at_xi:float=None,
+    stop_at_theta:float=None,
+    stop_at_mass_fraction:float=None
+):
+    """
+    Solve the Lane-Emden equation only as far as it is needed.
+    
+    The integration ends at the surface, after ``max_iter`` steps or at
+    the first stop condition that is met. The last step is shortened so
+    that the last point lies exactly on the event.
+    
+    Parameters
+    ----------
+    x_init : float
+        The initial x value. Choose something small.
+    n : float
+        The index of the polytrope.
+    h : float
+        The step size.
+    max_iter : int, optional
+        The maximum number of iterations. The default is 1000.
+    impl : str, optional
+        The implementation to use. The default is 'rust'.
+    stop_at_xi : float, optional
+        Stop at this value of :math:`\\xi`.
+    stop_at_theta : float, optional
+        Stop when :math:`\\theta` falls to this value.
+    stop_at_mass_fraction : float, optional
+        Stop when the enclosed mass reaches this fraction of the total.
+        The enclosed mass is :math:`-\\xi^2\\theta^\\prime`, and the
+        total comes from ``total_mass``.
+    
+    Returns
+    -------
+    x, y, z : np.ndarray
+        The profile.
+    hit : str or None
+        'xi', 'theta' or 'mass' if a stop condition ended the integration.
+    """
+    stop_at_mass = None
+    if stop_at_mass_fraction is not None:
+        stop_at_mass = stop_at_mass_fraction*total_mass(n,impl)
+    if impl == 'rust':
+        # pylint: disable-next=no-name-in-module
+        from polysolver import polysolver_rust
+        x,y,z,hit = polysolver_rust.solve_until(
+            x_init,n,h,max_iter,stop_at_xi,stop_at_theta,stop_at_mass
+        )
+        return np.array(x), np.array(y), np.array(z), hit
+    if impl == 'python':
+        stops = [
+            (kind, target)
+            for kind, target in zip(STOPS,(stop_at_xi,stop_at_theta,stop_at_mass))
+            if target is not None
+        ]
+        return solve_python_until(float(x_init),float(n),h,max_iter,stops)
+    else:
+        raise NotImplementedError('impl must be "rust" or "python"')
+
+
+def _checker(timeout:float=None,progress=None,cancel=None):
+    """
+    Build the check run between chunks of a long solve. It returns why
+    the solve should stop, or None to go on.
+    """
+    deadline = None if timeout is None else perf_counter() + timeout
+    def check(x:float,y:float):
+        if deadline is not None and perf_counter() >= deadline:
+            return 'timeout'
+        if progress is not None:
+            progress(x,y)
+        if cancel is not None and cancel.is_set():
+            return 'cancelled'
+        return None
+    return check
+
+
+def solve_python_checked(x,y,z,n,h,max_iter,every,check):
+    """
+    Solve the Lane-Emden equation from a state in chunks of ``every``
+    steps, running ``check`` before the first chunk and between chunks.
+    
+    Returns
+    -------
+    x, y, z : np.ndarray
+        The profile.
+    reason : str or None
+        Why the solve stopped early: 'timeout', 'cancelled' or
+        'interrupted'. None if it ran to the end.
+    """
+    xs, ys, zs = [np.array([x])], [np.array([y])], [np.array([z])]
+    x, y, z = float(x), float(y), float(z)
+    x_max = get_x_max(n)
+    remaining = max_iter
+    try:
+        # A deadline that has passed or a cancel that is set stops the solve at once.
+        reason = check(x,y)
+        while reason is None:
+            chunk = min(remaining,max(every,1))
+            cx,cy,cz = solve_python_equation('lane_emden',[n],x,h,chunk,start=(y,z))
+            xs.append(cx[1:])
+            ys.append(cy[1:])
+            zs.append(cz[1:])
+            taken = len(cx) - 1
+            remaining -= taken
+            x, y, z = float(cx[-1]), float(cy[-1]), float(cz[-1])
+            if taken < chunk or remaining == 0 or not y > 0 or not x < x_max:
+                break
+            reason = check(x,y)
+    except KeyboardInterrupt:
+        reason = 'interrupted'
+    return np.concatenate(xs), np.concatenate(ys), np.concatenate(zs), reason
+
+
+def solve_checked(
+    x:float,
+    y:float,
+    z:float,
+    n:float,
+    h:float,
+    max_iter:int=1000,
+    impl:str='rust',
+    timeout:float=None,
+    progress=None,
+    cancel=None,
+    every:int=CHECK_EVERY
+):
+    """
+    Solve the Lane-Emden equation from a state so that the solve can
+    be stopped early.
+    
+    Every ``every`` steps the solver checks the deadline, calls
+    ``progress`` and polls ``cancel`` and Ctrl-C. The steps are the same
+    as in an uninterrupted run, so a profile that stopped early can be
+    continued exactly with ``solve_from`` from its last point.
+    
+    Parameters
+    ----------
+    x, y, z : float
+        The starting state.
+    n : float
+        The index of the polytrope.
+    h : float
+        The step size.
+    max_iter : int, optional
+        The maximum number of iterations. The default is 1000.
+    impl : str, optional
+        The implementation to use. The default is 'rust'.
+    timeout : float, optional
+        Stop after this many seconds.
+    progress : callable, optional
+        Called as ``progress(xi, theta)`` at every check.
+    cancel : object, optional
+        Anything with an ``is_set()`` method, such as a
+        ``threading.Event``. The solve stops once it is set.
+    every : int, optional
+        The number of steps between checks. The default is ``CHECK_EVERY``.
+    
+    Returns
+    -------
+    x, y, z : np.ndarray
+        The profile, starting with the given state.
+    reason : str or None
+        'timeout' or 'cancelled' if the solve stopped early, else None.
+    
+    Raises
+    ------
+    SolveInterrupted
+        On Ctrl-C, with the profile so far.
+    """
+    if impl == 'rust':
+        # pylint: disable-next=no-name-in-module
+        from polysolver import polysolver_rust
+        timeout = None if timeout is None else float(timeout)
+        xs,ys,zs,reason = polysolver_rust.solve_checked(
+            x,y,z,n,h,max_iter,every,timeout,progress,cancel
+        )
+        xs, ys, zs = np.array(xs), np.array(ys), np.array(zs)
+    elif impl == 'python':
+        xs,ys,zs,reason = solve_python_checked(
+            x,y,z,n,h,max_iter,every,_checker(timeout,progress,cancel)
+        )
+    else:
+        raise NotImplementedError('impl must be "rust" or "python"')
+    if reason == 'interrupted':
+        raise SolveInterrupted(xs,ys,zs)
+    if reason is not None:
+        warnings.warn(
+            f'The solve stopped early ({reason}) at x={xs[-1]:.6g}; continue it with solve_from',
+            RuntimeWarning
+        )
+    return xs, ys, zs, reason
+
+
+def solve_from(
+    x:float,
+    y:float,
+    z:float,
+    n:float,
+    h:float,
+    max_iter:int=1000,
+    impl:str='rust',
+    timeout:float=None,
+    progress=None,
+    cancel=None
+):
+    """
+    Continue a solution of the Lane-Emden equation from a saved state,
+    such as the last point of a run that reached ``max_iter``.
+    
+    Parameters
+    ----------
+    x : float
+        The x value of the state.
+    y : float
+        The y value of the state.
+    z : float
+        The z value of the state.
+    n : float
+        The index of the polytrope.
+    h : float
+        The step size.
+    max_iter : int, optional
+        The maximum number of additional iterations. The default is 1000.
+    impl : str, optional
+        The implementation to use. The default is 'rust'.
+    timeout, progress, cancel : optional
+        Let a long solve be stopped early. See ``solve_checked``.
+    
+    Returns
+    -------
+    x, y, z : np.ndarray
+        The profile, starting with the given state.
+    """
+    if timeout is not None or progress is not None or cancel is not None:
+        return solve_checked(x,y,z,n,h,max_iter,impl,timeout,progress,cancel)[:3]
+    if impl == 'rust':
+        # pylint: disable-next=no-name-in-module
+        from polysolver import polysolver_rust
+        xs,ys,zs = polysolver_rust.solve_from(x,y,z,n,h,max_iter)
+        return np.array(xs), np.array(ys), np.array(zs)
+    if impl == 'python':
+        return solve_python_equation('lane_emden',[n],float(x),h,max_iter,start=(float(y),float(z)))
+    else:
+        raise NotImplementedError('impl must be "rust" or "python"')
+
+INTERFACES = ('xi', 'theta', 'mass_fraction')
+
+
+def solve_python_composite(x_init,ns,interfaces,density_jumps,h,max_iter=1000):
+    """
+    Integrate a composite polytrope. See ``solve_composite``.
+    
+    Parameters
+    ----------
+    x_init : float
+        The initial x value.
+    ns : sequence of float
+        The index of each zone, from the centre outwards.
+    interfaces : sequence of tuple
+        ``(kind, target)`` ending each zone but the last, see ``stop_value``.
+        'xi' is in units of the first length scale, 'theta' is the zone's
+        own :math:`\\theta` and 'mass' is in units of :math:`4\\pi\\rho_c a_1^3`.
+    density_jumps : sequence of float
+        The density ratio across each interface.
+    h : float
+        The step size, in units of the first length scale.
+    max_iter : int, optional
+        The maximum number of iterations over all zones. The default is 1000.
+    
+    Returns
+    -------
+    x, y, z : np.ndarray
+        The profile.
+    zones : dict
+        'starts', 'scales', 'densities' and 'pressures' of each zone reached.
+    """
+    xs, ys, zs = [], [], []
+    zones = {'starts': [], 'scales': [], 'densities': [], 'pressures': []}
+    scale, density, pressure = 1., 1., 1.
+    x, y, z = x_init, 1., 0.
+    remaining = max_iter
+    for k, n in enumerate(ns):
+        zones['starts'].append(sum(len(a) for a in xs))
+        zones['scales'].append(scale)
+        zones['densities'].append(density)
+        zones['pressures'].append(pressure)
+        stops = []
+        if k + 1 < len(ns):
+            kind, target = interfaces[k]
+            if kind == 'xi':
+                target = target/scale
+            elif kind == 'mass':
+                target = target/(density*scale**3)
+            stops.append((kind,target))
+        x_max = get_x_max(n) if k == 0 else np.inf
+        zx, zy, zz, hit = solve_python_until(x,float(n),h/scale,remaining,stops,start=(y,z),x_max=x_max)
+        remaining -= len(zx) - 1
+        xs.append(zx*scale)
+        ys.append(zy)
+        zs.append(zz)
+        if hit is None or not zy[-1] > 0:
+            break
+        xi_in, theta_in, dtheta_in = float(zx[-1]), float(zy[-1]), float(zz[-1])
+        q = density_jumps[k] if k < len(density_jumps) else 1.
+        s = ((ns[k+1] + 1)/(n + 1)*theta_in**(1 - n)/q**2)**0.5
+        x, y, z = xi_in/s, 1., dtheta_in/(q*theta_in**n*s)
+        density *= q*theta_in**n
+        pressure *= theta_in**(n + 1)
+        scale *= s
+    return np.concatenate(xs), np.concatenate(ys), np.concatenate(zs), zones
+
+
+def composite_mass(x:np.ndarray,y:np.ndarray,z:np.ndarray,zones:dict)->float:
+    """
+    The mass of a composite polytrope in units of :math:`4\\pi\\rho_c a_1^3`,
+    interpolated to the surface. NaN if the surface was not reached.
+    """
+    if y[-1] > 0 or len(x) - zones['starts'][-1] < 2:
+        return np.nan
+    scale = zones['scales'][-1]
+    density = zones['densities'][-1]
+    xi = x[-2:]/scale
+    m = -density*scale**3*xi**2*z[-2:]
+    t = y[-2]/(y[-2] - y[-1])
+    return float(m[0] + t*(m[1] - m[0]))
+
+
+def solve_composite(
+    x_init:float,
+    zones:list,
+    h:float,
+    max_iter:int=100000,
+    impl:str='rust',
+    tol:float=1e-10
+):
+    """
+    Solve a composite polytrope made of zones with different indices.
+    
+    At each interface the pressure and the enclosed mass are continuous
+    and the density may jump. Each zone has its own Lane-Emden variable,
+    which is 1 at its inner interface, and the variables are rescaled by
+    homology as the integration crosses an interface.
+    
+    Parameters
+    ----------
+    x_init : float
+        The initial x value. Choose something small.
+    zones : list of dict
+        The zones from the centre outwards. Each has the index 'n' and,
+        except the last, exactly one interface key: 'xi' (a radius in
+        units of the length scale of the first zone), 'theta' (the zone's
+        own :math:`\\theta`) or 'mass_fraction' (of the total mass of the
+        composite). 'density_jump', the ratio of the density just outside
+        the interface to that just inside, defaults to 1.
+    h : float
+        The step size, in units of the length scale of the first zone.
+    max_iter : int, optional
+        The maximum number of iterations over all zones. The default is 100000.
+    impl : str, optional
+        The implementation to use. The default is 'rust'.
+    tol : float, optional
+        The relative tolerance on a 'mass_fraction' interface, which needs
+        a few integrations to find. The default is 1e-10.
+    
+    Returns
+    -------
+    x, y, z : np.ndarray
+        The profile. x is in units of the first length scale; y and z are
+        the :math:`\\theta` and :math:`\\frac{d\\theta}{d\\xi}` of each zone,
+        in its own units.
+    info : dict
+        'ns', and the 'starts' of each zone in the profile, with their
+        length 'scales', inner 'densities' and inner 'pressures' relative
+        to the first zone.
+    
+    Raises
+    ------
+    ValueError
+        If an interface is missing or ambiguous, or more than one zone
+        ends at a mass fraction.
+    
+    Examples
+    --------
+    >>> x, y, z, info = solve_composite(1e-10, [{'n': 3, 'mass_fraction': 0.3}, {'n': 1.5}], 1e-3)
+    """
+    if impl not in ('rust','python'):
+        raise NotImplementedError('impl must be "rust" or "python"')
+    if len(zones) == 0:
+        raise ValueError('At least one zone is needed')
+    ns = [float(zone['n']) for zone in zones]
+    interfaces = []
+    for zone in zones[:-1]:
+        keys = [key for key in INTERFACES if key in zone]
+        if len(keys) != 1:
+            raise ValueError(f'Each zone but the last needs exactly one of {INTERFACES}')
+        interfaces.append((keys[0],float(zone[keys[0]])))
+    density_jumps = [float(zone.get('density_jump',1.)) for zone in zones[:-1]]
+    def run(interfaces):
+        if impl == 'rust':
+            # pylint: disable-next=no-name-in-module
+            from polysolver import polysolver_rust
+            x,y,z,starts,scales,densities,pressures = polysolver_rust.solve_composite(
+                x_init,ns,interfaces,density_jumps,h,max_iter
+            )
+            info = {'starts': starts, 'scales': scales, 'densities': densities, 'pressures': pressures}
+            return np.array(x), np.array(y), np.array(z), info
+        return solve_python_composite(float(x_init),ns,interfaces,density_jumps,h,max_iter)
+    fractions = [k for k, (kind, _) in enumerate(interfaces) if kind == 'mass_fraction']
+    if len(fractions) > 1:
+        raise ValueError('Only one zone can end at a mass fraction')
+    if not fractions:
+        x, y, z, info = run(interfaces)
+        info['ns'] = ns
+        return x, y, z, info
+    k = fractions[0]
+    fraction = interfaces[k][1]
+    def residual(mass):
+        trial = list(interfaces)
+        trial[k] = ('mass',mass)
+        result = run(trial)
+        return mass - fraction*composite_mass(*result[:3],result[3]), result
+    m0 = fraction*(total_mass(ns[0],impl) if ns[0] < UNBOUNDED_N else 1.)
+    r0, result = residual(m0)
+    m1 = m0 - r0
+    for _ in range(50):
+        r1, result = residual(m1)
+        if not np.isfinite(r1):
+            raise ValueError('The composite did not reach its surface; increase max_iter')
+        if abs(r1) <= tol*abs(m1) or r1 == r0:
+            break
+        m0, r0, m1 = m1, r1, m1 - r1*(m1 - m0)/(r1 - r0)
+    x, y, z, info = result
+    info['ns'] = ns
+    return x, y, z, info
+
+
+def solve(
+    x_init:float,
+    n:float,
+    h:float,
+    max_iter:int=1000,
+    impl:str='rust',
+    integrals=None,
+    keep_profile:bool=True,
+    analytic:bool=True,
+    dense:bool=False,
+    out:tuple=None,
+    coord:str='xi',
+    stop_at_xi:float=None,
+    stop_at_theta:float=None,
+    stop_at_mass_fraction:float=None,
+    timeout:float=None,
+    progress=None,
+    cancel=None,
+    progress_every:int=CHECK_EVERY,
+    method:str='DOP853'
+):
+    """
+    Solve the Lane-Emden equation using a fourth-order Runge-Kutta method.
+    
+    For indices with a closed-form solution (``ANALYTIC_INDICES``) the
+    exact solution is evaluated on the same grid instead, unless
+    ``analytic`` is False.
+    
+    Parameters
+    ----------
+    x_init : float
+        The initial x value. Choose something small.
+    n : float
+        The index of the polytrope.
+    h : float
+        The step size. This should be less than the pressure scale height.
+    max_iter : int, optional
+        The maximum number of iterations. The default is 1000.
+    impl : str, optional
+        The implementation to use: 'rust', 'python' or 'scipy', which
+        integrates adaptively with ``scipy.integrate.solve_ivp``
+        (see ``solve_scipy``) and only supports the plain solve and
+        ``dense``. The default is 'rust'.
+    integrals : sequence of str, optional
+        Structural integrals to accumulate during the integration,
+        e.g. ``('mass', 'moment_of_inertia')``.
+        See ``polysolver.integrals``. The default is None.
+    keep_profile : bool, optional
+        If False, only the last three points of the profile are returned.
+        This is only used when ``integrals`` is given. The default is True.
+    analytic : bool, optional
+        Use the closed-form solution when one exists. Not used when
+        ``integrals`` is given. The default is True.
+    dense : bool, optional
+        Return a ``DenseSolution`` in place of ``x``, ``y`` and ``z``.
+        The default is False.
+    out : tuple of np.ndarray, optional
+        Preallocated float64 arrays to write x, y and z into, in which
+        case only the number of points written is returned. The
+        integration also stops when they are full. See ``solve_out``.
+    coord : str, optional
+        The integration coordinate. 'xi' takes uniform steps of ``h``
+        in :math:`\\xi`; 'log' takes uniform steps of ``h`` in
+        :math:`\\ln\\xi`, see ``solve_log``. The default is 'xi'.
+    stop_at_xi, stop_at_theta, stop_at_mass_fraction : float, optional
+        End the integration early, with the last point exactly on the
+        event. See ``solve_until``. The closed-form solutions are not
+        used when any of these is given.
+    timeout : float, optional
+        Stop after this many seconds and return the profile so far,
+        with a ``RuntimeWarning``. Continue it with ``solve_from``.
+    progress : callable, optional
+        Called as ``progress(xi, theta)`` every ``progress_every`` steps.
+    cancel : object, optional
+        Anything with an ``is_set()`` method, such as a
+        ``threading.Event``; the solve stops once it is set, as for
+        ``timeout``. With any of ``timeout``, ``progress`` or ``cancel``,
+        Ctrl-C raises ``SolveInterrupted`` with the profile so far.
+        See ``solve_checked``.
+    progress_every : int, optional
+        The number of steps between checks. The default is ``CHECK_EVERY``.
+    method : str, optional
+        The integrator used with ``impl='scipy'``. The default is 'DOP853'.
+    
+    Returns
+    -------
+    x : np.ndarray
+        The x values. Recall that :math:`x=\\xi`.
+    y : np.ndarray
+        The y values. Recall that :math:`y=\\theta_n`.
+    z : np.ndarray
+        The z values. Recall that :math:`z=\\frac{d\\theta_n}{d\\xi}`.
+    values : dict
+        The value of each requested integral. Only returned if
+        ``integrals`` is given.
+    DenseSolution
+        The continuous solution. Returned in place of ``x``, ``y`` and
+        ``z`` if ``dense`` is True.
+    int
+        The number of points written. Returned in place of ``x``, ``y``
+        and ``z`` if ``out`` is given.
+    """
+    stops = (stop_at_xi,stop_at_theta,stop_at_mass_fraction)
+    if impl == 'scipy' and (
+        any(stop is not None for stop in stops) or integrals is not None or out is not None
+        or coord != 'xi' or timeout is not None or progress is not None or cancel is not None
+    ):
+        raise ValueError(
+            "impl='scipy' only supports the plain solve and dense, not stop conditions, "
+            "integrals, out, coord, timeout, progress or cancel"
+        )
+    if any(stop is not None for stop in stops):
+        if integrals is not None or out is not None or coord != 'xi':
+            raise ValueError("stop conditions cannot be combined with integrals, out or coord='log'")
+        x,y,z,_ = solve_until(x_init,n,h,max_iter,impl,*stops)
+        return DenseSolution(x,y,z,n) if dense else (x,y,z)
+    if coord == 'log':
+        if integrals is not None or out is not None:
+            raise ValueError("coord='log' cannot be combined with integrals or out")
+        x,y,z = solve_log(x_init,n,h,max_iter,impl)
+        return DenseSolution(x,y,z,n) if dense else (x,y,z)
+    if coord != 'xi':
+        raise ValueError("coord must be 'xi' or 'log'")
+    if timeout is not None or progress is not None or cancel is not None:
+        if integrals is not None or out is not None:
+            raise ValueError('timeout, progress and cancel cannot be combined with integrals or out')
+        if analytic and n in ANALYTIC_INDICES:
+            x,y,z = solve_analytic(x_init,n,h,max_iter)
+        else:
+            x,y,z,_ = solve_checked(
+                x_init,1.,0.,n,h,max_iter,impl,timeout,progress,cancel,progress_every
+            )
+        return DenseSolution(x,y,z,n) if dense else (x,y,z)
+    if out is not None:
+        if integrals is not None or dense:
+            raise ValueError('out cannot be combined with integrals or dense')
+        if analytic and n in ANALYTIC_INDICES:
+            capacity = min(len(arr) for arr in out)
+            soln = solve_analytic(x_init,n,h,min(max_iter,capacity-1))
+            length = len(soln[0])
+            for arr, val in zip(out,soln):
+                arr[:length] = val
+            return length
+        return solve_out(x_init,n,h,max_iter,out,impl)
+    if dense:
+        if integrals is None:
+            x,y,z = solve(x_init,n,h,max_iter,impl,analytic=analytic,method=method)
+            return DenseSolution(x,y,z,n)
+        if not keep_profile:
+            raise ValueError('dense output needs keep_profile=True')
+        x,y,z,values = solve(x_init,n,h,max_iter,impl,integrals)
+        return DenseSolution(x,y,z,n), values
+    if integrals is not None:
+        base = _integrals.get_base(integrals)
+        if impl == 'rust':
+            x,y,z,totals,xi1 = solve_rust_integrals(x_init,n,h,max_iter,base,keep_profile)
+        elif impl == 'python':
+            x,y,z,totals,xi1 = solve_python_integrals(x_init,n,h,max_iter,base,keep_profile)
+        else:
+            raise NotImplementedError('impl must be "rust" or "python"')
+        return x,y,z,_integrals.get_values(integrals,base,totals,xi1)
+    if analytic and n in ANALYTIC_INDICES:
+        return solve_analytic(x_init,n,h,max_iter)
+    if impl == 'rust':
+        return solve_rust(x_init,n,h,max_iter)
+    if impl == 'python':
+        return solve_python(x_init,n,h,max_iter)
+    if impl == 'scipy':
+        return solve_scipy(x_init,n,h,max_iter,method)
+    else:
+        raise NotImplementedError('impl must be "rust", "python" or "scipy"')
+
+def solve_batch(
+    x_init,
+    ns,
+    h,
+    max_iter:int=1000,
+    impl:str='rust',
+    n_threads:int=None,
+    analytic:bool=True,
+    lanes:bool=False
+):
+    """
+    Solve the Lane-Emden equation for many models at once.
+    
+    The rust implementation solves the models in parallel.
+    
+    Parameters
+    ----------
+    x_init : float or array-like
+        The initial x value of each model. Choose something small.
+    ns : array-like
+        The indices of the polytropes.
+    h : float or array-like
+        The step size of each model. This should be less than the
+        pressure scale height.
+    max_iter : int, optional
+        The maximum number of iterations. The default is 1000.
+    impl : str, optional
+        The implementation to use. The default is 'rust'.
+    n_threads : int, optional
+        The number of threads used by the rust implementation.
+        The default is the number of CPUs.
+    analytic : bool, optional
+        Use the closed-form solution when one exists. The default is True.
+    lanes : bool, optional
+        Use the rust kernel that advances several models per thread in
+        lockstep. The profiles are identical. The default is False.
+    
+    Returns
+    -------
+    x, y, z : np.ndarray
+        The concatenated profiles.
+    offsets : np.ndarray
+        Model ``i`` occupies ``offsets[i]:offsets[i+1]``.
+    """
+    x_inits, ns, hs = (
+        np.ravel(arr).astype(np.float64)
+        for arr in np.broadcast_arrays(x_init,ns,h)
+    )
+    if analytic:
+        is_analytic = np.isin(ns,ANALYTIC_INDICES)
+    else:
+        is_analytic = np.zeros(len(ns),dtype=bool)
+    numeric = np.flatnonzero(~is_analytic)
+    if impl == 'rust':
+        # pylint: disable-next=no-name-in-module
+        from polysolver import polysolver_rust
+        if n_threads is None:
+            n_threads = os.cpu_count() or 1
+        kernel = polysolver_rust.solve_batch_lanes if lanes else polysolver_rust.solve_batch
+        x,y,z,offsets = kernel(
+            list(x_inits[numeric]),
+            list(ns[numeric]),
+            list(hs[numeric]),
+            max_iter,
+            n_threads
+        )
+        x, y, z = np.array(x), np.array(y), np.array(z)
+        solns = [
+            (x[lo:hi], y[lo:hi], z[lo:hi])
+            for lo, hi in zip(offsets[:-1], offsets[1:])
+        ]
+    elif impl == 'python':
+        solns = [
+            solve_python(float(x_inits[i]),float(ns[i]),float(hs[i]),max_iter)
+            for i in numeric
+        ]
+    else:
+        raise NotImplementedError('impl must be "rust" or "python"')
+    if len(numeric) == len(ns):
+        ordered = solns
+    else:
+        ordered = [None]*len(ns)
+        for i, soln in zip(numeric, solns):
+            ordered[i] = soln
+        for i in np.flatnonzero(is_analytic):
+            ordered[i] = solve_analytic(x_inits[i],ns[i],hs[i],max_iter)
+    offsets = np.zeros(len(ns)+1,dtype=np.int64)
+    offsets[1:] = np.cumsum([len(soln[0]) for soln in ordered])
+    if not ordered:
+        return np.zeros(0), np.zeros(0), np.zeros(0), offsets
+    x,y,z = (np.concatenate(arrs) for arrs in zip(*ordered))
+    return x, y, z, offsets
+
+
+def _sensitivity_tail(n,x,state):
+    """
+    Integrate the sensitivities from ``state`` at ``x`` to the surface in
+    :math:`u=\\theta^n`, for :math:`0<n<1`. Returns :math:`\\xi_1` and
+    z, dy/dn and dz/dn there.
+    
+    The steps are chosen by step doubling to keep the error of each below
+    ``SENSITIVITY_TAIL_RTOL``. For small n almost all of the change
+    happens just below the starting u, which fixed steps cannot resolve.
+    """
+    rhs = derivatives.get_sensitivity_tail_rhs(n)
+    u = state[0]**n
+    du = -u/SENSITIVITY_TAIL_STEPS
+    tail = (x,) + tuple(state[1:])
+    for _ in range(SENSITIVITY_TAIL_MAX_STEPS):
+        last = du <= -u
+        if last:
+            du = -u
+        full = runge_kutta.get_next_state(rhs,u,tail,du)
+        half = runge_kutta.get_next_state(rhs,u,tail,du/2)
+        half = runge_kutta.get_next_state(rhs,u+du/2,half,du/2)
+        err = max(abs(a-b)/(1+abs(a)) for a, b in zip(half,full))/SENSITIVITY_TAIL_RTOL
+        if not np.isfinite(err):
+            break
+        if err <= 1:
+            # Richardson extrapolation of the two half steps.
+            tail = tuple(a + (a-b)/15 for a, b in zip(half,full))
+            if last:
+                return tail
+            u += du
+        du *= min(4.,max(0.1,0.9*err**-0.2 if err > 0 else 4.))
+    return (np.nan,)*4
+
+
+def solve_python_sensitivity(x_init,n,h,max_iter=1000):
+    """
+    Solve the Lane-Emden equation together with the forward
+    sensitivities :math:`\\frac{\\partial y}{\\partial n}` and
+    :math:`\\frac{\\partial z}{\\partial n}`.
+    
+    Parameters
+    ----------
+    x_init : float
+        The initial x value.
+    n : float
+        The index of the polytrope.
+    h : float
+        The step size.
+    max_iter : int, optional
+        The maximum number of iterations. The default is 1000.
+    
+    Returns
+    -------
+    x, y, z, dy_dn, dz_dn : np.ndarray
+        The profiles.
+    surface : tuple
+        :math:`\\xi_1` and z, dy/dn and dz/dn at the surface,
+        or NaN if ``max_iter`` or ``get_x_max(n)`` is reached first.
+    
+    Notes
+    -----
+    For :math:`0<n<1` the sensitivity equations are singular at the
+    surface, so the last ``SENSITIVITY_TAIL`` steps to it are integrated
+    in :math:`\\theta^n` instead (see ``get_sensitivity_tail_rhs``).
+    The surface comes from there; the profiles are the usual steps.
+    """
+    rhs = derivatives.get_sensitivity_rhs(n)
+    tail = 0 < n < 1
+    x_max = get_x_max(n)
+    x_prev = x_init
+    state = (1., 0., 0., 0.)
+    surface = (np.nan,)*4
+    n_iter = 0
+    xs = [x_prev]
+    states = [state]
+    while state[0] > 0 and n_iter < max_iter and x_prev < x_max:
+        n_iter += 1
+        nxt = runge_kutta.get_next_state(rhs,x_prev,state,h)
+        near = state[0] < SENSITIVITY_TAIL*h*abs(state[1]) or nxt[0] <= 0
+        if tail and near and np.isnan(surface[0]):
+            surface = _sensitivity_tail(n,x_prev,state)
+        elif nxt[0] <= 0 and not tail:
+            step = h*state[0]/(state[0]-nxt[0])
+            at_surface = nxt
+            for _ in range(SURFACE_NEWTON_ITER):
+                at_surface = runge_kutta.get_next_state(rhs,x_prev,state,step)
+                if at_surface[1] == 0:
+                    break
+                ds = at_surface[0]/at_surface[1]
+                step = min(max(step-ds,0),h)
+                if abs(ds) <= 1e-15*h:
+                    break
+            surface = (x_prev+step,) + tuple(at_surface[1:])
+        x_prev += h
+        state = nxt
+        xs.append(x_prev)
+        states.append(state)
+    y, z, s, w = np.array(states).T
+    return np.array(xs), y, z, s, w, surface
+
+
+def solve_sensitivity(
+    x_init:float,
+    n:float,
+    h:float,
+    max_iter:int=1000,
+    impl:str='rust'
+):
+    """
+    Solve the Lane-Emden equation together with the forward
+    sensitivities :math:`\\frac{\\partial y}{\\partial n}` and
+    :math:`\\frac{\\partial z}{\\partial n}`.
+    
+    Parameters
+    ----------
+    x_init : float
+        The initial x value. Choose something small.
+    n : float
+        The index of the polytrope.
+    h : float
+        The step size. This should be less than the pressure scale height.
+    max_iter : int, optional
+        The maximum number of iterations. The default is 1000.
+    impl : str, optional
+        The implementation to use. The default is 'rust'.
+    
+    Returns
+    -------
+    x, y, z : np.ndarray
+        The profile.
+    dy_dn, dz_dn : np.ndarray
+        The sensitivities of y and z to the index.
+    surface : tuple
+        :math:`\\xi_1` and z, dy/dn and dz/dn at the surface, or NaN
+        if ``max_iter`` is reached first. Solutions with :math:`n \\geq 5`
+        stop at ``UNBOUNDED_XI`` without a surface, like ``solve``.
+    """
+    if impl == 'rust':
+        # pylint: disable-next=no-name-in-module
+        from polysolver import polysolver_rust
+        x,y,z,s,w,surface = polysolver_rust.solve_sensitivity(x_init,n,h,max_iter)
+        return np.array(x), np.array(y), np.array(z), np.array(s), np.array(w), surface
+    if impl == 'python':
+        return solve_python_sensitivity(x_init,n,h,max_iter)
+    else:
+        raise NotImplementedError('impl must be "rust" or "python"')
+
+
+def solve_equation(
+    name:str,
+    params,
+    x_init:float,
+    h:float,
+    max_iter:int=1000,
+    impl:str='rust'
+):
+    """
+    Solve any equation family from the registry.
+    
+    Parameters
+    ----------
+    name : str
+        The equation family, e.g. ``'isothermal'`` or ``'white_dwarf'``.
+        See ``derivatives.get_equation``.
+    params : sequence of float
+        The parameters of the family.
+    x_init : float
+        The initial x value. Choose something small.
+    h : float
+        The step size.
+    max_iter : int, optional
+        The maximum number of iterations. The default is 1000.
+    impl : str, optional
+        The implementation to use. The default is 'rust'.
+    
+    Returns
+    -------
+    x, y, z : np.ndarray
+        The profile.
+    """
+    params = [float(p) for p in params]
+    if impl == 'rust':
+        # pylint: disable-next=no-name-in-module
+        from polysolver import polysolver_rust
+        x,y,z = polysolver_rust.solve_equation(name,params,x_init,h,max_iter)
+        return np.array(x), np.array(y), np.array(z)
+    if impl == 'python':
+        return solve_python_equation(name,params,x_init,h,max_iter)
+    else:
+        raise NotImplementedError('impl must be "rust" or "python"')
+
+
+def solve_batch_equation(
+    name:str,
+    params,
+    x_init,
+    h,
+    max_iter:int=1000,
+    impl:str='rust',
+    n_threads:int=None
+):
+    """
+    Solve many models of one equation family at once.
+    
+    The rust implementation solves the models in parallel.
+    
+    Parameters
+    ----------
+    name : str
+        The equation family. See ``derivatives.get_equation``.
+    params : array-like
+        The parameters of each model, shape ``(n_models, n_params)``.
+    x_init : float or array-like
+        The initial x value of each model.
+    h : float or array-like
+        The step size of each model.
+    max_iter : int, optional
+        The maximum number of iterations. The default is 1000.
+    impl : str, optional
+        The implementation to use. The default is 'rust'.
+    n_threads : int, optional
+        The number of threads used by the rust implementation.
+        The default is the number of CPUs.
+    
+    Returns
+    -------
+    x, y, z : np.ndarray
+        The concatenated profiles.
+    offsets : np.ndarray
+        Model ``i`` occupies ``offsets[i]:offsets[i+1]``.
+    """
+    params = np.asarray(params,dtype=np.float64)
+    params = params.reshape(len(params),-1)
+    x_inits = np.broadcast_to(np.asarray(x_init,dtype=np.float64),(len(params),))
+    hs = np.broadcast_to(np.asarray(h,dtype=np.float64),(len(params),))
+    if impl == 'rust':
+        # pylint: disable-next=no-name-in-module
+        from polysolver import polysolver_rust
+        if n_threads is None:
+            n_threads = os.cpu_count() or 1
+        x,y,z,offsets = polysolver_rust.solve_batch_equation(
+            name,params.tolist(),x_inits.tolist(),hs.tolist(),max_iter,n_threads
+        )
+        return np.array(x), np.array(y), np.array(z), np.array(offsets,dtype=np.int64)
+    if impl == 'python':
+        solns = [
+            solve_python_equation(name,p,float(x0),float(step),max_iter)
+            for p, x0, step in zip(params.tolist(),x_inits,hs)
+        ]
+        offsets = np.zeros(len(params)+1,dtype=np.int64)
+        offsets[1:] = np.cumsum([len(soln[0]) for soln in solns])
+        if not solns:
+            return np.zeros(0), np.zeros(0), np.zeros(0), offsets
+        x,y,z = (np.concatenate(arrs) for arrs in zip(*solns))
+        return x, y, z, offsets
     else:
-        raise NotImplementedError('impl must be "rust" or "python"')
\ No newline at end of file
+        raise NotImplementedError('impl must be "rust" or "python"')
@@ -5,7 +5,7 @@ differential equations.
 
 """
 
-from typing import Callable
+from typing import Callable, List
 
 def order1(
     fun:Callable,
@@ -268,4 +268,109 @@ def get_next_xyz(
     """
     dy,dz = dy_and_dz(yprime,zprime,x,y,z,h)
     dx = h
-    return x+dx,y+dy,z+dz
\ No newline at end of file
+    return x+dx,y+dy,z+dz
+
+
+def get_next_xyz_quad(
+    yprime:Callable,
+    zprime:Callable,
+    quads:List[Callable],
+    x:float,
+    y:float,
+    z:float,
+    h:float
+):
+    """
+    Take a fourth order Runge-Kutta step and integrate a set of quadratures
+    :math:`\\frac{dq}{dx} = f(x,y,z)` over the same step.
+    
+    The quadratures are evaluated at the same stages as the step itself,
+    so they are also fourth order.
+    
+    Parameters
+    ----------
+    yprime : Callable
+        The :math:`\\frac{dy}{dx}` function.
+    zprime : Callable
+        The :math:`\\frac{dz}{dx}` function.
+    quads : list of Callable
+        The integrands, with the same signature as ``yprime``.
+    x : float
+        The x value.
+    y : float
+        The y value.
+    z : float
+        The z value.
+    h : float
+        The step size.
+    
+    Returns
+    -------
+    float, float, float, list of float
+        The next x, y, and z values and the increment of each quadrature.
+    
+    Examples
+    --------
+    >>> x,y,z,dq = get_next_xyz_quad(yprime,zprime,[mass],x,y,z,h)
+    """
+    k1 = order1(yprime,x,y,z,h)
+    l1 = order1(zprime,x,y,z,h)
+    k2 = order2(yprime,x,y,z,h,k1,l1)
+    l2 = order2(zprime,x,y,z,h,k1,l1)
+    k3 = order3(yprime,x,y,z,h,k2,l2)
+    l3 = order3(zprime,x,y,z,h,k2,l2)
+    k4 = order4(yprime,x,y,z,h,k3,l3)
+    l4 = order4(zprime,x,y,z,h,k3,l3)
+    dq = [
+        order1(quad,x,y,z,h)/6
+        + order2(quad,x,y,z,h,k1,l1)/3
+        + order3(quad,x,y,z,h,k2,l2)/3
+        + order4(quad,x,y,z,h,k3,l3)/6
+        for quad in quads
+    ]
+    return (
+        x+h,
+        y+k1/6+k2/3+k3/3+k4/6,
+        z+l1/6+l2/3+l3/3+l4/6,
+        dq
+    )
+
+def get_next_state(
+    fun:Callable,
+    x:float,
+    state:tuple,
+    h:float
+):
+    """
+    Use the fourth order Runge-Kutta method to advance a system
+    with any number of variables.
+    
+    Parameters
+    ----------
+    fun : Callable
+        The right-hand side ``fun(x, state)``, returning a tuple
+        the same length as ``state``.
+    x : float
+        The x value.
+    state : tuple
+        The current values of the variables.
+    h : float
+        The step size.
+    
+    Returns
+    -------
+    tuple
+        The values of the variables at ``x+h``.
+    
+    Examples
+    --------
+    >>> state = get_next_state(rhs,x,state,h)
+    """
+    k1 = fun(x,state)
+    k2 = fun(x+0.5*h,tuple(s+0.5*h*k for s,k in zip(state,k1)))
+    k3 = fun(x+0.5*h,tuple(s+0.5*h*k for s,k in zip(state,k2)))
+    k4 = fun(x+h,tuple(s+h*k for s,k in zip(state,k3)))
+    return tuple(
+        s + h*(a/6+b/3+c/3+d/6)
+        for s,a,b,c,d in zip(state,k1,k2,k3,k4)
+    )
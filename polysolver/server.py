@@ -0,0 +1,400 @@
+"""
+A local solver daemon.
+
+Run it with::
+
+    polysolver serve --unix /tmp/polysolver.sock
+    polysolver serve --port 8765
+
+Solve requests that arrive within ``window`` seconds of each other are
+grouped into one parallel call to ``solve_batch``, and every result is
+kept in an in-memory LRU cache, bounded in entries and in bytes, so
+repeated requests cost nothing.
+
+Framing
+-------
+Every message is a little-endian ``uint32`` length followed by that many
+bytes. A request is a JSON object, e.g.
+``{"op": "solve", "x_init": 1e-10, "n": 1.5, "h": 1e-3, "max_iter": 100000}``.
+``op`` is ``solve``, or ``lookup`` to only query the cache.
+A response is a ``uint32`` header length, a JSON header and the raw
+little-endian float64 values of x, y and z back to back. The header has
+``status`` (``ok``, ``miss`` or ``error``) and ``length``, the number of
+points in each array.
+"""
+import argparse
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import json
+import socket
+import struct
+
+import numpy as np
+
+from polysolver.polysolver import solve_batch
+
+_LENGTH = struct.Struct('<I')
+_DTYPE = np.dtype('<f8')
+CACHE_BYTES = 256*2**20
+
+
+def encode_response(status:str, arrays=None, message:str=None) -> bytes:
+    """
+    Encode a response payload, without the outer length prefix.
+
+    Parameters
+    ----------
+    status : str
+        ``ok``, ``miss`` or ``error``.
+    arrays : tuple of np.ndarray, optional
+        The x, y and z arrays.
+    message : str, optional
+        The error message.
+
+    Returns
+    -------
+    bytes
+        The payload.
+    """
+    header = {'status': status}
+    body = b''
+    if arrays is not None:
+        header['length'] = len(arrays[0])
+        body = b''.join(np.ascontiguousarray(a, dtype=_DTYPE).tobytes() for a in arrays)
+    if message is not None:
+        header['message'] = message
+    header = json.dumps(header).encode()
+    return _LENGTH.pack(len(header)) + header + body
+
+
+def decode_response(payload:bytes):
+    """
+    Decode a response payload.
+
+    Parameters
+    ----------
+    payload : bytes
+        The payload, without the outer length prefix.
+
+    Returns
+    -------
+    header : dict
+        The header.
+    arrays : tuple of np.ndarray or None
+        Read-only x, y and z arrays viewing ``payload``.
+    """
+    (size,) = _LENGTH.unpack_from(payload)
+    header = json.loads(payload[_LENGTH.size:_LENGTH.size+size])
+    if 'length' not in header:
+        return header, None
+    data = np.frombuffer(payload, dtype=_DTYPE, offset=_LENGTH.size+size)
+    length = header['length']
+    return header, (data[:length], data[length:2*length], data[2*length:])
+
+
+class SolverServer:
+    """
+    Serve solve requests with micro-batching and a result cache.
+
+    Parameters
+    ----------
+    window : float, optional
+        Seconds to wait for more requests after the first one of a batch.
+        The default is 0.002.
+    max_batch : int, optional
+        The largest number of models in one batch. The default is 256.
+    cache_size : int, optional
+        The number of results to keep. The default is 1024.
+    cache_bytes : int, optional
+        The total size of the kept results. The default is ``CACHE_BYTES``.
+    impl : str, optional
+        The implementation to use. The default is 'rust'.
+    n_threads : int, optional
+        The number of threads of each batch solve.
+    """
+    def __init__(
+        self,
+        window:float=0.002,
+        max_batch:int=256,
+        cache_size:int=1024,
+        cache_bytes:int=None,
+        impl:str='rust',
+        n_threads:int=None
+    ):
+        self.window = window
+        self.max_batch = max_batch
+        self.cache_size = cache_size
+        self.cache_bytes = CACHE_BYTES if cache_bytes is None else cache_bytes
+        self._cached_bytes = 0
+        self.impl = impl
+        self.n_threads = n_threads
+        self.cache = OrderedDict()
+        self.n_batches = 0
+        self._queue = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='polysolver-batch')
+    @staticmethod
+    def get_key(request:dict) -> tuple:
+        """
+        Get the cache key of a request.
+        """
+        return (
+            float(request['x_init']),
+            float(request['n']),
+            float(request['h']),
+            int(request.get('max_iter', 1000))
+        )
+    def _remember(self, key:tuple, arrays:tuple):
+        # Copies, so a cached result does not keep its whole batch alive.
+        arrays = tuple(np.array(a, copy=True) for a in arrays)
+        size = sum(a.nbytes for a in arrays)
+        if size > self.cache_bytes:
+            return
+        if key in self.cache:
+            self._cached_bytes -= sum(a.nbytes for a in self.cache.pop(key))
+        self.cache[key] = arrays
+        self._cached_bytes += size
+        while len(self.cache) > self.cache_size or self._cached_bytes > self.cache_bytes:
+            _, old = self.cache.popitem(last=False)
+            self._cached_bytes -= sum(a.nbytes for a in old)
+    async def submit(self, request:dict):
+        """
+        Get the solution for a request, from the cache or the next batch.
+        """
+        key = self.get_key(request)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((key, future))
+        return await future
+    async def _batcher(self):
+        """
+        Collect requests into batches and solve them.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(pending) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    pending.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            waiters = {}
+            for key, future in pending:
+                waiters.setdefault(key, []).append(future)
+            by_max_iter = {}
+            for key in waiters:
+                if key in self.cache:
+                    for future in waiters[key]:
+                        if not future.done():
+                            future.set_result(self.cache[key])
+                    continue
+                by_max_iter.setdefault(key[3], []).append(key)
+            for max_iter, keys in by_max_iter.items():
+                x_inits, ns, hs = (np.array(col) for col in zip(*[k[:3] for k in keys]))
+                try:
+                    x, y, z, offsets = await loop.run_in_executor(
+                        self._executor,
+                        lambda: solve_batch(
+                            x_inits, ns, hs, max_iter, self.impl, self.n_threads
+                        )
+                    )
+                except Exception as err: # pylint: disable=broad-except
+                    for key in keys:
+                        for future in waiters[key]:
+                            if not future.done():
+                                future.set_exception(err)
+                    continue
+                self.n_batches += 1
+                for i, key in enumerate(keys):
+                    lo, hi = offsets[i], offsets[i+1]
+                    arrays = (x[lo:hi], y[lo:hi], z[lo:hi])
+                    self._remember(key, arrays)
+                    for future in waiters[key]:
+                        if not future.done():
+                            future.set_result(arrays)
+    async def handle(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter):
+        """
+        Serve one connection. Requests on a connection are answered in order.
+        """
+        try:
+            while True:
+                try:
+                    (size,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+                    body = await reader.readexactly(size)
+                except asyncio.IncompleteReadError:
+                    break
+                try:
+                    request = json.loads(body)
+                    if not isinstance(request, dict):
+                        raise ValueError('A request must be a JSON object')
+                    op = request.get('op', 'solve')
+                    if op == 'lookup':
+                        arrays = self.cache.get(self.get_key(request))
+                        payload = encode_response('miss' if arrays is None else 'ok', arrays)
+                    elif op == 'solve':
+                        payload = encode_response('ok', await self.submit(request))
+                    else:
+                        raise ValueError(f'Unknown op {op}')
+                except Exception as err: # pylint: disable=broad-except
+                    payload = encode_response('error', message=f'{type(err).__name__}: {err}')
+                writer.write(_LENGTH.pack(len(payload)) + payload)
+                await writer.drain()
+        finally:
+            writer.close()
+    async def serve(self, path:str=None, host:str='127.0.0.1', port:int=None, ready=None):
+        """
+        Serve until cancelled, on a Unix socket if ``path`` is given
+        and on ``host:port`` otherwise.
+
+        Parameters
+        ----------
+        path : str, optional
+            The path of the Unix socket.
+        host : str, optional
+            The host to bind. The default is '127.0.0.1'.
+        port : int, optional
+            The TCP port. 0 picks a free port.
+        ready : Callable, optional
+            Called with the bound address once the server is listening.
+        """
+        self._queue = asyncio.Queue()
+        batcher = asyncio.ensure_future(self._batcher())
+        if path is not None:
+            server = await asyncio.start_unix_server(self.handle, path=path)
+        else:
+            server = await asyncio.start_server(self.handle, host=host, port=port)
+        if ready is not None:
+            ready(server.sockets[0].getsockname())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            self._executor.shutdown(wait=False)
+
+
+class Client:
+    """
+    A blocking client for ``SolverServer``.
+
+    Parameters
+    ----------
+    path : str, optional
+        The path of the Unix socket.
+    host : str, optional
+        The host. The default is '127.0.0.1'.
+    port : int, optional
+        The TCP port.
+    """
+    def __init__(self, path:str=None, host:str='127.0.0.1', port:int=None):
+        if path is not None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(path)
+        else:
+            self.sock = socket.create_connection((host, port))
+    def close(self):
+        """
+        Close the connection.
+        """
+        self.sock.close()
+    def __enter__(self):
+        return self
+    def __exit__(self, *args):
+        self.close()
+    def _recv_exactly(self, size:int) -> bytes:
+        buf = bytearray(size)
+        view = memoryview(buf)
+        while size:
+            got = self.sock.recv_into(view, size)
+            if not got:
+                raise ConnectionError('The server closed the connection')
+            view = view[got:]
+            size -= got
+        return bytes(buf)
+    def request(self, **request):
+        """
+        Send a request and wait for the response.
+
+        Returns
+        -------
+        header : dict
+            The response header.
+        arrays : tuple of np.ndarray or None
+            The x, y and z arrays.
+        """
+        payload = json.dumps(request).encode()
+        self.sock.sendall(_LENGTH.pack(len(payload)) + payload)
+        (size,) = _LENGTH.unpack(self._recv_exactly(_LENGTH.size))
+        header, arrays = decode_response(self._recv_exactly(size))
+        if header['status'] == 'error':
+            raise RuntimeError(header.get('message', 'server error'))
+        return header, arrays
+    def solve(self, x_init:float, n:float, h:float, max_iter:int=1000):
+        """
+        Solve the Lane-Emden equation on the server.
+
+        Returns
+        -------
+        x, y, z : np.ndarray
+            The profile.
+        """
+        _, arrays = self.request(op='solve', x_init=x_init, n=n, h=h, max_iter=max_iter)
+        return arrays
+    def lookup(self, x_init:float, n:float, h:float, max_iter:int=1000):
+        """
+        Get a cached solution without solving.
+
+        Returns
+        -------
+        tuple of np.ndarray or None
+            The x, y and z arrays, or None if the result is not cached.
+        """
+        _, arrays = self.request(op='lookup', x_init=x_init, n=n, h=h, max_iter=max_iter)
+        return arrays
+
+
+def main(argv=None):
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(prog='polysolver')
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve', help='Run the solver daemon.')
+    where = serve.add_mutually_exclusive_group(required=True)
+    where.add_argument('--unix', help='Path of the Unix socket.')
+    where.add_argument('--port', type=int, help='TCP port on --host.')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--window', type=float, default=0.002)
+    serve.add_argument('--max-batch', type=int, default=256)
+    serve.add_argument('--cache-size', type=int, default=1024)
+    serve.add_argument('--cache-bytes', type=int, default=CACHE_BYTES)
+    serve.add_argument('--impl', default='rust', choices=('rust', 'python'))
+    serve.add_argument('--threads', type=int, default=None)
+    args = parser.parse_args(argv)
+    server = SolverServer(
+        window=args.window,
+        max_batch=args.max_batch,
+        cache_size=args.cache_size,
+        cache_bytes=args.cache_bytes,
+        impl=args.impl,
+        n_threads=args.threads
+    )
+    try:
+        asyncio.run(server.serve(
+            path=args.unix,
+            host=args.host,
+            port=args.port,
+            ready=lambda addr: print(f'polysolver serving on {addr}', flush=True)
+        ))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
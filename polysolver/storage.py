@@ -0,0 +1,222 @@
+"""
+A compact binary layout for solutions, readable without copying.
+
+Layout
+------
+All values are little-endian.
+
+==========  =======================================================
+bytes       content
+==========  =======================================================
+4           ``MAGIC``
+2           ``uint16`` format version, see ``VERSION``
+2           reserved, zero
+4           ``uint32`` length of the header
+...         the header, UTF-8 JSON
+...         zero padding to a multiple of 8 bytes
+...         each array back to back, each padded to 8 bytes
+==========  =======================================================
+
+The header has a ``kind`` (``star``, ``composite`` or ``ensemble``), the metadata of
+the object and ``arrays``, a list of ``{"name", "dtype", "length"}`` in
+the order they are stored. Because every array starts on an 8-byte
+boundary, the arrays can be viewed in place with ``np.frombuffer`` or
+mapped from a file with ``np.memmap``.
+
+A uniform grid, such as one produced by the solvers, can be stored as
+its first value and step instead of the full x array. The integrators
+build their grid by adding the step one value at a time, which
+``np.cumsum`` repeats exactly (rule ``sum``), while the closed-form
+solutions use ``x0 + dx*np.arange(length)`` (rule ``product``). A grid
+is only stored this way if one of the rules reproduces it exactly.
+"""
+import json
+import struct
+
+import numpy as np
+
+MAGIC = b'PLYS'
+VERSION = 1
+DTYPES = ('<f8', '<f4')
+_PREFIX = struct.Struct('<4sHHI')
+_ALIGN = 8
+
+
+def _padding(size:int)->int:
+    return -size % _ALIGN
+
+
+def pack(header:dict,arrays:dict)->bytes:
+    """
+    Pack a header and named arrays into one buffer.
+
+    Parameters
+    ----------
+    header : dict
+        JSON-serialisable metadata.
+    arrays : dict
+        The arrays to store, by name, in order.
+
+    Returns
+    -------
+    bytes
+        The buffer.
+    """
+    header = dict(header)
+    header['arrays'] = [
+        {'name': name, 'dtype': np.dtype(arr.dtype).newbyteorder('<').str, 'length': int(arr.size)}
+        for name, arr in arrays.items()
+    ]
+    text = json.dumps(header).encode()
+    parts = [_PREFIX.pack(MAGIC,VERSION,0,len(text)),text]
+    parts.append(b'\0'*_padding(_PREFIX.size+len(text)))
+    for spec, arr in zip(header['arrays'],arrays.values()):
+        data = np.ascontiguousarray(arr,dtype=spec['dtype']).tobytes()
+        parts.append(data)
+        parts.append(b'\0'*_padding(len(data)))
+    return b''.join(parts)
+
+
+def read_header(buffer)->tuple:
+    """
+    Read the header of a buffer.
+
+    Returns
+    -------
+    header : dict
+        The header.
+    offset : int
+        Where the first array starts.
+
+    Raises
+    ------
+    ValueError
+        If the buffer is not in this format or is from a newer version.
+    """
+    magic, version, _, size = _PREFIX.unpack_from(buffer)
+    if magic != MAGIC:
+        raise ValueError('Not a polysolver buffer')
+    if version > VERSION:
+        raise ValueError(f'Format version {version} is newer than {VERSION}')
+    start = _PREFIX.size
+    header = json.loads(bytes(buffer[start:start+size]))
+    offset = start + size
+    return header, offset + _padding(offset)
+
+
+def _arrays(header:dict,offset:int,view)->dict:
+    arrays = {}
+    for spec in header['arrays']:
+        dtype = np.dtype(spec['dtype'])
+        arrays[spec['name']] = view(dtype,offset,spec['length'])
+        size = dtype.itemsize*spec['length']
+        offset += size + _padding(size)
+    return arrays
+
+
+def unpack(buffer)->tuple:
+    """
+    Unpack a buffer without copying the arrays.
+
+    Parameters
+    ----------
+    buffer : bytes-like
+        The buffer.
+
+    Returns
+    -------
+    header : dict
+        The header.
+    arrays : dict
+        Read-only views of the arrays, by name.
+    """
+    header, offset = read_header(buffer)
+    def view(dtype,start,length):
+        return np.frombuffer(buffer,dtype=dtype,count=length,offset=start)
+    return header, _arrays(header,offset,view)
+
+
+def load(path,mmap:bool=True)->tuple:
+    """
+    Load a file written with ``save``.
+
+    Parameters
+    ----------
+    path : str or Path
+        The file.
+    mmap : bool, optional
+        Map the arrays from the file instead of reading them.
+        The default is True.
+
+    Returns
+    -------
+    header : dict
+        The header.
+    arrays : dict
+        The arrays, by name.
+    """
+    if not mmap:
+        with open(path,'rb') as file:
+            return unpack(file.read())
+    with open(path,'rb') as file:
+        prefix = file.read(_PREFIX.size)
+        _, _, _, size = _PREFIX.unpack(prefix)
+        header, offset = read_header(prefix + file.read(size))
+    def view(dtype,start,length):
+        if length == 0:
+            return np.zeros(0,dtype=dtype)
+        return np.memmap(path,dtype=dtype,mode='r',offset=start,shape=(length,))
+    return header, _arrays(header,offset,view)
+
+
+def save(path,buffer:bytes):
+    """
+    Write a buffer from ``pack`` to a file.
+    """
+    with open(path,'wb') as file:
+        file.write(buffer)
+
+
+def encode_x(x:np.ndarray,h:float=None,x_encoding:str='auto')->tuple:
+    """
+    Choose how to store an x array.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        The x values.
+    h : float, optional
+        The step of the grid, if known.
+    x_encoding : str, optional
+        'raw' stores every value; 'uniform' stores only the first value
+        and the step, and fails unless that reproduces ``x`` exactly;
+        'auto' uses 'uniform' when possible. The default is 'auto'.
+
+    Returns
+    -------
+    meta : dict
+        The header entries describing x.
+    arrays : dict
+        The arrays to store for x.
+    """
+    if x_encoding not in ('auto','raw','uniform'):
+        raise ValueError("x_encoding must be 'auto', 'raw' or 'uniform'")
+    if x_encoding != 'raw' and len(x) > 1:
+        step = float(h) if h is not None else float(x[1] - x[0])
+        for rule in ('sum','product'):
+            if np.array_equal(decode_x(float(x[0]),step,len(x),rule),x):
+                return {'x_encoding': 'uniform', 'x0': float(x[0]), 'dx': step, 'x_rule': rule}, {}
+    if x_encoding == 'uniform':
+        raise ValueError('x is not a uniform grid')
+    return {'x_encoding': 'raw'}, {'x': x}
+
+
+def decode_x(x0:float,dx:float,length:int,rule:str='sum')->np.ndarray:
+    """
+    Rebuild a uniform grid stored by ``encode_x``.
+    """
+    if rule == 'product':
+        return x0 + dx*np.arange(length)
+    steps = np.full(length,dx)
+    steps[0] = x0
+    return np.cumsum(steps)
@@ -0,0 +1,341 @@
+"""
+A precomputed surrogate of the Lane-Emden solutions for instant profiles.
+
+:math:`\\theta` and :math:`d\\theta/ds` are stored as functions of the
+index :math:`n` and the normalised radius :math:`s=\\xi/\\xi_1`, as
+tensor-product Chebyshev polynomials on a grid of panels. The panels are
+graded towards the centre, where the profiles of large :math:`n` are
+concentrated, towards the surface, where :math:`\\theta` has a weak
+singularity, and towards ``N_MAX``. :math:`\\ln\\xi_1` is stored on the
+same panels in :math:`n`.
+
+The coefficients are built offline from solves in :math:`\\ln\\xi`
+(``solve(..., coord='log')``) that end exactly on the surface, and are
+shipped as ``data/surrogate.npz``. The table also records the largest
+error measured against fresh solves at random indices; for the shipped
+table it is about :math:`4\\times10^{-8}` in :math:`\\theta` and
+:math:`5\\times10^{-5}` in :math:`d\\theta/ds`, the latter only near the
+surface for :math:`n\\lesssim0.2` and near ``N_MAX``. Rebuild the table
+with ``python -m polysolver.surrogate``.
+
+As :math:`n\\to5`, :math:`\\xi_1` diverges and the normalised profile
+collapses onto the centre, so the surrogate stops at ``N_MAX``.
+"""
+from functools import lru_cache
+from pathlib import Path
+import numpy as np
+from numpy.polynomial import chebyshev
+
+from polysolver.polysolver import solve, solve_python_until
+from polysolver.dense import DenseSolution
+
+N_MAX = 4.9
+DATA = Path(__file__).with_name('data')/'surrogate.npz'
+N_BREAKS = (0, 0.25, 0.5, 1, 1.5, 2, 2.5, 3, 3.5, 4, 4.25, 4.5, 4.65, 4.8, N_MAX)
+S_BREAKS = (0,) + tuple(2.**-k for k in range(8,0,-1)) + (0.75, 0.875, 0.9375, 0.96875, 1)
+DEGREE_N = 8
+DEGREE_S = 12
+_CHUNK = 65536
+
+
+def _nodes(degree:int)->np.ndarray:
+    """
+    The Chebyshev-Gauss points on [-1, 1], in increasing order.
+    """
+    return -np.cos(np.pi*(np.arange(degree+1) + 0.5)/(degree+1))
+
+
+def _vander(u:np.ndarray,degree:int)->np.ndarray:
+    """
+    :math:`T_k(u)` for :math:`k \\leq` ``degree``, with :math:`u` in [-1, 1].
+    """
+    return np.cos(np.arccos(np.clip(u,-1,1))[:,None]*np.arange(degree+1))
+
+
+def reference(n:float,h:float=1e-3,impl:str='rust')->DenseSolution:
+    """
+    A solution accurate enough to build the surrogate from.
+
+    The profile is integrated in :math:`\\ln\\xi`, and the last few percent
+    in :math:`\\xi` with an event that ends exactly on :math:`\\theta=0`,
+    so that no step crosses the surface, where :math:`\\theta^n` is not
+    smooth.
+
+    Parameters
+    ----------
+    n : float
+        The index of the polytrope.
+    h : float, optional
+        The step in :math:`\\ln\\xi`. The default is 1e-3.
+    impl : str, optional
+        The implementation used for the bulk of the profile.
+        The default is 'rust'.
+
+    Returns
+    -------
+    DenseSolution
+        The solution, whose last point is the surface.
+    """
+    n = float(n)
+    x,y,z = solve(1e-4,n,h,10**7,impl,coord='log')
+    k = np.searchsorted(x,0.95*x[-1])
+    tail = solve_python_until(
+        float(x[k]),n,0.1*h*float(x[k]),10**7,[('theta',0.)],start=(y[k],z[k]),x_max=np.inf
+    )
+    return DenseSolution(
+        np.concatenate([x[:k],tail[0]]),
+        np.concatenate([y[:k],tail[1]]),
+        np.concatenate([z[:k],tail[2]]),
+        n
+    )
+
+
+def _sample(sol:DenseSolution,s:np.ndarray):
+    """
+    :math:`\\theta` and :math:`d\\theta/ds` of a reference solution, using
+    the series :math:`1-\\xi^2/6` inside its first point.
+    """
+    x = s*sol.xi1
+    inner = x < sol.x[0]
+    x_in = np.maximum(x,sol.x[0])
+    theta = np.where(inner,1 - x**2/6,sol(x_in))
+    dtheta = np.where(inner,-x/3,sol.theta_prime(x_in))*sol.xi1
+    return theta, dtheta
+
+
+class Surrogate:
+    """
+    Chebyshev surrogate of :math:`\\theta(s; n)` with :math:`s=\\xi/\\xi_1`.
+
+    Parameters
+    ----------
+    n_breaks : np.ndarray
+        The edges of the panels in :math:`n`.
+    s_breaks : np.ndarray
+        The edges of the panels in :math:`s`, from 0 to 1.
+    theta : np.ndarray
+        The coefficients of :math:`\\theta`, shape
+        ``(len(n_breaks)-1, len(s_breaks)-1, degree_n+1, degree_s+1)``.
+    dtheta : np.ndarray
+        The coefficients of :math:`d\\theta/ds`, with the same shape.
+    log_xi1 : np.ndarray
+        The coefficients of :math:`\\ln\\xi_1`, shape
+        ``(len(n_breaks)-1, degree_n+1)``.
+    max_error : dict, optional
+        The largest errors measured when the table was built.
+
+    Examples
+    --------
+    >>> surrogate = load()
+    >>> s = np.linspace(0, 1, 100)
+    >>> theta = surrogate.theta(np.array([[1.5], [3.0]]), s)
+    """
+    def __init__(
+        self,
+        n_breaks:np.ndarray,
+        s_breaks:np.ndarray,
+        theta:np.ndarray,
+        dtheta:np.ndarray,
+        log_xi1:np.ndarray,
+        max_error:dict=None
+    ):
+        self.n_breaks = np.asarray(n_breaks,dtype=np.float64)
+        self.s_breaks = np.asarray(s_breaks,dtype=np.float64)
+        self.coef_theta = np.asarray(theta,dtype=np.float64)
+        self.coef_dtheta = np.asarray(dtheta,dtype=np.float64)
+        self.coef_log_xi1 = np.asarray(log_xi1,dtype=np.float64)
+        self.max_error = {} if max_error is None else dict(max_error)
+    @property
+    def degree_n(self)->int:
+        return self.coef_theta.shape[2] - 1
+    @property
+    def degree_s(self)->int:
+        return self.coef_theta.shape[3] - 1
+    @property
+    def n_max(self)->float:
+        return float(self.n_breaks[-1])
+    @classmethod
+    def build(
+        cls,
+        n_breaks=N_BREAKS,
+        s_breaks=S_BREAKS,
+        degree_n:int=DEGREE_N,
+        degree_s:int=DEGREE_S,
+        h:float=1e-3,
+        impl:str='rust',
+        n_check:int=16
+    ):
+        """
+        Build the surrogate by interpolating reference solutions at the
+        Chebyshev points of every panel, then measure its error against
+        ``n_check`` further solutions at random indices.
+
+        Parameters
+        ----------
+        n_breaks, s_breaks : sequence of float, optional
+            The edges of the panels.
+        degree_n, degree_s : int, optional
+            The degree of the polynomials in each panel.
+        h : float, optional
+            The step of the reference solutions in :math:`\\ln\\xi`.
+        impl : str, optional
+            The implementation used for the reference solutions.
+        n_check : int, optional
+            The number of indices used to measure the error.
+
+        Returns
+        -------
+        Surrogate
+            The surrogate.
+        """
+        n_breaks = np.asarray(n_breaks,dtype=np.float64)
+        s_breaks = np.asarray(s_breaks,dtype=np.float64)
+        u_n = _nodes(degree_n)
+        u_s = _nodes(degree_s)
+        inv_n = np.linalg.inv(chebyshev.chebvander(u_n,degree_n))
+        inv_s = np.linalg.inv(chebyshev.chebvander(u_s,degree_s))
+        s = s_breaks[:-1,None] + 0.5*(u_s + 1)*np.diff(s_breaks)[:,None]
+        shape = (len(n_breaks)-1,len(s_breaks)-1,degree_n+1,degree_s+1)
+        theta = np.empty(shape)
+        dtheta = np.empty(shape)
+        log_xi1 = np.empty(shape[::2])
+        for i in range(len(n_breaks)-1):
+            ns = n_breaks[i] + 0.5*(u_n + 1)*(n_breaks[i+1] - n_breaks[i])
+            values = np.empty((2,)+shape[1:])
+            for j, n in enumerate(ns):
+                sol = reference(n,h,impl)
+                values[0,:,j], values[1,:,j] = _sample(sol,s)
+                log_xi1[i,j] = np.log(sol.xi1)
+            theta[i] = inv_n @ values[0] @ inv_s.T
+            dtheta[i] = inv_n @ values[1] @ inv_s.T
+            log_xi1[i] = inv_n @ log_xi1[i]
+        surrogate = cls(n_breaks,s_breaks,theta,dtheta,log_xi1)
+        rng = np.random.default_rng(0)
+        surrogate.max_error = surrogate.measure_error(
+            rng.uniform(n_breaks[0],n_breaks[-1],n_check),h=h,impl=impl
+        )
+        return surrogate
+    def measure_error(self,ns,n_points:int=2001,h:float=1e-3,impl:str='rust')->dict:
+        """
+        The largest errors of the surrogate against reference solutions.
+
+        Parameters
+        ----------
+        ns : sequence of float
+            The indices to check.
+        n_points : int, optional
+            The number of radii to check, uniform in :math:`s`.
+        h, impl : optional
+            See ``reference``.
+
+        Returns
+        -------
+        dict
+            The largest absolute errors in 'theta', 'dtheta_ds' and 'xi1'
+            (the last one relative).
+        """
+        s = np.linspace(0,1,n_points)
+        errors = {'theta': 0., 'dtheta_ds': 0., 'xi1': 0.}
+        for n in ns:
+            sol = reference(n,h,impl)
+            theta, dtheta = _sample(sol,s)
+            errors['theta'] = max(errors['theta'],float(np.max(np.abs(self.theta(n,s) - theta))))
+            errors['dtheta_ds'] = max(errors['dtheta_ds'],float(np.max(np.abs(self.dtheta_ds(n,s) - dtheta))))
+            errors['xi1'] = max(errors['xi1'],float(abs(self.xi1(n)/sol.xi1 - 1)))
+        return errors
+    def save(self,path=DATA):
+        """
+        Write the coefficients to an ``.npz`` file.
+        """
+        np.savez_compressed(
+            path,
+            n_breaks=self.n_breaks,
+            s_breaks=self.s_breaks,
+            theta=self.coef_theta,
+            dtheta=self.coef_dtheta,
+            log_xi1=self.coef_log_xi1,
+            max_error_keys=np.array(list(self.max_error),dtype=str),
+            max_error_values=np.array(list(self.max_error.values()),dtype=np.float64)
+        )
+    @classmethod
+    def load(cls,path=DATA):
+        """
+        Read coefficients written by ``save``.
+        """
+        with np.load(path) as data:
+            max_error = dict(zip(data['max_error_keys'].tolist(),data['max_error_values'].tolist()))
+            return cls(
+                data['n_breaks'],data['s_breaks'],data['theta'],data['dtheta'],data['log_xi1'],max_error
+            )
+    def _panel_n(self,n:np.ndarray):
+        if n.min(initial=0) < self.n_breaks[0] or n.max(initial=0) > self.n_breaks[-1]:
+            raise ValueError(f'n must be between {self.n_breaks[0]} and {self.n_breaks[-1]}')
+        i = np.clip(np.searchsorted(self.n_breaks,n,side='right') - 1,0,len(self.n_breaks)-2)
+        u = 2*(n - self.n_breaks[i])/(self.n_breaks[i+1] - self.n_breaks[i]) - 1
+        return i, _vander(u,self.degree_n)
+    def _evaluate(self,coef:np.ndarray,n,s)->np.ndarray:
+        n, s = np.broadcast_arrays(np.asarray(n,dtype=np.float64),np.asarray(s,dtype=np.float64))
+        shape = n.shape
+        n = n.ravel()
+        s = s.ravel()
+        out = np.empty(len(n))
+        for start in range(0,len(n),_CHUNK):
+            part = slice(start,start+_CHUNK)
+            i, t_n = self._panel_n(n[part])
+            s_part = np.clip(s[part],0,1)
+            k = np.clip(np.searchsorted(self.s_breaks,s_part,side='right') - 1,0,len(self.s_breaks)-2)
+            u = 2*(s_part - self.s_breaks[k])/(self.s_breaks[k+1] - self.s_breaks[k]) - 1
+            t_s = _vander(u,self.degree_s)
+            out[part] = np.einsum('pk,pk->p',np.matmul(t_n[:,None,:],coef[i,k])[:,0],t_s)
+        out[(s < 0) | (s > 1)] = np.nan
+        return out.reshape(shape)
+    def xi1(self,n)->np.ndarray:
+        """
+        Get :math:`\\xi_1` for each index.
+        """
+        n = np.asarray(n,dtype=np.float64)
+        i, t_n = self._panel_n(n.ravel())
+        return np.exp(np.einsum('pj,pj->p',t_n,self.coef_log_xi1[i])).reshape(n.shape)
+    def theta(self,n,s)->np.ndarray:
+        """
+        Get :math:`\\theta_n` at normalised radii.
+
+        Parameters
+        ----------
+        n : float or np.ndarray
+            The index, between 0 and ``n_max``.
+        s : float or np.ndarray
+            The normalised radius :math:`\\xi/\\xi_1`. Broadcast against
+            ``n``; values outside [0, 1] give NaN.
+
+        Returns
+        -------
+        np.ndarray
+            :math:`\\theta_n`.
+        """
+        return self._evaluate(self.coef_theta,n,s)
+    __call__ = theta
+    def dtheta_ds(self,n,s)->np.ndarray:
+        """
+        Get :math:`d\\theta_n/ds`, see ``theta``.
+        """
+        return self._evaluate(self.coef_dtheta,n,s)
+    def theta_prime(self,n,s)->np.ndarray:
+        """
+        Get :math:`\\frac{d\\theta_n}{d\\xi}` at normalised radii, see ``theta``.
+        """
+        return self.dtheta_ds(n,s)/self.xi1(np.broadcast_to(n,np.broadcast(n,s).shape))
+
+
+@lru_cache(maxsize=None)
+def load()->Surrogate:
+    """
+    Get the surrogate shipped with the package. It is read once.
+    """
+    return Surrogate.load(DATA)
+
+
+if __name__ == '__main__':
+    built = Surrogate.build()
+    built.save(DATA)
+    print(built.max_error)
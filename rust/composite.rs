@@ -0,0 +1,164 @@
+//// Composite polytropes: several zones, each with its own index, joined
+//// at interfaces where the pressure and the enclosed mass are continuous.
+////
+//// Zone `k` has its own Lane-Emden variable `theta_k(xi_k)` with
+//// `P = P_k theta_k^(n_k+1)`, `rho = rho_k theta_k^n_k` and `r = a_k xi_k`.
+//// Every zone after the first starts at `theta_k = 1`, so `P_k` and `rho_k`
+//// are the pressure and density just outside its inner interface. The
+//// enclosed mass is `m = -4 pi rho_k a_k^3 xi_k^2 theta_k'`.
+////
+//// Crossing an interface where `theta_-` is reached, with a density ratio
+//// `q = rho_+ / rho_-`, the homology rescaling is
+////
+////     s = a_+ / a_- = sqrt((n_+ + 1) / (n_- + 1) * theta_-^(1 - n_-) / q^2)
+////     xi_+ = xi_- / s
+////     theta_+' = theta_-' / (q theta_-^n_- s)
+////
+//// Radii are returned in units of the length scale of the first zone,
+//// densities and pressures in units of the central values and masses in
+//// units of `4 pi rho_c a_1^3`, so a single zone is an ordinary polytrope.
+
+use crate::solve_poly::{self, Stop};
+
+/// A composite polytrope. Zone `k` occupies `starts[k]..starts[k+1]` of the
+/// profile (or `starts[k]..` for the last zone reached); `x` is in units of
+/// the first length scale while `y` and `z` are that zone's own `theta_k`
+/// and `d theta_k / d xi_k`.
+pub struct Composite {
+    pub xs: Vec<f64>,
+    pub ys: Vec<f64>,
+    pub zs: Vec<f64>,
+    pub starts: Vec<usize>,
+    pub scales: Vec<f64>,
+    pub densities: Vec<f64>,
+    pub pressures: Vec<f64>,
+}
+
+/// Move a stop condition from the units of the first zone into those of a
+/// zone with length scale `scale` and inner density `density`.
+fn local_stop(stop: &Stop, scale: f64, density: f64) -> Stop {
+    match *stop {
+        Stop::Xi(xi) => Stop::Xi(xi / scale),
+        Stop::Theta(theta) => Stop::Theta(theta),
+        Stop::Mass(mass) => Stop::Mass(mass / (density * scale.powi(3))),
+    }
+}
+
+/// Integrate a composite polytrope in one pass.
+///
+/// `ns` holds the index of each zone from the centre outwards. Zone `k`
+/// ends at `interfaces[k]`, where `Stop::Xi` is a radius in units of the
+/// first length scale, `Stop::Theta` is that zone's own `theta_k` and
+/// `Stop::Mass` is the enclosed mass in units of `4 pi rho_c a_1^3`. The
+/// density jumps by `density_jumps[k]` going out of zone `k`; 1 keeps it
+/// continuous. The integration ends at the surface, after `max_iter` steps
+/// in total, or if a zone reaches its surface before its interface.
+///
+/// `h` is the step in units of the first length scale; each zone steps by
+/// the same physical length.
+pub fn solve_composite(
+    x_init: f64,
+    ns: &[f64],
+    interfaces: &[Stop],
+    density_jumps: &[f64],
+    h: f64,
+    max_iter: u32
+) -> Composite {
+    let mut out = Composite {
+        xs: Vec::new(),
+        ys: Vec::new(),
+        zs: Vec::new(),
+        starts: Vec::new(),
+        scales: Vec::new(),
+        densities: Vec::new(),
+        pressures: Vec::new(),
+    };
+    let (mut scale, mut density, mut pressure) = (1.0, 1.0, 1.0);
+    let (mut x, mut y, mut z) = (x_init, 1.0, 0.0);
+    let mut remaining = max_iter;
+    for (k, &n) in ns.iter().enumerate() {
+        out.starts.push(out.xs.len());
+        out.scales.push(scale);
+        out.densities.push(density);
+        out.pressures.push(pressure);
+        let stops: Vec<Stop> = interfaces
+            .get(k)
+            .filter(|_| k + 1 < ns.len())
+            .map(|stop| local_stop(stop, scale, density))
+            .into_iter()
+            .collect();
+        // The first zone is bounded like an ordinary polytrope; an envelope
+        // of index n >= 5 can still close on a core, so it is not capped.
+        let x_max = if k == 0 { crate::equations::lane_emden_x_max(n) } else { f64::INFINITY };
+        let (zx, zy, zz, hit) = solve_poly::solve_until_from(x, y, z, n, h / scale, remaining, &stops, x_max);
+        remaining -= (zx.len() - 1) as u32;
+        out.xs.extend(zx.iter().map(|xi| xi * scale));
+        out.ys.extend_from_slice(&zy);
+        out.zs.extend_from_slice(&zz);
+        if hit.is_none() {
+            break;
+        }
+        let (xi_in, theta_in, dtheta_in) = (zx[zx.len() - 1], zy[zy.len() - 1], zz[zz.len() - 1]);
+        if !(theta_in > 0.0) {
+            break;
+        }
+        let n_out = ns[k + 1];
+        let q = density_jumps.get(k).copied().unwrap_or(1.0);
+        let s = ((n_out + 1.0) / (n + 1.0) * theta_in.powf(1.0 - n) / (q * q)).sqrt();
+        x = xi_in / s;
+        y = 1.0;
+        z = dtheta_in / (q * theta_in.powf(n) * s);
+        density *= q * theta_in.powf(n);
+        pressure *= theta_in.powf(n + 1.0);
+        scale *= s;
+    }
+    out
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn test_single_zone_is_solve() {
+        let c = solve_composite(1e-10, &[1.5], &[], &[], 1e-2, 100000);
+        let (xs, ys, zs) = solve_poly::solve(1e-10, 1.5, 1e-2, 100000);
+        assert_eq!(c.xs, xs);
+        assert_eq!(c.ys, ys);
+        assert_eq!(c.zs, zs);
+        assert_eq!(c.starts, vec![0]);
+    }
+
+    #[test]
+    fn test_trivial_interface_is_continuous() {
+        // Two zones with the same index and no density jump are one polytrope.
+        let h = 1e-3;
+        for stop in [Stop::Xi(1.3), Stop::Theta(0.6), Stop::Mass(0.5)] {
+            let c = solve_composite(1e-10, &[1.5, 1.5], &[stop], &[1.0], h, 100000);
+            assert_eq!(c.starts.len(), 2);
+            let last = c.xs.len() - 1;
+            let xi1 = c.xs[last - 1] - c.ys[last - 1] * (c.xs[last] - c.xs[last - 1]) / (c.ys[last] - c.ys[last - 1]);
+            let (xs, ys, _) = solve_poly::solve(1e-10, 1.5, h, 100000);
+            let end = xs.len() - 1;
+            let xi1_single = xs[end - 1] - ys[end - 1] * (xs[end] - xs[end - 1]) / (ys[end] - ys[end - 1]);
+            assert!((xi1 - xi1_single).abs() < 1e-6, "{} {}", xi1, xi1_single);
+            // Pressure is continuous across the interface.
+            let i = c.starts[1];
+            let p_in = c.ys[i - 1].powf(2.5);
+            assert!((p_in - c.pressures[1]).abs() < 1e-14);
+            // So is the enclosed mass.
+            let m_in = -c.xs[i - 1].powi(2) * c.zs[i - 1];
+            let xi_out = c.xs[i] / c.scales[1];
+            let m_out = -c.densities[1] * c.scales[1].powi(3) * xi_out * xi_out * c.zs[i];
+            assert!((m_in - m_out).abs() < 1e-12 * m_in);
+        }
+    }
+
+    #[test]
+    fn test_surface_before_interface() {
+        let c = solve_composite(1e-10, &[1.0, 3.0], &[Stop::Xi(10.0)], &[1.0], 1e-2, 100000);
+        assert_eq!(c.starts, vec![0]);
+        assert!(c.ys[c.ys.len() - 1] <= 0.0);
+        assert!(c.xs[c.xs.len() - 1] < 3.2);
+    }
+}
@@ -21,4 +21,54 @@ pub fn get_zprime(n: f64) -> Box<dyn Fn(f64, f64, f64) -> f64> {
         return (-1.0 * y).powf(n) - 2.0 / x * z
         
     })
-}
\ No newline at end of file
+}
+
+/// Right-hand side of the Lane-Emden equation in `t = ln(x)`.
+/// The state is `[y, v]` with `v = x dy/dx`, so that
+/// `dy/dt = v` and `dv/dt = -v - exp(2t) y^n`.
+pub fn get_log_rhs(n: f64) -> Box<dyn Fn(f64, &[f64; 2]) -> [f64; 2]> {
+    Box::new(move |t, state| {
+        let [y, v] = *state;
+        let source = if y >= 0.0 { -y.powf(n) } else { (-y).powf(n) };
+        [v, -v + (2.0 * t).exp() * source]
+    })
+}
+
+/// Right-hand side of the Lane-Emden equation extended with the forward
+/// sensitivities `s = dy/dn` and `w = dz/dn`. The state is `[y, z, s, w]`.
+pub fn get_sensitivity_rhs(n: f64) -> Box<dyn Fn(f64, &[f64; 4]) -> [f64; 4]> {
+    Box::new(move |x, state| {
+        let [y, z, s, w] = *state;
+        let abs_y = y.abs();
+        let source = if y >= 0.0 { -abs_y.powf(n) } else { abs_y.powf(n) };
+        let (dsource_dn, dsource_dy) = if abs_y > 0.0 {
+            (source * abs_y.ln(), -n * abs_y.powf(n - 1.0))
+        } else {
+            (0.0, 0.0)
+        };
+        [
+            z,
+            source - 2.0 / x * z,
+            w,
+            dsource_dn + dsource_dy * s - 2.0 / x * w,
+        ]
+    })
+}
+
+/// The sensitivity equations near the surface for `0 < n < 1`, with
+/// `u = y^n` as the independent variable, where `n y^(n-1) s` is no
+/// longer singular. The state is `[x, z, s, w]`, integrated down to `u = 0`.
+pub fn get_sensitivity_tail_rhs(n: f64) -> Box<dyn Fn(f64, &[f64; 4]) -> [f64; 4]> {
+    Box::new(move |u, state| {
+        let [x, z, s, w] = *state;
+        let y = u.max(0.0).powf(1.0 / n);
+        let a = y.powf(1.0 - n);
+        let y_log_y = if y > 0.0 { y * y.ln() } else { 0.0 };
+        [
+            a / (n * z),
+            -(y + 2.0 * z * a / x) / (n * z),
+            w * a / (n * z),
+            -(y_log_y + 2.0 * w * a / x) / (n * z) - s / z,
+        ]
+    })
+}
@@ -0,0 +1,133 @@
+//// Registry of equation families solved by the same stepper
+///
+/// Every family is a second order equation for y(x) written as
+/// y' = z, z' = f(x, y, z), starting from `y_init` with z = 0 and ending
+/// at the surface where y falls to `y_surface`.
+use crate::derivatives;
+
+pub const NAMES: [&str; 4] = ["lane_emden", "isothermal", "white_dwarf", "emden_fowler"];
+
+#[derive(Clone, Copy, Debug, PartialEq)]
+pub enum Equation {
+    /// theta'' + 2/x theta' = -theta^n, with params `[n]`.
+    LaneEmden { n: f64 },
+    /// psi'' + 2/x psi' = exp(-psi), with no params. y is psi, which
+    /// grows without bound, so there is no surface.
+    Isothermal,
+    /// Chandrasekhar's white dwarf equation
+    /// phi'' + 2/x phi' = -(phi^2 - c)^(3/2), with params `[c]`
+    /// where c = 1/y0^2. The surface is at phi = sqrt(c).
+    WhiteDwarf { c: f64 },
+    /// The generalized Emden-Fowler equation
+    /// y'' + a/x y' = -x^b y^n, with params `[n, a, b]`.
+    EmdenFowler { n: f64, a: f64, b: f64 },
+}
+
+/// Lane-Emden solutions with `n >= UNBOUNDED_N` never reach `y = 0`.
+pub const UNBOUNDED_N: f64 = 5.0;
+/// Where integrations of unbounded solutions stop.
+pub const UNBOUNDED_XI: f64 = 20.0;
+
+/// The largest x to integrate the Lane-Emden equation to.
+pub fn lane_emden_x_max(n: f64) -> f64 {
+    if n >= UNBOUNDED_N {
+        UNBOUNDED_XI
+    } else {
+        f64::INFINITY
+    }
+}
+
+impl Equation {
+    pub fn from_name(name: &str, params: &[f64]) -> Result<Equation, String> {
+        let expect = |count: usize| -> Result<(), String> {
+            if params.len() == count {
+                Ok(())
+            } else {
+                Err(format!("{} takes {} parameters, got {}", name, count, params.len()))
+            }
+        };
+        match name {
+            "lane_emden" => {
+                expect(1)?;
+                Ok(Equation::LaneEmden { n: params[0] })
+            }
+            "isothermal" => {
+                expect(0)?;
+                Ok(Equation::Isothermal)
+            }
+            "white_dwarf" => {
+                expect(1)?;
+                if !(params[0] > 0.0 && params[0] < 1.0) {
+                    return Err(String::from("white_dwarf requires 0 < c < 1"));
+                }
+                Ok(Equation::WhiteDwarf { c: params[0] })
+            }
+            "emden_fowler" => {
+                expect(3)?;
+                Ok(Equation::EmdenFowler { n: params[0], a: params[1], b: params[2] })
+            }
+            _ => Err(format!("Unknown equation {}, expected one of {:?}", name, NAMES)),
+        }
+    }
+    pub fn y_init(&self) -> f64 {
+        match self {
+            Equation::Isothermal => 0.0,
+            _ => 1.0,
+        }
+    }
+    pub fn y_surface(&self) -> f64 {
+        match self {
+            Equation::Isothermal => f64::NEG_INFINITY,
+            Equation::WhiteDwarf { c } => c.sqrt(),
+            _ => 0.0,
+        }
+    }
+    /// The largest x to integrate to, finite only for unbounded
+    /// Lane-Emden solutions.
+    pub fn x_max(&self) -> f64 {
+        match *self {
+            Equation::LaneEmden { n } => lane_emden_x_max(n),
+            _ => f64::INFINITY,
+        }
+    }
+    pub fn get_zprime(&self) -> Box<dyn Fn(f64, f64, f64) -> f64> {
+        match *self {
+            Equation::LaneEmden { n } => derivatives::get_zprime(n),
+            Equation::Isothermal => Box::new(move |x, y, z| (-y).exp() - 2.0 / x * z),
+            Equation::WhiteDwarf { c } => Box::new(move |x, y, z| {
+                let d = y * y - c;
+                let source = d.abs().powf(1.5);
+                if d >= 0.0 {
+                    -source - 2.0 / x * z
+                } else {
+                    source - 2.0 / x * z
+                }
+            }),
+            Equation::EmdenFowler { n, a, b } => Box::new(move |x, y, z| {
+                let source = x.powf(b) * y.abs().powf(n);
+                if y >= 0.0 {
+                    -source - a / x * z
+                } else {
+                    source - a / x * z
+                }
+            }),
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    #[test]
+    fn test_emden_fowler_is_lane_emden() {
+        let le = Equation::from_name("lane_emden", &[1.5]).unwrap().get_zprime();
+        let ef = Equation::from_name("emden_fowler", &[1.5, 2.0, 0.0]).unwrap().get_zprime();
+        assert_eq!(le(0.3, 0.9, -0.1), ef(0.3, 0.9, -0.1));
+    }
+    #[test]
+    fn test_bad_params() {
+        assert!(Equation::from_name("lane_emden", &[]).is_err());
+        assert!(Equation::from_name("white_dwarf", &[2.0]).is_err());
+        assert!(Equation::from_name("polytrope", &[1.0]).is_err());
+    }
+}
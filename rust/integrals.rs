@@ -0,0 +1,51 @@
+//// Structural integrals accumulated alongside the Lane-Emden solution
+///
+/// All integrals are in units of the central density and the scale length,
+/// so that the mass is in units of rho_c r_n^3, the moment of inertia is in
+/// units of rho_c r_n^5 and the potential energy is in units of
+/// G rho_c^2 r_n^5.
+use std::f64::consts::PI;
+
+#[derive(Clone, Copy, Debug, PartialEq)]
+pub enum Integral {
+    Mass,
+    PotentialEnergy,
+    MomentOfInertia,
+}
+
+impl Integral {
+    pub fn from_name(name: &str) -> Option<Integral> {
+        match name {
+            "mass" => Some(Integral::Mass),
+            "potential_energy" => Some(Integral::PotentialEnergy),
+            "moment_of_inertia" => Some(Integral::MomentOfInertia),
+            _ => None,
+        }
+    }
+    pub fn get_integrand(&self, n: f64) -> Box<dyn Fn(f64, f64, f64) -> f64> {
+        match self {
+            // dm = 4 pi x^2 rho dx
+            Integral::Mass => Box::new(move |x, y, _z| {
+                4.0 * PI * x * x * y.abs().powf(n)
+            }),
+            // dW = -m(x)/x dm with m(x) = -4 pi x^2 z
+            Integral::PotentialEnergy => Box::new(move |x, y, z| {
+                16.0 * PI * PI * x * x * x * z * y.abs().powf(n)
+            }),
+            // dI = 2/3 x^2 dm
+            Integral::MomentOfInertia => Box::new(move |x, y, _z| {
+                8.0 / 3.0 * PI * x * x * x * x * y.abs().powf(n)
+            }),
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    #[test]
+    fn test_from_name() {
+        assert_eq!(Integral::from_name("mass"), Some(Integral::Mass));
+        assert_eq!(Integral::from_name("volume"), None);
+    }
+}
@@ -0,0 +1,199 @@
+//// Advance several Lane-Emden models in lockstep, one per lane.
+////
+//// The state of `LANES` models is kept as struct-of-arrays so that every
+//// stage of the Runge-Kutta step is a loop over fixed-size arrays, which
+//// the compiler vectorises. A lane whose model reaches the surface (or
+//// `max_iter`) is masked off, its profile is handed back and the lane is
+//// refilled with the next model from the shared queue, so lanes stay busy
+//// on mixed-n batches where models need very different numbers of steps.
+////
+//// The arithmetic is the same as `runge_kutta::get_next_xyz`, operation by
+//// operation, so the profiles are identical to those of `solve_poly::solve`.
+
+use std::sync::atomic::{AtomicUsize, Ordering};
+
+use crate::equations;
+use crate::solve_poly;
+
+/// The number of models advanced together on each thread.
+pub const LANES: usize = 4;
+
+type Profile = (Vec<f64>,Vec<f64>,Vec<f64>);
+
+#[inline(always)]
+fn zprime(n: f64, x: f64, y: f64, z: f64) -> f64 {
+    if y >= 0.0 {
+        return -1.0 * y.powf(n) - 2.0 / x * z;
+    }
+    (-1.0 * y).powf(n) - 2.0 / x * z
+}
+
+/// The state of the models in the lanes of one thread.
+struct Lanes {
+    model: [usize; LANES],
+    active: [bool; LANES],
+    iter: [u32; LANES],
+    x_max: [f64; LANES],
+    n: [f64; LANES],
+    h: [f64; LANES],
+    x: [f64; LANES],
+    y: [f64; LANES],
+    z: [f64; LANES],
+}
+
+impl Lanes {
+    fn new() -> Lanes {
+        Lanes {
+            model: [0; LANES],
+            active: [false; LANES],
+            iter: [0; LANES],
+            x_max: [0.0; LANES],
+            n: [0.0; LANES],
+            h: [0.0; LANES],
+            x: [1.0; LANES],
+            y: [1.0; LANES],
+            z: [0.0; LANES],
+        }
+    }
+    /// Take one fourth-order Runge-Kutta step in every lane. Idle lanes
+    /// hold a harmless state with `h = 0` and are stepped too, which keeps
+    /// the loops free of branches.
+    #[inline(always)]
+    fn step(&mut self) {
+        let (n, h, x, y, z) = (self.n, self.h, self.x, self.y, self.z);
+        let mut k = [[0.0; LANES]; 4];
+        let mut l = [[0.0; LANES]; 4];
+        for i in 0..LANES {
+            k[0][i] = h[i] * z[i];
+            l[0][i] = h[i] * zprime(n[i], x[i], y[i], z[i]);
+        }
+        for i in 0..LANES {
+            k[1][i] = h[i] * (z[i] + 0.5 * l[0][i]);
+            l[1][i] = h[i] * zprime(n[i], x[i] + 0.5 * h[i], y[i] + 0.5 * k[0][i], z[i] + 0.5 * l[0][i]);
+        }
+        for i in 0..LANES {
+            k[2][i] = h[i] * (z[i] + 0.5 * l[1][i]);
+            l[2][i] = h[i] * zprime(n[i], x[i] + 0.5 * h[i], y[i] + 0.5 * k[1][i], z[i] + 0.5 * l[1][i]);
+        }
+        for i in 0..LANES {
+            k[3][i] = h[i] * (z[i] + l[2][i]);
+            l[3][i] = h[i] * zprime(n[i], x[i] + h[i], y[i] + k[2][i], z[i] + l[2][i]);
+        }
+        for i in 0..LANES {
+            self.x[i] = x[i] + h[i];
+            self.y[i] = y[i] + (k[0][i] / 6.0 + k[1][i] / 3.0 + k[2][i] / 3.0 + k[3][i] / 6.0);
+            self.z[i] = z[i] + (l[0][i] / 6.0 + l[1][i] / 3.0 + l[2][i] / 3.0 + l[3][i] / 6.0);
+        }
+    }
+}
+
+/// Solve models from the shared queue `next` until it is exhausted.
+fn run(
+    x_inits: &[f64],
+    ns: &[f64],
+    hs: &[f64],
+    max_iter: u32,
+    n_models: usize,
+    next: &AtomicUsize
+) -> Vec<(usize,Profile)> {
+    let mut out = Vec::new();
+    let mut lanes = Lanes::new();
+    let mut profiles: Vec<Profile> = (0..LANES).map(|_| (Vec::new(), Vec::new(), Vec::new())).collect();
+    let mut exhausted = false;
+    loop {
+        for lane in 0..LANES {
+            while !(
+                lanes.active[lane]
+                && lanes.y[lane] > 0.0
+                && lanes.iter[lane] < max_iter
+                && lanes.x[lane] < lanes.x_max[lane]
+            ) {
+                if lanes.active[lane] {
+                    out.push((lanes.model[lane], std::mem::take(&mut profiles[lane])));
+                    lanes.active[lane] = false;
+                }
+                let i = if exhausted { n_models } else { next.fetch_add(1, Ordering::Relaxed) };
+                if i >= n_models {
+                    exhausted = true;
+                    lanes.n[lane] = 0.0;
+                    lanes.h[lane] = 0.0;
+                    lanes.x[lane] = 1.0;
+                    lanes.y[lane] = 1.0;
+                    lanes.z[lane] = 0.0;
+                    break;
+                }
+                lanes.model[lane] = i;
+                lanes.active[lane] = true;
+                lanes.iter[lane] = 0;
+                lanes.x_max[lane] = equations::lane_emden_x_max(ns[i]);
+                lanes.n[lane] = ns[i];
+                lanes.h[lane] = hs[i];
+                lanes.x[lane] = x_inits[i];
+                lanes.y[lane] = 1.0;
+                lanes.z[lane] = 0.0;
+                let (xs, ys, zs) = &mut profiles[lane];
+                xs.push(x_inits[i]);
+                ys.push(1.0);
+                zs.push(0.0);
+            }
+        }
+        if !lanes.active.iter().any(|&a| a) {
+            break;
+        }
+        lanes.step();
+        for lane in 0..LANES {
+            if lanes.active[lane] {
+                lanes.iter[lane] += 1;
+                let (xs, ys, zs) = &mut profiles[lane];
+                xs.push(lanes.x[lane]);
+                ys.push(lanes.y[lane]);
+                zs.push(lanes.z[lane]);
+            }
+        }
+    }
+    out
+}
+
+/// Solve a batch of Lane-Emden models with `LANES` models per thread
+/// advanced in lockstep. The result has the same layout as
+/// `solve_poly::solve_batch`, and the same values.
+pub fn solve_batch_lanes(
+    x_inits: &[f64],
+    ns: &[f64],
+    hs: &[f64],
+    max_iter: u32,
+    n_threads: usize
+) -> (Vec<f64>,Vec<f64>,Vec<f64>,Vec<usize>) {
+    let n_models = ns.len().min(x_inits.len()).min(hs.len());
+    let n_threads = n_threads.max(1).min(((n_models + LANES - 1) / LANES).max(1));
+    let next = AtomicUsize::new(0);
+    let mut solns: Vec<(usize,Profile)> = Vec::with_capacity(n_models);
+    std::thread::scope(|scope| {
+        let handles: Vec<_> = (0..n_threads)
+            .map(|_| scope.spawn(|| run(x_inits, ns, hs, max_iter, n_models, &next)))
+            .collect();
+        for handle in handles {
+            solns.extend(handle.join().unwrap());
+        }
+    });
+    solve_poly::flatten(solns)
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn test_lanes_match_scalar() {
+        let ns = [0.0, 1.5, 3.0, 4.0, 2.5, 5.0, 0.5];
+        let x_inits = [1e-10; 7];
+        let hs = [1e-2, 1e-2, 1e-2, 1e-2, 5e-3, 2e-2, 1e-2];
+        for max_iter in [0, 50, 100000] {
+            for n_threads in [1, 2] {
+                let lanes = solve_batch_lanes(&x_inits, &ns, &hs, max_iter, n_threads);
+                let scalar = solve_poly::solve_batch(&x_inits, &ns, &hs, max_iter, 1);
+                assert_eq!(lanes, scalar);
+            }
+        }
+    }
+}
@@ -1,10 +1,17 @@
 mod runge_kutta;
 mod derivatives;
 mod solve_poly;
+mod integrals;
+mod equations;
+mod lanes;
+mod composite;
 
 use pyo3::prelude::*;
+use pyo3::exceptions::PyValueError;
 use pyo3::Python;
 use pyo3::types::PyList as PyO3List;
+use pyo3::buffer::PyBuffer;
+use std::time::{Duration, Instant};
 // use std::marker::Tuple;
 
 // /// Formats the sum of two numbers as string.
@@ -22,7 +29,9 @@ fn solve(
     h:f64,
     max_iter:u32
 ) -> PyResult<(Py<PyO3List>,Py<PyO3List>,Py<PyO3List>)> {
-    let (xs, ys, zs): (Vec<f64>, Vec<f64>, Vec<f64>) = solve_poly::solve(x_init, n, h, max_iter);
+    let (xs, ys, zs): (Vec<f64>, Vec<f64>, Vec<f64>) = py.allow_threads(
+        || solve_poly::solve(x_init, n, h, max_iter)
+    );
     let x_list = PyO3List::new(py, xs);
     let y_list = PyO3List::new(py, ys);
     let z_list = PyO3List::new(py, zs);
@@ -37,11 +46,411 @@ fn solve(
     result
 }
 
+/// Check that an output buffer is a writable, contiguous, 1-d float64 array
+/// and get its address and length.
+fn out_buffer(buf: &PyBuffer<f64>, name: &str) -> PyResult<(usize, usize)> {
+    if buf.readonly() {
+        return Err(PyValueError::new_err(format!("{} is read-only", name)));
+    }
+    if buf.dimensions() != 1 || !buf.is_c_contiguous() {
+        return Err(PyValueError::new_err(format!("{} must be a contiguous 1-d array", name)));
+    }
+    Ok((buf.buf_ptr() as usize, buf.item_count()))
+}
+
+/// Whether two buffers from `out_buffer` share any bytes.
+fn overlaps(a: (usize, usize), b: (usize, usize)) -> bool {
+    let size = std::mem::size_of::<f64>();
+    let (a_start, a_end) = (a.0, a.0 + a.1 * size);
+    let (b_start, b_end) = (b.0, b.0 + b.1 * size);
+    a_start < a_end && b_start < b_end && a_start < b_end && b_start < a_end
+}
+
+#[pyfunction]
+fn solve_out(
+    py: Python,
+    x_init:f64,
+    n:f64,
+    h:f64,
+    max_iter:u32,
+    xs:PyBuffer<f64>,
+    ys:PyBuffer<f64>,
+    zs:PyBuffer<f64>
+) -> PyResult<(usize, f64)> {
+    let (px, nx) = out_buffer(&xs, "x")?;
+    let (py_, ny) = out_buffer(&ys, "y")?;
+    let (pz, nz) = out_buffer(&zs, "z")?;
+    // Overlapping views would become aliasing mutable slices.
+    if overlaps((px, nx), (py_, ny)) || overlaps((px, nx), (pz, nz)) || overlaps((py_, ny), (pz, nz)) {
+        return Err(PyValueError::new_err("x, y and z must not overlap"));
+    }
+    let result = py.allow_threads(move || {
+        // SAFETY: the buffers are writable, contiguous float64 arrays that
+        // stay alive (and exported) for the duration of this call.
+        let (x, y, z) = unsafe {
+            (
+                std::slice::from_raw_parts_mut(px as *mut f64, nx),
+                std::slice::from_raw_parts_mut(py_ as *mut f64, ny),
+                std::slice::from_raw_parts_mut(pz as *mut f64, nz),
+            )
+        };
+        solve_poly::solve_into_slices(x_init, n, h, max_iter, x, y, z)
+    });
+    Ok(result)
+}
+
+#[pyfunction]
+fn solve_integrals(
+    py: Python,
+    x_init:f64,
+    n:f64,
+    h:f64,
+    max_iter:u32,
+    integrals:Vec<String>,
+    keep_profile:bool
+) -> PyResult<(Py<PyO3List>,Py<PyO3List>,Py<PyO3List>,Py<PyO3List>,f64)> {
+    let mut parsed: Vec<integrals::Integral> = Vec::new();
+    for name in integrals.iter() {
+        match integrals::Integral::from_name(name) {
+            Some(integral) => parsed.push(integral),
+            None => return Err(PyValueError::new_err(format!("Unknown integral {}", name))),
+        }
+    }
+    let (xs, ys, zs, totals, xi1) = py.allow_threads(
+        || solve_poly::solve_integrals(x_init, n, h, max_iter, &parsed, keep_profile)
+    );
+    Ok(
+        (
+            PyO3List::new(py, xs).into_py(py),
+            PyO3List::new(py, ys).into_py(py),
+            PyO3List::new(py, zs).into_py(py),
+            PyO3List::new(py, totals).into_py(py),
+            xi1
+        )
+    )
+}
+
+#[pyfunction]
+fn solve_batch(
+    py: Python,
+    x_inits:Vec<f64>,
+    ns:Vec<f64>,
+    hs:Vec<f64>,
+    max_iter:u32,
+    n_threads:usize
+) -> PyResult<(Py<PyO3List>,Py<PyO3List>,Py<PyO3List>,Py<PyO3List>)> {
+    let (xs, ys, zs, offsets) = py.allow_threads(
+        || solve_poly::solve_batch(&x_inits, &ns, &hs, max_iter, n_threads)
+    );
+    Ok(
+        (
+            PyO3List::new(py, xs).into_py(py),
+            PyO3List::new(py, ys).into_py(py),
+            PyO3List::new(py, zs).into_py(py),
+            PyO3List::new(py, offsets).into_py(py)
+        )
+    )
+}
+
+#[pyfunction]
+fn solve_batch_lanes(
+    py: Python,
+    x_inits:Vec<f64>,
+    ns:Vec<f64>,
+    hs:Vec<f64>,
+    max_iter:u32,
+    n_threads:usize
+) -> PyResult<(Py<PyO3List>,Py<PyO3List>,Py<PyO3List>,Py<PyO3List>)> {
+    let (xs, ys, zs, offsets) = py.allow_threads(
+        || lanes::solve_batch_lanes(&x_inits, &ns, &hs, max_iter, n_threads)
+    );
+    Ok(
+        (
+            PyO3List::new(py, xs).into_py(py),
+            PyO3List::new(py, ys).into_py(py),
+            PyO3List::new(py, zs).into_py(py),
+            PyO3List::new(py, offsets).into_py(py)
+        )
+    )
+}
+
+#[pyfunction]
+fn solve_log(
+    py: Python,
+    x_init:f64,
+    n:f64,
+    h:f64,
+    max_iter:u32
+) -> PyResult<(Py<PyO3List>,Py<PyO3List>,Py<PyO3List>)> {
+    if !(x_init > 0.0) {
+        return Err(PyValueError::new_err("x_init must be positive for coord='log'"));
+    }
+    let (xs, ys, zs) = py.allow_threads(
+        || solve_poly::solve_log(x_init, n, h, max_iter)
+    );
+    Ok(
+        (
+            PyO3List::new(py, xs).into_py(py),
+            PyO3List::new(py, ys).into_py(py),
+            PyO3List::new(py, zs).into_py(py)
+        )
+    )
+}
+
+#[pyfunction]
+fn solve_until(
+    py: Python,
+    x_init:f64,
+    n:f64,
+    h:f64,
+    max_iter:u32,
+    stop_at_xi:Option<f64>,
+    stop_at_theta:Option<f64>,
+    stop_at_mass:Option<f64>
+) -> PyResult<(Py<PyO3List>,Py<PyO3List>,Py<PyO3List>,Option<&'static str>)> {
+    let mut stops: Vec<solve_poly::Stop> = Vec::new();
+    let mut names: Vec<&'static str> = Vec::new();
+    if let Some(xi) = stop_at_xi {
+        stops.push(solve_poly::Stop::Xi(xi));
+        names.push("xi");
+    }
+    if let Some(theta) = stop_at_theta {
+        stops.push(solve_poly::Stop::Theta(theta));
+        names.push("theta");
+    }
+    if let Some(mass) = stop_at_mass {
+        stops.push(solve_poly::Stop::Mass(mass));
+        names.push("mass");
+    }
+    let (xs, ys, zs, hit) = py.allow_threads(
+        || solve_poly::solve_until(x_init, n, h, max_iter, &stops)
+    );
+    Ok(
+        (
+            PyO3List::new(py, xs).into_py(py),
+            PyO3List::new(py, ys).into_py(py),
+            PyO3List::new(py, zs).into_py(py),
+            hit.map(|k| names[k])
+        )
+    )
+}
+
+#[pyfunction]
+fn solve_sensitivity(
+    py: Python,
+    x_init:f64,
+    n:f64,
+    h:f64,
+    max_iter:u32
+) -> PyResult<(Py<PyO3List>,Py<PyO3List>,Py<PyO3List>,Py<PyO3List>,Py<PyO3List>,(f64,f64,f64,f64))> {
+    let (xs, ys, zs, ss, ws, surface) = py.allow_threads(
+        || solve_poly::solve_sensitivity(x_init, n, h, max_iter)
+    );
+    Ok(
+        (
+            PyO3List::new(py, xs).into_py(py),
+            PyO3List::new(py, ys).into_py(py),
+            PyO3List::new(py, zs).into_py(py),
+            PyO3List::new(py, ss).into_py(py),
+            PyO3List::new(py, ws).into_py(py),
+            (surface[0], surface[1], surface[2], surface[3])
+        )
+    )
+}
+
+fn parse_equation(name: &str, params: &[f64]) -> PyResult<equations::Equation> {
+    equations::Equation::from_name(name, params).map_err(PyValueError::new_err)
+}
+
+#[pyfunction]
+fn solve_equation(
+    py: Python,
+    name:&str,
+    params:Vec<f64>,
+    x_init:f64,
+    h:f64,
+    max_iter:u32
+) -> PyResult<(Py<PyO3List>,Py<PyO3List>,Py<PyO3List>)> {
+    let equation = parse_equation(name, &params)?;
+    let (xs, ys, zs) = py.allow_threads(
+        || solve_poly::solve_equation(&equation, x_init, h, max_iter)
+    );
+    Ok(
+        (
+            PyO3List::new(py, xs).into_py(py),
+            PyO3List::new(py, ys).into_py(py),
+            PyO3List::new(py, zs).into_py(py)
+        )
+    )
+}
+
+#[pyfunction]
+fn solve_batch_equation(
+    py: Python,
+    name:&str,
+    params:Vec<Vec<f64>>,
+    x_inits:Vec<f64>,
+    hs:Vec<f64>,
+    max_iter:u32,
+    n_threads:usize
+) -> PyResult<(Py<PyO3List>,Py<PyO3List>,Py<PyO3List>,Py<PyO3List>)> {
+    let equations = params
+        .iter()
+        .map(|p| parse_equation(name, p))
+        .collect::<PyResult<Vec<equations::Equation>>>()?;
+    let (xs, ys, zs, offsets) = py.allow_threads(
+        || solve_poly::solve_batch_equations(&equations, &x_inits, &hs, max_iter, n_threads)
+    );
+    Ok(
+        (
+            PyO3List::new(py, xs).into_py(py),
+            PyO3List::new(py, ys).into_py(py),
+            PyO3List::new(py, zs).into_py(py),
+            PyO3List::new(py, offsets).into_py(py)
+        )
+    )
+}
+
+#[pyfunction]
+fn solve_from(
+    py: Python,
+    x:f64,
+    y:f64,
+    z:f64,
+    n:f64,
+    h:f64,
+    max_iter:u32
+) -> PyResult<(Py<PyO3List>,Py<PyO3List>,Py<PyO3List>)> {
+    let (xs, ys, zs) = py.allow_threads(
+        || solve_poly::solve_from(x, y, z, n, h, max_iter)
+    );
+    Ok(
+        (
+            PyO3List::new(py, xs).into_py(py),
+            PyO3List::new(py, ys).into_py(py),
+            PyO3List::new(py, zs).into_py(py)
+        )
+    )
+}
+
+#[pyfunction]
+fn solve_checked(
+    py: Python,
+    x:f64,
+    y:f64,
+    z:f64,
+    n:f64,
+    h:f64,
+    max_iter:u32,
+    every:u32,
+    timeout:Option<f64>,
+    progress:Option<PyObject>,
+    cancel:Option<PyObject>
+) -> PyResult<(Py<PyO3List>,Py<PyO3List>,Py<PyO3List>,Option<&'static str>)> {
+    let deadline = timeout.map(|t| Instant::now() + Duration::from_secs_f64(t.max(0.0)));
+    let mut reason: Option<&'static str> = None;
+    let mut error: Option<PyErr> = None;
+    let (xs, ys, zs, _) = py.allow_threads(|| {
+        solve_poly::solve_from_checked(x, y, z, n, h, max_iter, every, &mut |x_now, y_now| {
+            if deadline.map_or(false, |d| Instant::now() >= d) {
+                reason = Some("timeout");
+                return false;
+            }
+            // Only take the GIL between chunks of `every` steps.
+            Python::with_gil(|py| {
+                if py.check_signals().is_err() {
+                    reason = Some("interrupted");
+                    return false;
+                }
+                if let Some(callback) = &progress {
+                    if let Err(e) = callback.call1(py, (x_now, y_now)) {
+                        error = Some(e);
+                        return false;
+                    }
+                }
+                if let Some(event) = &cancel {
+                    match event.call_method0(py, "is_set").and_then(|v| v.is_true(py)) {
+                        Ok(true) => {
+                            reason = Some("cancelled");
+                            return false;
+                        }
+                        Ok(false) => {}
+                        Err(e) => {
+                            error = Some(e);
+                            return false;
+                        }
+                    }
+                }
+                true
+            })
+        })
+    });
+    if let Some(e) = error {
+        return Err(e);
+    }
+    Ok(
+        (
+            PyO3List::new(py, xs).into_py(py),
+            PyO3List::new(py, ys).into_py(py),
+            PyO3List::new(py, zs).into_py(py),
+            reason
+        )
+    )
+}
+
+#[pyfunction]
+fn solve_composite(
+    py: Python,
+    x_init:f64,
+    ns:Vec<f64>,
+    interfaces:Vec<(String,f64)>,
+    density_jumps:Vec<f64>,
+    h:f64,
+    max_iter:u32
+) -> PyResult<(Py<PyO3List>,Py<PyO3List>,Py<PyO3List>,Vec<usize>,Vec<f64>,Vec<f64>,Vec<f64>)> {
+    let mut stops: Vec<solve_poly::Stop> = Vec::new();
+    for (kind, value) in interfaces.iter() {
+        match kind.as_str() {
+            "xi" => stops.push(solve_poly::Stop::Xi(*value)),
+            "theta" => stops.push(solve_poly::Stop::Theta(*value)),
+            "mass" => stops.push(solve_poly::Stop::Mass(*value)),
+            _ => return Err(PyValueError::new_err(format!("Unknown interface {}", kind))),
+        }
+    }
+    let c = py.allow_threads(
+        || composite::solve_composite(x_init, &ns, &stops, &density_jumps, h, max_iter)
+    );
+    Ok(
+        (
+            PyO3List::new(py, c.xs).into_py(py),
+            PyO3List::new(py, c.ys).into_py(py),
+            PyO3List::new(py, c.zs).into_py(py),
+            c.starts,
+            c.scales,
+            c.densities,
+            c.pressures
+        )
+    )
+}
 
 
 /// A Python module implemented in Rust.
 #[pymodule]
 fn polysolver_rust(_py: Python, m: &PyModule) -> PyResult<()> {
     m.add_function(wrap_pyfunction!(solve, m)?)?;
+    m.add_function(wrap_pyfunction!(solve_out, m)?)?;
+    m.add_function(wrap_pyfunction!(solve_log, m)?)?;
+    m.add_function(wrap_pyfunction!(solve_until, m)?)?;
+    m.add_function(wrap_pyfunction!(solve_integrals, m)?)?;
+    m.add_function(wrap_pyfunction!(solve_batch, m)?)?;
+    m.add_function(wrap_pyfunction!(solve_batch_lanes, m)?)?;
+    m.add_function(wrap_pyfunction!(solve_sensitivity, m)?)?;
+    m.add_function(wrap_pyfunction!(solve_equation, m)?)?;
+    m.add_function(wrap_pyfunction!(solve_from, m)?)?;
+    m.add_function(wrap_pyfunction!(solve_batch_equation, m)?)?;
+    m.add_function(wrap_pyfunction!(solve_composite, m)?)?;
+    m.add_function(wrap_pyfunction!(solve_checked, m)?)?;
+    m.add("LANES", lanes::LANES)?;
+    m.add("EQUATIONS", equations::NAMES.to_vec())?;
     Ok(())
 }
@@ -14,11 +14,11 @@ fn order4(fun: &dyn Fn(f64,f64,f64)->f64,x:f64,y:f64,z:f64,h:f64,k3:f64,l3:f64)
     h*fun(x+h,y+k3,z+l3)
 }
 
-fn dy_and_dz(
+fn stages(
     yprime: &dyn Fn(f64,f64,f64)->f64,
     zprime: &dyn Fn(f64,f64,f64)->f64,
     x:f64, y:f64, z:f64, h:f64
-) -> (f64,f64) {
+) -> ([f64;4],[f64;4]) {
     let k1 = order1(yprime, x, y, z, h);
     let l1 = order1(zprime, x, y, z, h);
     let k2 = order2(yprime, x, y, z, h, k1, l1);
@@ -27,9 +27,18 @@ fn dy_and_dz(
     let l3 = order3(zprime, x, y, z, h, k2, l2);
     let k4 = order4(yprime, x, y, z, h, k3, l3);
     let l4 = order4(zprime, x, y, z, h, k3, l3);
+    ([k1,k2,k3,k4],[l1,l2,l3,l4])
+}
+
+fn dy_and_dz(
+    yprime: &dyn Fn(f64,f64,f64)->f64,
+    zprime: &dyn Fn(f64,f64,f64)->f64,
+    x:f64, y:f64, z:f64, h:f64
+) -> (f64,f64) {
+    let (k, l) = stages(yprime, zprime, x, y, z, h);
     (
-        k1/6.0 + k2/3.0 + k3/3.0 + k4/6.0,
-        l1/6.0 + l2/3.0 + l3/3.0 + l4/6.0
+        k[0]/6.0 + k[1]/3.0 + k[2]/3.0 + k[3]/6.0,
+        l[0]/6.0 + l[1]/3.0 + l[2]/3.0 + l[3]/6.0
     )
 }
 
@@ -42,6 +51,56 @@ pub fn get_next_xyz(
     (x+h, y+dy, z+dz)
 }
 
+/// Take a step and add the increments of a set of quadratures
+/// :math:`dq/dx = f(x,y,z)` to `totals`, using the same stages
+/// as the step itself so that the quadratures are also fourth order.
+pub fn get_next_xyz_quad(
+    yprime: &dyn Fn(f64,f64,f64)->f64,
+    zprime: &dyn Fn(f64,f64,f64)->f64,
+    quads: &[Box<dyn Fn(f64,f64,f64)->f64>],
+    x:f64, y:f64, z:f64, h:f64,
+    totals: &mut [f64]
+) -> (f64,f64,f64) {
+    let (k, l) = stages(yprime, zprime, x, y, z, h);
+    for (quad, total) in quads.iter().zip(totals.iter_mut()) {
+        let q1 = order1(quad.as_ref(), x, y, z, h);
+        let q2 = order2(quad.as_ref(), x, y, z, h, k[0], l[0]);
+        let q3 = order3(quad.as_ref(), x, y, z, h, k[1], l[1]);
+        let q4 = order4(quad.as_ref(), x, y, z, h, k[2], l[2]);
+        *total += q1/6.0 + q2/3.0 + q3/3.0 + q4/6.0;
+    }
+    (
+        x+h,
+        y + k[0]/6.0 + k[1]/3.0 + k[2]/3.0 + k[3]/6.0,
+        z + l[0]/6.0 + l[1]/3.0 + l[2]/3.0 + l[3]/6.0
+    )
+}
+
+/// Take a fourth order Runge-Kutta step of a system with `N` variables.
+pub fn get_next_state<const N: usize>(
+    fun: &dyn Fn(f64, &[f64; N]) -> [f64; N],
+    x: f64,
+    state: &[f64; N],
+    h: f64
+) -> [f64; N] {
+    let shifted = |k: &[f64; N], frac: f64| -> [f64; N] {
+        let mut out = *state;
+        for (o, ki) in out.iter_mut().zip(k.iter()) {
+            *o += frac * h * ki;
+        }
+        out
+    };
+    let k1 = fun(x, state);
+    let k2 = fun(x + 0.5 * h, &shifted(&k1, 0.5));
+    let k3 = fun(x + 0.5 * h, &shifted(&k2, 0.5));
+    let k4 = fun(x + h, &shifted(&k3, 1.0));
+    let mut next = *state;
+    for i in 0..N {
+        next[i] += h * (k1[i] / 6.0 + k2[i] / 3.0 + k3[i] / 3.0 + k4[i] / 6.0);
+    }
+    next
+}
+
 #[cfg(test)]
 mod tests {
     use super::*;
@@ -53,5 +112,13 @@ mod tests {
         let k1:f64 = order1(&add, 1.0, 2.0, 3.0, 2.0);
         assert_eq!(k1, 12.0, "k1");
     }
+    #[test]
+    fn test_next_state_matches_xyz() {
+        let zprime = crate::derivatives::get_zprime(1.5);
+        let fun = |x: f64, s: &[f64; 2]| [s[1], zprime(x, s[0], s[1])];
+        let (_, y, z) = get_next_xyz(crate::derivatives::get_yprime(), &zprime, 0.1, 0.99, -0.03, 0.01);
+        let next = get_next_state(&fun, 0.1, &[0.99, -0.03], 0.01);
+        assert!((next[0] - y).abs() < 1e-15 && (next[1] - z).abs() < 1e-15);
+    }
 
 }
\ No newline at end of file
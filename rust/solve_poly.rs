@@ -2,6 +2,20 @@
 /// 
 use crate::runge_kutta;
 use crate::derivatives;
+use crate::integrals::Integral;
+use crate::equations;
+use crate::equations::Equation;
+use std::sync::atomic::{AtomicUsize, Ordering};
+
+/// Newton iterations used to put the final step on the surface.
+const SURFACE_NEWTON_ITER: u32 = 8;
+/// For `0 < n < 1` the sensitivities are integrated in `y^n` once the
+/// surface is this many steps away, starting with a step of this fraction
+/// of the way, with this relative error per step and at most this many steps.
+const SENSITIVITY_TAIL: f64 = 10.0;
+const SENSITIVITY_TAIL_STEPS: u32 = 64;
+const SENSITIVITY_TAIL_RTOL: f64 = 1e-12;
+const SENSITIVITY_TAIL_MAX_STEPS: u32 = 100000;
 
 
 pub fn solve(
@@ -10,11 +24,461 @@ pub fn solve(
     h: f64,
     max_iter: u32
 ) -> (Vec<f64>,Vec<f64>,Vec<f64>) {
+    let mut xs: Vec<f64> = Vec::new();
+    let mut ys: Vec<f64> = Vec::new();
+    let mut zs: Vec<f64> = Vec::new();
+    solve_into(x_init, n, h, max_iter, &mut xs, &mut ys, &mut zs);
+    (xs, ys, zs)
+}
+
+/// Solve any equation family from the registry.
+pub fn solve_equation(
+    equation: &Equation,
+    x_init: f64,
+    h: f64,
+    max_iter: u32
+) -> (Vec<f64>,Vec<f64>,Vec<f64>) {
+    let mut xs: Vec<f64> = Vec::new();
+    let mut ys: Vec<f64> = Vec::new();
+    let mut zs: Vec<f64> = Vec::new();
+    solve_equation_into(equation, x_init, h, max_iter, &mut xs, &mut ys, &mut zs);
+    (xs, ys, zs)
+}
+
+/// Solve and append the profile to existing buffers.
+///
+/// Returns the surface location (NaN if `max_iter` is reached first).
+pub fn solve_into(
+    x_init: f64,
+    n: f64,
+    h: f64,
+    max_iter: u32,
+    xs: &mut Vec<f64>,
+    ys: &mut Vec<f64>,
+    zs: &mut Vec<f64>
+) -> f64 {
+    solve_equation_into(&Equation::LaneEmden { n }, x_init, h, max_iter, xs, ys, zs)
+}
+
+/// Solve any equation family and append the profile to existing buffers.
+///
+/// Returns the surface location (NaN if `max_iter` is reached first).
+pub fn solve_equation_into(
+    equation: &Equation,
+    x_init: f64,
+    h: f64,
+    max_iter: u32,
+    xs: &mut Vec<f64>,
+    ys: &mut Vec<f64>,
+    zs: &mut Vec<f64>
+) -> f64 {
+    solve_equation_from_into(equation, x_init, equation.y_init(), 0.0, h, max_iter, xs, ys, zs)
+}
+
+/// Continue a solution of the Lane-Emden equation from the state
+/// `(x, y, z)`, for example the last point of a truncated run.
+///
+/// The returned profile starts with the given state.
+pub fn solve_from(
+    x: f64,
+    y: f64,
+    z: f64,
+    n: f64,
+    h: f64,
+    max_iter: u32
+) -> (Vec<f64>,Vec<f64>,Vec<f64>) {
+    let mut xs: Vec<f64> = Vec::new();
+    let mut ys: Vec<f64> = Vec::new();
+    let mut zs: Vec<f64> = Vec::new();
+    solve_equation_from_into(&Equation::LaneEmden { n }, x, y, z, h, max_iter, &mut xs, &mut ys, &mut zs);
+    (xs, ys, zs)
+}
+
+/// Like `solve_from`, but calls `check` with the current `(x, y)` at the
+/// start and every `every` steps, and stops early if it returns false. The steps are the
+/// same as in one uninterrupted run, so a stopped profile can be
+/// continued with `solve_from` from its last point.
+///
+/// Returns the profile and whether `check` stopped the integration.
+pub fn solve_from_checked(
+    x: f64,
+    y: f64,
+    z: f64,
+    n: f64,
+    h: f64,
+    max_iter: u32,
+    every: u32,
+    check: &mut dyn FnMut(f64, f64) -> bool
+) -> (Vec<f64>,Vec<f64>,Vec<f64>,bool) {
+    let equation = Equation::LaneEmden { n };
+    let x_max = equation.x_max();
+    let mut xs: Vec<f64> = Vec::new();
+    let mut ys: Vec<f64> = Vec::new();
+    let mut zs: Vec<f64> = Vec::new();
+    let (mut x_prev, mut y_prev, mut z_prev) = (x, y, z);
+    let mut remaining = max_iter;
+    // A deadline that has passed or a cancel that is set stops the solve at once.
+    if !check(x, y) {
+        return (vec![x], vec![y], vec![z], true);
+    }
+    loop {
+        let chunk = remaining.min(every.max(1));
+        let before = xs.len();
+        // The chunk pushes its starting point again.
+        if before > 0 {
+            xs.pop();
+            ys.pop();
+            zs.pop();
+        }
+        solve_equation_from_into(&equation, x_prev, y_prev, z_prev, h, chunk, &mut xs, &mut ys, &mut zs);
+        let taken = (xs.len() - before.max(1)) as u32;
+        remaining -= taken;
+        let last = xs.len() - 1;
+        x_prev = xs[last];
+        y_prev = ys[last];
+        z_prev = zs[last];
+        if taken < chunk || remaining == 0 || !(y_prev > 0.0) || !(x_prev < x_max) {
+            return (xs, ys, zs, false);
+        }
+        if !check(x_prev, y_prev) {
+            return (xs, ys, zs, true);
+        }
+    }
+}
+
+/// Solve any equation family from the state `(x_start, y_start, z_start)`
+/// and append the profile to existing buffers.
+///
+/// Returns the surface location (NaN if `max_iter` is reached first).
+pub fn solve_equation_from_into(
+    equation: &Equation,
+    x_start: f64,
+    y_start: f64,
+    z_start: f64,
+    h: f64,
+    max_iter: u32,
+    xs: &mut Vec<f64>,
+    ys: &mut Vec<f64>,
+    zs: &mut Vec<f64>
+) -> f64 {
+    let mut x_prev: f64 = x_start;
+    let mut y_prev: f64 = y_start;
+    let mut z_prev: f64 = z_start;
+    let y_surface: f64 = equation.y_surface();
+    let x_max: f64 = equation.x_max();
+    let yprime = derivatives::get_yprime();
+    let zprime = equation.get_zprime();
+    let mut n_iter: u32 = 0;
+    let mut xi1: f64 = f64::NAN;
+    xs.push(x_prev);
+    ys.push(y_prev);
+    zs.push(z_prev);
+    while (y_prev > y_surface) && (n_iter < max_iter) && (x_prev < x_max) {
+        n_iter += 1;
+        
+        let (x_next, y_next, z_next) = runge_kutta::get_next_xyz(
+            yprime,
+            &zprime,
+            x_prev,
+            y_prev,
+            z_prev,
+            h
+        );
+        if y_next <= y_surface {
+            xi1 = x_prev + surface_step(yprime, &zprime, x_prev, y_prev, z_prev, h, y_next, y_surface);
+        }
+        x_prev = x_next;
+        y_prev = y_next;
+        z_prev = z_next;
+        xs.push(x_prev);
+        ys.push(y_prev);
+        zs.push(z_prev);
+    }
+    xi1
+}
+
+/// Solve the Lane-Emden equation into caller-owned slices, without
+/// allocating. The integration also stops when the slices are full.
+///
+/// Returns the number of points written and xi1 (NaN if the surface
+/// was not reached).
+pub fn solve_into_slices(
+    x_init: f64,
+    n: f64,
+    h: f64,
+    max_iter: u32,
+    xs: &mut [f64],
+    ys: &mut [f64],
+    zs: &mut [f64]
+) -> (usize, f64) {
+    let capacity = xs.len().min(ys.len()).min(zs.len());
+    if capacity == 0 {
+        return (0, f64::NAN);
+    }
+    let yprime = derivatives::get_yprime();
+    let zprime = derivatives::get_zprime(n);
+    let mut x_prev: f64 = x_init;
+    let mut y_prev: f64 = 1.0;
+    let mut z_prev: f64 = 0.0;
+    let mut xi1: f64 = f64::NAN;
+    let mut len: usize = 0;
+    xs[len] = x_prev;
+    ys[len] = y_prev;
+    zs[len] = z_prev;
+    len += 1;
+    let x_max = equations::lane_emden_x_max(n);
+    while (y_prev > 0.0) && (len <= max_iter as usize) && (len < capacity) && (x_prev < x_max) {
+        let (x_next, y_next, z_next) = runge_kutta::get_next_xyz(
+            yprime,
+            &zprime,
+            x_prev,
+            y_prev,
+            z_prev,
+            h
+        );
+        if y_next <= 0.0 {
+            xi1 = x_prev + surface_step(yprime, &zprime, x_prev, y_prev, z_prev, h, y_next, 0.0);
+        }
+        x_prev = x_next;
+        y_prev = y_next;
+        z_prev = z_next;
+        xs[len] = x_prev;
+        ys[len] = y_prev;
+        zs[len] = z_prev;
+        len += 1;
+    }
+    (len, xi1)
+}
+
+/// Solve the Lane-Emden equation with uniform steps `h` in `t = ln(x)`,
+/// so that the steps in x grow geometrically outward.
+///
+/// The integration starts from the series solution at `x_init`, which
+/// must be positive, and stops at the first point with `y <= 0`.
+pub fn solve_log(
+    x_init: f64,
+    n: f64,
+    h: f64,
+    max_iter: u32
+) -> (Vec<f64>,Vec<f64>,Vec<f64>) {
+    let fun = derivatives::get_log_rhs(n);
+    let t_max: f64 = equations::lane_emden_x_max(n).ln();
+    let mut t_prev: f64 = x_init.ln();
+    let mut state: [f64; 2] = [1.0 - x_init * x_init / 6.0, -x_init * x_init / 3.0];
+    let mut n_iter: u32 = 0;
+    let mut xs: Vec<f64> = vec![x_init];
+    let mut ys: Vec<f64> = vec![state[0]];
+    let mut zs: Vec<f64> = vec![state[1] / x_init];
+    while (state[0] > 0.0) && (n_iter < max_iter) && (t_prev < t_max) {
+        n_iter += 1;
+        state = runge_kutta::get_next_state(fun.as_ref(), t_prev, &state, h);
+        t_prev += h;
+        let x = t_prev.exp();
+        xs.push(x);
+        ys.push(state[0]);
+        zs.push(state[1] / x);
+    }
+    (xs, ys, zs)
+}
+
+/// A condition that ends an integration before the surface.
+#[derive(Clone, Copy, Debug, PartialEq)]
+pub enum Stop {
+    /// Stop at `x = xi`.
+    Xi(f64),
+    /// Stop at `y = theta`.
+    Theta(f64),
+    /// Stop when the enclosed mass `-x^2 z` reaches this value.
+    Mass(f64),
+}
+
+impl Stop {
+    /// Positive before the event and non-positive once it has happened.
+    pub fn value(&self, x: f64, y: f64, z: f64) -> f64 {
+        match *self {
+            Stop::Xi(xi) => xi - x,
+            Stop::Theta(theta) => y - theta,
+            Stop::Mass(mass) => mass + x * x * z,
+        }
+    }
+}
+
+/// Find the step from `(x, y, z)` at which a single Runge-Kutta step lands
+/// on the event, given that a full step of `h` passes it. Uses the
+/// Illinois variant of regula falsi on the step length.
+pub fn event_step(
+    yprime: &dyn Fn(f64,f64,f64)->f64,
+    zprime: &dyn Fn(f64,f64,f64)->f64,
+    stop: &Stop,
+    x: f64,
+    y: f64,
+    z: f64,
+    h: f64
+) -> f64 {
+    if let Stop::Xi(xi) = *stop {
+        return (xi - x).max(0.0).min(h);
+    }
+    let g = |step: f64| -> f64 {
+        let (x_s, y_s, z_s) = runge_kutta::get_next_xyz(yprime, zprime, x, y, z, step);
+        stop.value(x_s, y_s, z_s)
+    };
+    let (mut a, mut b) = (0.0, h);
+    let (mut ga, mut gb) = (stop.value(x, y, z), g(h));
+    let mut side = 0;
+    for _ in 0..60 {
+        let c = (a * gb - b * ga) / (gb - ga);
+        let gc = g(c);
+        if gc > 0.0 {
+            a = c;
+            ga = gc;
+            if side == 1 {
+                gb *= 0.5;
+            }
+            side = 1;
+        } else {
+            b = c;
+            gb = gc;
+            if side == -1 {
+                ga *= 0.5;
+            }
+            side = -1;
+        }
+        if gc == 0.0 || (b - a).abs() <= 1e-15 * h {
+            break;
+        }
+    }
+    b
+}
+
+/// Solve the Lane-Emden equation until the surface or the first of
+/// `stops`, whichever comes first. The last point is placed exactly on
+/// the event.
+///
+/// Returns the profile and the index of the stop that ended the
+/// integration, if any.
+pub fn solve_until(
+    x_init: f64,
+    n: f64,
+    h: f64,
+    max_iter: u32,
+    stops: &[Stop]
+) -> (Vec<f64>,Vec<f64>,Vec<f64>,Option<usize>) {
+    let x_max = equations::lane_emden_x_max(n);
+    solve_until_from(x_init, 1.0, 0.0, n, h, max_iter, stops, x_max)
+}
+
+/// Like `solve_until`, but starting from any state and stopping at `x_max`.
+pub fn solve_until_from(
+    x_start: f64,
+    y_start: f64,
+    z_start: f64,
+    n: f64,
+    h: f64,
+    max_iter: u32,
+    stops: &[Stop],
+    x_max: f64
+) -> (Vec<f64>,Vec<f64>,Vec<f64>,Option<usize>) {
+    let yprime = derivatives::get_yprime();
+    let zprime = derivatives::get_zprime(n);
+    let mut x_prev: f64 = x_start;
+    let mut y_prev: f64 = y_start;
+    let mut z_prev: f64 = z_start;
+    let mut xs: Vec<f64> = vec![x_prev];
+    let mut ys: Vec<f64> = vec![y_prev];
+    let mut zs: Vec<f64> = vec![z_prev];
+    if let Some(k) = stops.iter().position(|stop| stop.value(x_prev, y_prev, z_prev) <= 0.0) {
+        return (xs, ys, zs, Some(k));
+    }
+    let mut n_iter: u32 = 0;
+    while (y_prev > 0.0) && (n_iter < max_iter) && (x_prev < x_max) {
+        n_iter += 1;
+        let (x_next, y_next, z_next) = runge_kutta::get_next_xyz(
+            yprime,
+            &zprime,
+            x_prev,
+            y_prev,
+            z_prev,
+            h
+        );
+        let mut first: Option<(f64, usize)> = None;
+        for (k, stop) in stops.iter().enumerate() {
+            if stop.value(x_next, y_next, z_next) <= 0.0 {
+                let step = event_step(yprime, &zprime, stop, x_prev, y_prev, z_prev, h);
+                if first.map_or(true, |(best, _)| step < best) {
+                    first = Some((step, k));
+                }
+            }
+        }
+        if let Some((step, k)) = first {
+            let (_, y_event, z_event) = runge_kutta::get_next_xyz(yprime, &zprime, x_prev, y_prev, z_prev, step);
+            xs.push(x_prev + step);
+            ys.push(y_event);
+            zs.push(z_event);
+            return (xs, ys, zs, Some(k));
+        }
+        x_prev = x_next;
+        y_prev = y_next;
+        z_prev = z_next;
+        xs.push(x_prev);
+        ys.push(y_prev);
+        zs.push(z_prev);
+    }
+    (xs, ys, zs, None)
+}
+
+/// Find the step `s` from `(x, y, z)` at which a single Runge-Kutta step
+/// lands on `y = y_surface`, given that a full step of `h` ends at
+/// `y_next <= y_surface`.
+pub fn surface_step(
+    yprime: &dyn Fn(f64,f64,f64)->f64,
+    zprime: &dyn Fn(f64,f64,f64)->f64,
+    x: f64,
+    y: f64,
+    z: f64,
+    h: f64,
+    y_next: f64,
+    y_surface: f64
+) -> f64 {
+    let mut s = h * (y - y_surface) / (y - y_next);
+    for _ in 0..SURFACE_NEWTON_ITER {
+        let (_, y_s, z_s) = runge_kutta::get_next_xyz(yprime, zprime, x, y, z, s);
+        if z_s == 0.0 {
+            break;
+        }
+        let ds = (y_s - y_surface) / z_s;
+        s = (s - ds).max(0.0).min(h);
+        if ds.abs() <= 1e-15 * h {
+            break;
+        }
+    }
+    s
+}
+
+/// Solve while accumulating structural integrals from `x_init` to the surface.
+///
+/// Returns the profile, the integrals evaluated at the surface and the
+/// surface location (NaN if `max_iter` is reached first). If `keep_profile`
+/// is false only the last three points of the profile are kept.
+pub fn solve_integrals(
+    x_init: f64,
+    n: f64,
+    h: f64,
+    max_iter: u32,
+    integrals: &[Integral],
+    keep_profile: bool
+) -> (Vec<f64>,Vec<f64>,Vec<f64>,Vec<f64>,f64) {
     let mut x_prev: f64 = x_init;
     let mut y_prev: f64 = 1.0;
     let mut z_prev: f64 = 0.0;
     let yprime = derivatives::get_yprime();
     let zprime = derivatives::get_zprime(n);
+    let quads: Vec<Box<dyn Fn(f64,f64,f64)->f64>> = integrals
+        .iter()
+        .map(|integral| integral.get_integrand(n))
+        .collect();
+    let mut totals: Vec<f64> = vec![0.0; quads.len()];
+    let mut totals_prev: Vec<f64> = vec![0.0; quads.len()];
+    let mut xi1: f64 = f64::NAN;
     let mut n_iter: u32 = 0;
     let mut xs: Vec<f64> = Vec::new();
     let mut ys: Vec<f64> = Vec::new();
@@ -22,25 +486,224 @@ pub fn solve(
     xs.push(x_prev);
     ys.push(y_prev);
     zs.push(z_prev);
-    while (y_prev > 0.0) && (n_iter < max_iter) {
+    let x_max = equations::lane_emden_x_max(n);
+    while (y_prev > 0.0) && (n_iter < max_iter) && (x_prev < x_max) {
         n_iter += 1;
-        
-        let (x_next, y_next, z_next) = runge_kutta::get_next_xyz(
+        totals_prev.copy_from_slice(&totals);
+        let (x_next, y_next, z_next) = runge_kutta::get_next_xyz_quad(
             yprime,
             &zprime,
+            &quads,
             x_prev,
             y_prev,
             z_prev,
-            h
+            h,
+            &mut totals
         );
+        if y_next <= 0.0 {
+            let s = surface_step(yprime, &zprime, x_prev, y_prev, z_prev, h, y_next, 0.0);
+            totals.copy_from_slice(&totals_prev);
+            runge_kutta::get_next_xyz_quad(
+                yprime,
+                &zprime,
+                &quads,
+                x_prev,
+                y_prev,
+                z_prev,
+                s,
+                &mut totals
+            );
+            xi1 = x_prev + s;
+        }
         x_prev = x_next;
         y_prev = y_next;
         z_prev = z_next;
+        if !keep_profile && xs.len() == 3 {
+            xs.remove(0);
+            ys.remove(0);
+            zs.remove(0);
+        }
         xs.push(x_prev);
         ys.push(y_prev);
         zs.push(z_prev);
     }
-    (xs, ys, zs)
+    (xs, ys, zs, totals, xi1)
+}
+
+/// Solve many Lane-Emden models at once, sharing the models between threads.
+///
+/// Model `i` has initial value `x_inits[i]`, index `ns[i]` and step size
+/// `hs[i]`. Threads take the next unsolved model as they finish, so models
+/// of very different cost are balanced. The profiles are concatenated in
+/// input order; model `i` occupies `offsets[i]..offsets[i+1]` of the
+/// returned arrays.
+pub fn solve_batch(
+    x_inits: &[f64],
+    ns: &[f64],
+    hs: &[f64],
+    max_iter: u32,
+    n_threads: usize
+) -> (Vec<f64>,Vec<f64>,Vec<f64>,Vec<usize>) {
+    let equations: Vec<Equation> = ns.iter().map(|&n| Equation::LaneEmden { n }).collect();
+    solve_batch_equations(&equations, x_inits, hs, max_iter, n_threads)
+}
+
+/// Solve many models of any equation family at once. See `solve_batch`.
+pub fn solve_batch_equations(
+    equations: &[Equation],
+    x_inits: &[f64],
+    hs: &[f64],
+    max_iter: u32,
+    n_threads: usize
+) -> (Vec<f64>,Vec<f64>,Vec<f64>,Vec<usize>) {
+    let n_models = equations.len().min(x_inits.len()).min(hs.len());
+    let n_threads = n_threads.max(1).min(n_models.max(1));
+    let next = AtomicUsize::new(0);
+    let mut solns: Vec<(usize,(Vec<f64>,Vec<f64>,Vec<f64>))> = Vec::with_capacity(n_models);
+    std::thread::scope(|scope| {
+        let handles: Vec<_> = (0..n_threads)
+            .map(|_| {
+                scope.spawn(|| {
+                    let mut out = Vec::new();
+                    loop {
+                        let i = next.fetch_add(1, Ordering::Relaxed);
+                        if i >= n_models {
+                            break;
+                        }
+                        out.push((i, solve_equation(&equations[i], x_inits[i], hs[i], max_iter)));
+                    }
+                    out
+                })
+            })
+            .collect();
+        for handle in handles {
+            solns.extend(handle.join().unwrap());
+        }
+    });
+    flatten(solns)
+}
+
+/// Concatenate the profiles of a batch, given as `(index, profile)` pairs in
+/// any order, into flat arrays and the offsets of each model.
+pub fn flatten(
+    mut solns: Vec<(usize,(Vec<f64>,Vec<f64>,Vec<f64>))>
+) -> (Vec<f64>,Vec<f64>,Vec<f64>,Vec<usize>) {
+    let n_models = solns.len();
+    solns.sort_by_key(|(i, _)| *i);
+    let total: usize = solns.iter().map(|(_, (xs, _, _))| xs.len()).sum();
+    let mut xs: Vec<f64> = Vec::with_capacity(total);
+    let mut ys: Vec<f64> = Vec::with_capacity(total);
+    let mut zs: Vec<f64> = Vec::with_capacity(total);
+    let mut offsets: Vec<usize> = Vec::with_capacity(n_models + 1);
+    offsets.push(0);
+    for (_, (x, y, z)) in solns {
+        xs.extend(x);
+        ys.extend(y);
+        zs.extend(z);
+        offsets.push(xs.len());
+    }
+    (xs, ys, zs, offsets)
+}
+
+/// Integrate the sensitivities from `state` at `x` to the surface in
+/// `u = y^n`, for `0 < n < 1`. Returns `[xi1, z, dy/dn, dz/dn]`, or NaN
+/// if the steps run out.
+///
+/// The steps are chosen by step doubling. For small `n` almost all of the
+/// change happens just below the starting `u`.
+fn sensitivity_tail(n: f64, x: f64, state: &[f64; 4]) -> [f64; 4] {
+    let fun = derivatives::get_sensitivity_tail_rhs(n);
+    let mut u = state[0].powf(n);
+    let mut du = -u / SENSITIVITY_TAIL_STEPS as f64;
+    let mut tail = [x, state[1], state[2], state[3]];
+    for _ in 0..SENSITIVITY_TAIL_MAX_STEPS {
+        let last = du <= -u;
+        if last {
+            du = -u;
+        }
+        let full = runge_kutta::get_next_state(fun.as_ref(), u, &tail, du);
+        let half = runge_kutta::get_next_state(fun.as_ref(), u, &tail, 0.5 * du);
+        let half = runge_kutta::get_next_state(fun.as_ref(), u + 0.5 * du, &half, 0.5 * du);
+        let mut err: f64 = 0.0;
+        for (a, b) in half.iter().zip(full.iter()) {
+            err = err.max((a - b).abs() / (1.0 + a.abs()));
+        }
+        err /= SENSITIVITY_TAIL_RTOL;
+        if !err.is_finite() {
+            break;
+        }
+        if err <= 1.0 {
+            // Richardson extrapolation of the two half steps.
+            for i in 0..4 {
+                tail[i] = half[i] + (half[i] - full[i]) / 15.0;
+            }
+            if last {
+                return tail;
+            }
+            u += du;
+        }
+        let factor = if err > 0.0 { 0.9 * err.powf(-0.2) } else { 4.0 };
+        du *= factor.max(0.1).min(4.0);
+    }
+    [f64::NAN; 4]
+}
+
+/// Solve the Lane-Emden equation together with the sensitivities
+/// `dy/dn` and `dz/dn`.
+///
+/// Returns the profiles of x, y, z, dy/dn and dz/dn, and the state
+/// `[xi1, z, dy/dn, dz/dn]` at the surface (NaN if `max_iter` or the
+/// `x_max` of unbounded solutions is reached first). For `0 < n < 1`
+/// the surface comes from `sensitivity_tail`.
+pub fn solve_sensitivity(
+    x_init: f64,
+    n: f64,
+    h: f64,
+    max_iter: u32
+) -> (Vec<f64>,Vec<f64>,Vec<f64>,Vec<f64>,Vec<f64>,[f64;4]) {
+    let fun = derivatives::get_sensitivity_rhs(n);
+    let tail = n > 0.0 && n < 1.0;
+    let x_max = equations::lane_emden_x_max(n);
+    let mut x_prev: f64 = x_init;
+    let mut state: [f64; 4] = [1.0, 0.0, 0.0, 0.0];
+    let mut surface: [f64; 4] = [f64::NAN; 4];
+    let mut n_iter: u32 = 0;
+    let mut xs: Vec<f64> = vec![x_prev];
+    let mut ys: Vec<f64> = vec![state[0]];
+    let mut zs: Vec<f64> = vec![state[1]];
+    let mut ss: Vec<f64> = vec![state[2]];
+    let mut ws: Vec<f64> = vec![state[3]];
+    while (state[0] > 0.0) && (n_iter < max_iter) && (x_prev < x_max) {
+        n_iter += 1;
+        let next = runge_kutta::get_next_state(fun.as_ref(), x_prev, &state, h);
+        let near = state[0] < SENSITIVITY_TAIL * h * state[1].abs() || next[0] <= 0.0;
+        if tail && near && surface[0].is_nan() {
+            surface = sensitivity_tail(n, x_prev, &state);
+        } else if next[0] <= 0.0 && !tail {
+            let mut step = h * state[0] / (state[0] - next[0]);
+            let mut at_surface = next;
+            for _ in 0..SURFACE_NEWTON_ITER {
+                at_surface = runge_kutta::get_next_state(fun.as_ref(), x_prev, &state, step);
+                if at_surface[1] == 0.0 {
+                    break;
+                }
+                let ds = at_surface[0] / at_surface[1];
+                step = (step - ds).max(0.0).min(h);
+                if ds.abs() <= 1e-15 * h {
+                    break;
+                }
+            }
+            surface = [x_prev + step, at_surface[1], at_surface[2], at_surface[3]];
+        }
+        x_prev += h;
+        state = next;
+        xs.push(x_prev);
+        ys.push(state[0]);
+        zs.push(state[1]);
+        ss.push(state[2]);
+        ws.push(state[3]);
+    }
+    (xs, ys, zs, ss, ws, surface)
 }
 
 #[cfg(test)]
@@ -51,4 +714,169 @@ mod tests {
         let (xs, ys, zs) = solve(1e-3, 0.0, 0.01, 1000);
         assert!(xs.len() == ys.len());
     }
+    #[test]
+    fn test_integrals_n0() {
+        let (xs, _, _, totals, xi1) = solve_integrals(
+            1e-8, 0.0, 0.01, 1000, &[Integral::Mass], false
+        );
+        assert!(xs.len() == 3);
+        assert!((xi1 - 6.0_f64.sqrt()).abs() < 1e-5);
+        let mass = 4.0 / 3.0 * std::f64::consts::PI * xi1.powi(3);
+        assert!((totals[0] - mass).abs() < 1e-5 * mass);
+    }
+    #[test]
+    fn test_batch() {
+        let ns = [0.0, 1.0, 1.5, 3.0];
+        let x_inits = [1e-3; 4];
+        let hs = [0.01; 4];
+        let (xs, _, _, offsets) = solve_batch(&x_inits, &ns, &hs, 10000, 3);
+        assert_eq!(offsets.len(), ns.len() + 1);
+        assert_eq!(*offsets.last().unwrap(), xs.len());
+        let (x1, _, _) = solve(1e-3, 1.5, 0.01, 10000);
+        assert_eq!(&xs[offsets[2]..offsets[3]], &x1[..]);
+    }
+    #[test]
+    fn test_white_dwarf_surface() {
+        let c = 0.5;
+        let equation = Equation::from_name("white_dwarf", &[c]).unwrap();
+        let mut xs = Vec::new();
+        let mut ys = Vec::new();
+        let mut zs = Vec::new();
+        let xi1 = solve_equation_into(&equation, 1e-8, 1e-3, 100000, &mut xs, &mut ys, &mut zs);
+        assert!(xi1.is_finite());
+        assert!(*ys.last().unwrap() <= c.sqrt());
+        assert!(ys[ys.len() - 2] > c.sqrt());
+    }
+    #[test]
+    fn test_solve_from_continues() {
+        let (xs, ys, _) = solve(1e-3, 1.5, 0.01, 10000);
+        let (xa, ya, za) = solve(1e-3, 1.5, 0.01, 100);
+        let (xb, yb, _) = solve_from(xa[100], ya[100], za[100], 1.5, 0.01, 10000);
+        assert_eq!(xa.len() + xb.len() - 1, xs.len());
+        assert_eq!(*yb.last().unwrap(), *ys.last().unwrap());
+    }
+    #[test]
+    fn test_solve_into_slices() {
+        let (xs, ys, zs) = solve(1e-10, 1.5, 0.01, 100000);
+        let mut x = vec![0.0; xs.len() + 10];
+        let mut y = vec![0.0; xs.len() + 10];
+        let mut z = vec![0.0; xs.len() + 10];
+        let (len, _) = solve_into_slices(1e-10, 1.5, 0.01, 100000, &mut x, &mut y, &mut z);
+        assert_eq!(len, xs.len());
+        assert_eq!(&x[..len], &xs[..]);
+        assert_eq!(&y[..len], &ys[..]);
+        assert_eq!(&z[..len], &zs[..]);
+        // A short buffer truncates like max_iter does.
+        let (len, xi1) = solve_into_slices(1e-10, 1.5, 0.01, 100000, &mut x[..50], &mut y[..50], &mut z[..50]);
+        let (short, _, _) = solve(1e-10, 1.5, 0.01, 49);
+        assert_eq!(len, 50);
+        assert_eq!(&x[..len], &short[..]);
+        assert!(xi1.is_nan());
+    }
+    #[test]
+    fn test_solve_log() {
+        let (xs, ys, _) = solve_log(1e-6, 1.0, 0.01, 100000);
+        let n = xs.len();
+        assert!(n < 1600);
+        let xi1 = xs[n-2] - ys[n-2] * (xs[n-1] - xs[n-2]) / (ys[n-1] - ys[n-2]);
+        assert!((xi1 - std::f64::consts::PI).abs() < 1e-3);
+        for (x, y) in xs.iter().zip(ys.iter()).take(n-1) {
+            assert!((y - x.sin() / x).abs() < 1e-7);
+        }
+    }
+    #[test]
+    fn test_solve_until() {
+        // For n=0, y = 1 - x^2/6 and the mass is x^3/3.
+        let (xs, ys, _, hit) = solve_until(1e-10, 0.0, 0.01, 100000, &[Stop::Theta(0.5)]);
+        assert_eq!(hit, Some(0));
+        assert!((ys[ys.len()-1] - 0.5).abs() < 1e-13);
+        assert!((xs[xs.len()-1] - 3.0_f64.sqrt()).abs() < 1e-4);
+        let (xs, _, zs, hit) = solve_until(1e-10, 0.0, 0.01, 100000, &[Stop::Xi(2.0), Stop::Mass(0.1)]);
+        assert_eq!(hit, Some(1));
+        let x = xs[xs.len()-1];
+        assert!((-x * x * zs[zs.len()-1] - 0.1).abs() < 1e-13);
+        let (xs, _, _, hit) = solve_until(1e-10, 1.5, 0.01, 100000, &[Stop::Xi(2.005)]);
+        assert_eq!(hit, Some(0));
+        assert_eq!(xs[xs.len()-1], 2.005);
+        let (full, _, _) = solve(1e-10, 1.5, 0.01, 100000);
+        let (xs, _, _, hit) = solve_until(1e-10, 1.5, 0.01, 100000, &[Stop::Xi(100.0)]);
+        assert_eq!(hit, None);
+        assert_eq!(xs, full);
+    }
+    #[test]
+    fn test_unbounded_stops_early() {
+        let (xs, ys, _) = solve(1e-10, 5.0, 0.01, 1000000);
+        assert!(xs.len() < 2100);
+        assert!(xs[xs.len()-1] >= equations::UNBOUNDED_XI);
+        let x = xs[xs.len()-1];
+        assert!((ys[ys.len()-1] - (1.0 + x * x / 3.0).powf(-0.5)).abs() < 1e-6);
+        let (xs, _, _) = solve_log(1e-6, 6.0, 0.01, 1000000);
+        assert!(xs.len() < 2100);
+    }
+    #[test]
+    fn test_sensitivity_matches_finite_difference() {
+        let dn = 1e-5;
+        let (_, _, _, _, _, surface) = solve_sensitivity(1e-8, 1.5, 1e-3, 100000);
+        let (_, _, _, _, _, lo) = solve_sensitivity(1e-8, 1.5 - dn, 1e-3, 100000);
+        let (_, _, _, _, _, hi) = solve_sensitivity(1e-8, 1.5 + dn, 1e-3, 100000);
+        let dxi1_dn = -surface[2] / surface[1];
+        let fd = (hi[0] - lo[0]) / (2.0 * dn);
+        assert!((dxi1_dn - fd).abs() < 1e-5 * fd.abs());
+    }
+    #[test]
+    fn test_sensitivity_below_one_matches_finite_difference() {
+        // y^(n-1) is singular at the surface for n < 1.
+        let dn = 1e-3;
+        for &n in &[0.2, 0.5, 0.8] {
+            let (_, _, _, _, _, surface) = solve_sensitivity(1e-8, n, 1e-3, 100000);
+            let (_, _, _, _, _, lo) = solve_sensitivity(1e-8, n - dn, 1e-3, 100000);
+            let (_, _, _, _, _, hi) = solve_sensitivity(1e-8, n + dn, 1e-3, 100000);
+            let [xi1, z1, s1, w1] = surface;
+            let dxi1_dn = -s1 / z1;
+            let dz1_dn = w1 - 2.0 / xi1 * z1 * dxi1_dn;
+            let fd_xi1 = (hi[0] - lo[0]) / (2.0 * dn);
+            let fd_z1 = (hi[1] - lo[1]) / (2.0 * dn);
+            assert!((dxi1_dn - fd_xi1).abs() < 1e-3 * fd_xi1.abs());
+            assert!((dz1_dn - fd_z1).abs() < 1e-3 * fd_z1.abs());
+        }
+    }
+    #[test]
+    fn test_sensitivity_small_n_matches_fine_solve() {
+        // The change in y^n is concentrated just below its start for small n.
+        for &n in &[1e-3, 1e-2] {
+            let (_, _, _, _, _, surface) = solve_sensitivity(1e-10, n, 1e-3, 100000);
+            let (xs, ys, _) = solve(1e-10, n, 1e-5, 10000000);
+            let k = xs.len() - 1;
+            let xi1 = xs[k - 1] + (xs[k] - xs[k - 1]) * ys[k - 1] / (ys[k - 1] - ys[k]);
+            assert!((surface[0] - xi1).abs() < 1e-8 * xi1);
+        }
+    }
+    #[test]
+    fn test_sensitivity_unbounded_stops() {
+        let (xs, _, _, _, _, surface) = solve_sensitivity(1e-8, 5.0, 1e-2, 100000);
+        assert!(xs.len() < 2100);
+        assert!(surface[0].is_nan());
+    }
+
+    #[test]
+    fn test_solve_from_checked() {
+        let full = solve(1e-10, 3.0, 1e-3, 100000);
+        let mut calls = 0;
+        let (xs, ys, zs, stopped) = solve_from_checked(1e-10, 1.0, 0.0, 3.0, 1e-3, 100000, 997, &mut |_, _| { calls += 1; true });
+        assert!(!stopped);
+        assert_eq!((xs, ys, zs), full);
+        assert_eq!(calls, 1 + (full.0.len() - 1) / 997);
+        let (xs, _, _, stopped) = solve_from_checked(1e-10, 1.0, 0.0, 3.0, 1e-3, 100000, 997, &mut |_, _| false);
+        assert!(stopped);
+        assert_eq!(xs, vec![1e-10]);
+        let (xs, ys, zs, stopped) = solve_from_checked(1e-10, 1.0, 0.0, 3.0, 1e-3, 100000, 1000, &mut |x, _| x < 2.5);
+        assert!(stopped);
+        assert_eq!(xs.len(), 3001);
+        let last = xs.len() - 1;
+        let (rx, ry, rz) = solve_from(xs[last], ys[last], zs[last], 3.0, 1e-3, 100000);
+        let joined: Vec<f64> = xs.iter().chain(rx[1..].iter()).copied().collect();
+        assert_eq!(joined, full.0);
+        assert_eq!(ys.iter().chain(ry[1..].iter()).copied().collect::<Vec<f64>>(), full.1);
+        assert_eq!(zs.iter().chain(rz[1..].iter()).copied().collect::<Vec<f64>>(), full.2);
+    }
 }
\ No newline at end of file
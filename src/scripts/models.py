@@ -0,0 +1,193 @@
+"""
+Compute every model used by the figures and tables.
+
+All models are solved in one parallel pass with the rust engine and
+reduced to the quantities the downstream scripts need, which are
+written to ``src/data/models.npz``. Each family of models is stored
+under its own prefix, e.g. ``tab7/xi1``.
+"""
+import numpy as np
+import paths
+
+from polysolver import solve_batch, StarEnsemble
+
+FILENAME = 'models.npz'
+PATH = paths.data / FILENAME
+
+IMPL = 'rust'
+CHUNK = 256
+N_RESAMPLE = 100
+
+RES_STEPS = np.logspace(np.log10(1e-4), np.log10(0.1), 200)
+RES_NS = np.array([0., 1.0, 1.5, 2.0, 3.0, 4.0])
+
+FAMILIES = {
+    'tab7': {
+        'n': np.linspace(0, 4, 4*4 + 1),
+        'h': 1e-3,
+        'x_init': 1e-20,
+        'max_iter': 100000,
+        'analytic': True,
+    },
+    'func_of_n': {
+        'n': np.linspace(0, 4, 100),
+        'h': 1e-3,
+        'x_init': 1e-20,
+        'max_iter': 100000,
+        'analytic': True,
+    },
+    'profs': {
+        'n': np.linspace(0, 4, 1000),
+        'h': 1e-3,
+        'x_init': 1e-20,
+        'max_iter': 100000,
+        'analytic': True,
+        'resample': True,
+    },
+    'res_n0': {
+        'n': 0.,
+        'h': np.logspace(np.log10(0.01), np.log10(0.1), 5),
+        'x_init': 1e-20,
+        'max_iter': 10000,
+        'analytic': False,
+        'resample': True,
+    },
+    'res_n1': {
+        'n': 1.,
+        'h': np.logspace(np.log10(0.01), np.log10(0.1), 5),
+        'x_init': 1e-20,
+        'max_iter': 10000,
+        'analytic': False,
+        'resample': True,
+    },
+    'res': {
+        'n': RES_NS[:, None],
+        'h': RES_STEPS[None, :],
+        'x_init': 1e-20,
+        'max_iter': 1000000,
+        'analytic': False,
+    },
+    'res_theta_prime': {
+        'n': RES_NS[:, None],
+        'h': RES_STEPS[None, :],
+        'x_init': 1e-10,
+        'max_iter': 1000000,
+        'analytic': False,
+    },
+}
+
+
+def get_jobs():
+    """
+    Flatten the families into one list of models.
+
+    Returns
+    -------
+    dict
+        The x_init, n, h, max_iter, analytic and family of each model.
+    """
+    jobs = {key: [] for key in ('x_init', 'n', 'h', 'max_iter', 'analytic', 'family')}
+    for name, family in FAMILIES.items():
+        x_init, n, h = np.broadcast_arrays(family['x_init'], family['n'], family['h'])
+        size = x_init.size
+        jobs['x_init'].append(np.ravel(x_init))
+        jobs['n'].append(np.ravel(n))
+        jobs['h'].append(np.ravel(h))
+        jobs['max_iter'].append(np.full(size, family['max_iter']))
+        jobs['analytic'].append(np.full(size, family['analytic']))
+        jobs['family'].append(np.full(size, name))
+    return {key: np.concatenate(val) for key, val in jobs.items()}
+
+
+def reduce(ensemble, x_init, resample):
+    """
+    Reduce solved models to the quantities used downstream.
+    """
+    xi1 = ensemble.xi1
+    out = {
+        'xi1': xi1,
+        'theta_prime': ensemble.theta_prime,
+        'rho_c_over_rho': ensemble.rho_c_over_rho,
+    }
+    if np.any(resample):
+        ys = np.full((len(ensemble), N_RESAMPLE), np.nan)
+        for i in np.flatnonzero(resample):
+            xnew = np.linspace(x_init[i], xi1[i], N_RESAMPLE)
+            ys[i] = ensemble[i].resample_y(xnew)
+        out['y_resampled'] = ys
+    return out
+
+
+def run(n_threads=None):
+    """
+    Solve every model and write the dataset.
+
+    The models are grouped by ``max_iter`` and ``analytic`` and solved in
+    chunks, so only ``CHUNK`` profiles are held in memory at once.
+    """
+    jobs = get_jobs()
+    resample = np.array([FAMILIES[f].get('resample', False) for f in jobs['family']])
+    results = {}
+    groups = set(zip(jobs['max_iter'], jobs['analytic']))
+    for max_iter, analytic in sorted(groups):
+        idx = np.flatnonzero((jobs['max_iter'] == max_iter) & (jobs['analytic'] == analytic))
+        # Chunks of similar cost keep the threads evenly loaded.
+        idx = idx[np.argsort(jobs['h'][idx], kind='stable')]
+        for start in range(0, len(idx), CHUNK):
+            chunk = idx[start:start+CHUNK]
+            x, y, z, offsets = solve_batch(
+                jobs['x_init'][chunk],
+                jobs['n'][chunk],
+                jobs['h'][chunk],
+                max_iter=int(max_iter),
+                impl=IMPL,
+                n_threads=n_threads,
+                analytic=bool(analytic)
+            )
+            ensemble = StarEnsemble(x, y, z, offsets, jobs['n'][chunk])
+            for key, val in reduce(ensemble, jobs['x_init'][chunk], resample[chunk]).items():
+                if key not in results:
+                    results[key] = np.full((len(jobs['n']),) + val.shape[1:], np.nan)
+                results[key][chunk] = val
+    data = {}
+    for name, family in FAMILIES.items():
+        mask = jobs['family'] == name
+        shape = np.broadcast_shapes(np.shape(family['n']), np.shape(family['h']))
+        data[f'{name}/n'] = jobs['n'][mask].reshape(shape)
+        data[f'{name}/h'] = jobs['h'][mask].reshape(shape)
+        data[f'{name}/x_init'] = jobs['x_init'][mask].reshape(shape)
+        for key in ('xi1', 'theta_prime', 'rho_c_over_rho'):
+            data[f'{name}/{key}'] = results[key][mask].reshape(shape)
+        if family.get('resample', False):
+            data[f'{name}/y_resampled'] = results['y_resampled'][mask].reshape(shape + (N_RESAMPLE,))
+    np.savez(PATH, **data)
+
+
+def load(family):
+    """
+    Load one family of models from the dataset.
+
+    Parameters
+    ----------
+    family : str
+        The name of the family, a key of ``FAMILIES``.
+
+    Returns
+    -------
+    dict
+        The arrays stored for the family, without the prefix.
+    """
+    with np.load(PATH) as data:
+        prefix = f'{family}/'
+        return {
+            key[len(prefix):]: data[key]
+            for key in data.files if key.startswith(prefix)
+        }
+
+
+if __name__ == '__main__':
+    try:
+        THREADS = snakemake.threads  # pylint: disable=undefined-variable
+    except NameError:
+        THREADS = None
+    run(THREADS)
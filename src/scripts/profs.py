@@ -7,18 +7,15 @@ from matplotlib.cm import ScalarMappable
 from matplotlib.colors import Normalize
 import numpy as np
 import paths
+from models import load
 
-from polysolver import Star
+from polysolver.analysis import central_pressure
 
 plt.style.use('seaborn-v0_8')
 
-H = 1e-3
-NMODELS = 1000
-NS = np.linspace(0,4,NMODELS)
-X_INIT = 1e-20
-MAX_ITER = 100000
-IMPL = 'rust'
-N_RESAMPLE = 100
+MODELS = load('profs')
+NS = MODELS['n']
+NMODELS = len(NS)
 ALPHA = 0.1
 FILENAME = 'profs.pdf'
 PATH = paths.figures / FILENAME
@@ -33,18 +30,16 @@ mappable = ScalarMappable(
 )
 
 
-for n,c in zip(NS,colors):
-    star = Star.from_soln(
-        x_init=X_INIT,
-        n=n,
-        h=H,
-        max_iter=MAX_ITER,
-        impl=IMPL
-    )
-    xi1 = star.xi1
-    xnew = np.linspace(X_INIT, xi1, N_RESAMPLE)
-    ynew = star.resample_y(xnew)
-    pcen = star.central_pressure(mass=1, radius=1)
+for n, x_init, xi1, dtheta, ynew, c in zip(
+    NS,
+    MODELS['x_init'],
+    MODELS['xi1'],
+    MODELS['theta_prime'],
+    MODELS['y_resampled'],
+    colors
+):
+    xnew = np.linspace(x_init, xi1, len(ynew))
+    pcen = central_pressure(n, dtheta, mass=1, radius=1)
     pressure = ynew**(1+n)*pcen
     ax.plot(xnew/xi1, pressure, label=f'n={n:.2f}',c=c,alpha=ALPHA)
 
@@ -5,24 +5,16 @@ Resolution Study for n=0
 import matplotlib.pyplot as plt
 import numpy as np
 import paths
+from models import load
 
 from polysolver import Star
 
 plt.style.use('seaborn-v0_8')
 
-HLO = 0.01
-HHI = 0.1
-NMODELS = 5
-STEPS = np.logspace(
-    np.log10(HLO),
-    np.log10(HHI),
-    NMODELS
-)
-X_INIT = 1e-20
+MODELS = load('res_n1')
+STEPS = MODELS['h']
+NMODELS = len(STEPS)
 N = 1
-MAX_ITER = 10000
-IMPL = 'rust'
-NPOINTS_RESAMPLE = 100
 
 FILENAME = 'res_n1.pdf'
 PATH = paths.figures / FILENAME
@@ -33,17 +25,14 @@ fig.subplots_adjust(hspace=0.05,right=0.95,top=0.95)
 
 colors = plt.cm.viridis(np.linspace(0,1,NMODELS))
 
-for h, c in zip(STEPS, colors):
-    star = Star.from_soln(
-        x_init=X_INIT,
-        n=N,
-        h=h,
-        max_iter=MAX_ITER,
-        impl=IMPL
-    )
-    xi1 = star.xi1
-    xnew = np.linspace(X_INIT,xi1,NPOINTS_RESAMPLE)
-    ynew = star.resample_y(xnew)
+for h, x_init, xi1, ynew, c in zip(
+    STEPS,
+    MODELS['x_init'],
+    MODELS['xi1'],
+    MODELS['y_resampled'],
+    colors
+):
+    xnew = np.linspace(x_init,xi1,len(ynew))
     true = Star.analytic(
         x=xnew,
         n=N
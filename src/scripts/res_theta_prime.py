@@ -6,23 +6,12 @@ deviations of \\xi_1
 import matplotlib.pyplot as plt
 import numpy as np
 import paths
-
-from polysolver import Star
+from models import load
 
 plt.style.use('seaborn-v0_8')
 
-HLO = 0.0001
-HHI = 0.1
-NMODELS = 200
-STEPS = np.logspace(
-    np.log10(HLO),
-    np.log10(HHI),
-    NMODELS
-)
-X_INIT = 1e-10
-N = 0
-MAX_ITER = 1000000
-IMPL = 'rust'
+MODELS = load('res_theta_prime')
+STEPS = MODELS['h'][0]
 
 FILENAME = 'res_thetaprime.pdf'
 PATH = paths.figures / FILENAME
@@ -43,19 +32,9 @@ fig.subplots_adjust(right=0.95,top=0.95)
 
 colors = plt.cm.viridis(np.linspace(0,1,len(data)))
 
-for (n, theta_p), c in zip(data, colors):
-    dat = []
-    for h in STEPS:
-        star = Star.from_soln(
-            x_init=X_INIT,
-            n=n,
-            h=h,
-            max_iter=MAX_ITER,
-            impl=IMPL
-        )
-        theta_p_measured = star.theta_prime
-        dat.append(theta_p_measured)
-    dat = np.array(dat)
+for i, ((n, theta_p), c) in enumerate(zip(data, colors)):
+    assert MODELS['n'][i,0] == n
+    dat = MODELS['theta_prime'][i]
     res = np.abs(dat-theta_p)/theta_p
     ax.plot(STEPS, res, c=c,label=f'n={n:.1f}')
         
@@ -4,8 +4,8 @@ Recreate table 7.1
 """
 import numpy as np
 
-from polysolver import Star
 import paths
+from models import load
 
 
 
@@ -44,15 +44,10 @@ data = {
         {
             'xi1': 14.972,
             'dtheta': 0.00802,
-            'rho': 662.41
+            'rho': 622.41
         }
 }
 
-NMODELS = 4*4 + 1
-NS = np.linspace(0,4,NMODELS)
-H = 1e-3
-X_INIT = 1e-20
-
 NAMES = [
     '$n$',
     '$\\xi_1$',
@@ -102,20 +97,19 @@ with open(outfile,'w',encoding='utf-8') as f:
     f.write(r'\hline'+'\n')
     f.write(f'{TITLE} \\\\'+'\n')
     f.write(r'\hline' + '\n')
-    for n in NS:
-        star = Star.from_soln(
-            x_init=X_INIT,
-            n=n,
-            h=H,
-            max_iter=100000,
-            impl='rust'
-        )
+    models = load('tab7')
+    for n, xi1, dtheta, rho in zip(
+        models['n'],
+        models['xi1'],
+        models['theta_prime'],
+        models['rho_c_over_rho']
+    ):
         f.write(
             line(
                 n,
-                star.xi1,
-                star.theta_prime,
-                star.rho_c_over_rho
+                xi1,
+                dtheta,
+                rho
             ) + ' \\\\' + '\n'
         )
     f.write(r'\hline' +'\n')
@@ -40,7 +40,8 @@ for x_init, c in zip(X_INITS, colors):
         n=N,
         h=H,
         max_iter=MAX_ITER,
-        impl=IMPL
+        impl=IMPL,
+        analytic=False
     )
     xi1 = star.xi1
     xnew = np.linspace(x_init,xi1,NPOINTS_RESAMPLE)
@@ -62,7 +62,8 @@ for (n, xi1), c, ax in zip(data, colors, axes):
                 n=n,
                 h=h,
                 max_iter=MAX_ITER,
-                impl=IMPL
+                impl=IMPL,
+                analytic=False
             )
             xi1_measured = star.xi1
             dat[i,j] = xi1_measured
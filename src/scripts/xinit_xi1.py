@@ -51,7 +51,8 @@ for (n, xi1), c in zip(data, colors):
             n=n,
             h=H,
             max_iter=MAX_ITER,
-            impl=IMPL
+            impl=IMPL,
+            analytic=False
         )
         xi1_measured = star.xi1
         dat.append(xi1_measured)
@@ -0,0 +1,22 @@
+"""
+Shared settings for the tests.
+
+The python engine is always tested. The rust engine is tested too when
+the extension has been built, e.g. with ``maturin develop``.
+"""
+import pytest
+
+try:
+    # pylint: disable-next=no-name-in-module,unused-import
+    from polysolver import polysolver_rust
+    IMPLS = ('python', 'rust')
+except ImportError:
+    IMPLS = ('python',)
+
+
+@pytest.fixture(params=IMPLS)
+def impl(request):
+    """
+    Each implementation that can run here.
+    """
+    return request.param
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from polysolver import solve, Star
+from polysolver.polysolver import analytic_yz, solve_analytic, ANALYTIC_INDICES
+
+
+@pytest.mark.parametrize('n', ANALYTIC_INDICES)
+def test_solve_dispatches_to_closed_form(n):
+    x, y, z = solve(1e-6, n, 1e-2, 5000, 'python')
+    xa, ya, za = solve_analytic(1e-6, n, 1e-2, 5000)
+    np.testing.assert_array_equal(x, xa)
+    np.testing.assert_array_equal(y, ya)
+    np.testing.assert_array_equal(z, za)
+
+
+@pytest.mark.parametrize('n', ANALYTIC_INDICES)
+def test_closed_form_matches_integration(impl, n):
+    x, y, z = solve(1e-10, n, 1e-3, 10**5, impl, analytic=False)
+    ya, za = analytic_yz(x, n)
+    # The first steps from the regular singular point are least accurate.
+    inside = (y > 0) & (x > 0.1)
+    np.testing.assert_allclose(y[inside], ya[inside], atol=1e-8)
+    np.testing.assert_allclose(z[inside], za[inside], atol=1e-7)
+
+
+def test_same_grid_as_integration(impl):
+    x, _, _ = solve(1e-6, 1., 1e-2, 5000, impl, analytic=False)
+    xa, _, _ = solve_analytic(1e-6, 1., 1e-2, 5000)
+    assert len(x) == len(xa)
+    np.testing.assert_allclose(x, xa, rtol=1e-12)
+
+
+def test_surfaces():
+    assert Star(*solve(1e-6, 0, 1e-3, 10**5, 'python'), 0).xi1 == pytest.approx(np.sqrt(6), rel=1e-9)
+    assert Star(*solve(1e-6, 1, 1e-3, 10**5, 'python'), 1).xi1 == pytest.approx(np.pi, rel=1e-9)
+
+
+def test_integrals_do_not_use_closed_form():
+    x, _, _, _ = solve(1e-6, 1., 1e-2, 5000, 'python', integrals=('mass',))
+    assert len(x) == len(solve(1e-6, 1., 1e-2, 5000, 'python', analytic=False)[0])
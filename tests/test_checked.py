@@ -0,0 +1,50 @@
+import threading
+import warnings
+
+import numpy as np
+import pytest
+
+from polysolver import solve, solve_from
+
+
+def test_progress(impl):
+    seen = []
+    x, y, z = solve(1e-6, 1.5, 1e-3, 10**5, impl, progress=lambda x, y: seen.append(x), progress_every=1000)
+    full = solve(1e-6, 1.5, 1e-3, 10**5, impl)
+    np.testing.assert_array_equal(y, full[1])
+    # Once before the first chunk and once between chunks.
+    assert len(seen) == (len(x) - 1)//1000 + 1
+    assert seen[0] == x[0]
+
+
+def test_cancel_before_start(impl):
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.warns(RuntimeWarning):
+        x, _, _ = solve(1e-6, 1.5, 1e-3, 10**5, impl, cancel=cancel)
+    assert len(x) == 1
+
+
+def test_cancel_and_continue(impl):
+    cancel = threading.Event()
+    def progress(x, y):
+        if x > 1:
+            cancel.set()
+    with pytest.warns(RuntimeWarning):
+        x, y, z = solve(1e-6, 1.5, 1e-3, 10**5, impl, progress=progress, cancel=cancel, progress_every=100)
+    assert y[-1] > 0
+    rest = solve_from(x[-1], y[-1], z[-1], 1.5, 1e-3, 10**5, impl)
+    full = solve(1e-6, 1.5, 1e-3, 10**5, impl)
+    np.testing.assert_array_equal(np.concatenate([y, rest[1][1:]]), full[1])
+
+
+def test_timeout(impl):
+    with pytest.warns(RuntimeWarning):
+        x, _, _ = solve(1e-6, 1.5, 1e-3, 10**5, impl, timeout=0.)
+    assert len(x) == 1
+
+
+def test_no_warning_when_finished(impl):
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        solve(1e-6, 1.5, 1e-3, 10**5, impl, timeout=60.)
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from polysolver import solve
+from polysolver.checkpoint import solve_checkpointed, load_checkpoint
+
+
+def test_matches_single_run(tmp_path, impl):
+    path = str(tmp_path / 'n3.bin')
+    x, y, z = solve_checkpointed(path, 1e-6, 3., 1e-3, 10**5, every=500, impl=impl)
+    full = solve(1e-6, 3., 1e-3, 10**5, impl, analytic=False)
+    for got, want in zip((x, y, z), full):
+        np.testing.assert_array_equal(got, want)
+
+
+def test_resume(tmp_path, impl):
+    path = str(tmp_path / 'n3.bin')
+    solve_checkpointed(path, 1e-6, 3., 1e-3, 2000, every=500, impl=impl)
+    # A partial row left by an interrupted write is dropped.
+    with open(path, 'ab') as file:
+        file.write(b'\0'*12)
+    x, y, z = solve_checkpointed(path, 1e-6, 3., 1e-3, 10**5, every=500, impl=impl)
+    full = solve(1e-6, 3., 1e-3, 10**5, impl, analytic=False)
+    np.testing.assert_array_equal(x, full[0])
+    np.testing.assert_array_equal(load_checkpoint(path)[1], full[1])
+
+
+def test_unbounded_resume(tmp_path, impl):
+    path = str(tmp_path / 'n5.bin')
+    first = solve_checkpointed(path, 1e-6, 5., 1e-2, 10**4, every=500, impl=impl)
+    again = solve_checkpointed(path, 1e-6, 5., 1e-2, 10**4, every=500, impl=impl)
+    assert len(first[0]) == len(again[0]) == 2001
+    np.testing.assert_array_equal(first[1], again[1])
+
+
+def test_different_run(tmp_path):
+    path = str(tmp_path / 'n3.bin')
+    solve_checkpointed(path, 1e-6, 3., 1e-3, 100, every=50, impl='python')
+    with pytest.raises(ValueError):
+        solve_checkpointed(path, 1e-6, 2., 1e-3, 100, every=50, impl='python')
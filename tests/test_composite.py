@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from polysolver import Star, CompositeStar
+
+ZONES = [{'n': 3., 'xi': 2., 'density_jump': 0.5}, {'n': 1.5}]
+
+
+@pytest.fixture(scope='module')
+def plain():
+    return Star.from_soln(1e-6, 3., 1e-3, 10**5, 'python')
+
+
+def test_single_zone(impl, plain):
+    star = CompositeStar.from_soln(1e-6, [{'n': 3.}], 1e-3, impl=impl)
+    assert star.n_zones == 1
+    np.testing.assert_array_equal(star.y, plain.y)
+    assert star.xi1 == pytest.approx(plain.xi1, rel=1e-12)
+
+
+def test_homology(impl, plain):
+    # Crossing an interface without a density jump rescales the same
+    # polytrope, so the surface must not move.
+    star = CompositeStar.from_soln(1e-6, [{'n': 3., 'xi': 2.}, {'n': 3.}], 1e-3, impl=impl)
+    assert star.n_zones == 2
+    assert star.xi1 == pytest.approx(plain.xi1, rel=1e-10)
+    assert star.theta_prime == pytest.approx(plain.theta_prime, rel=1e-10)
+    assert star.mass == pytest.approx(plain.xi1**2*plain.theta_prime, rel=1e-10)
+    assert star.rho_c_over_rho == pytest.approx(plain.rho_c_over_rho, rel=1e-8)
+    inner = star.x < 2
+    np.testing.assert_allclose(star.density()[inner], np.asarray(plain.y[:np.count_nonzero(inner)])**3)
+
+
+def test_interfaces(impl):
+    star = CompositeStar.from_soln(1e-6, [{'n': 3., 'mass_fraction': 0.5}, {'n': 1.5}], 1e-3, impl=impl)
+    inner = star.zone(0)
+    assert -inner.x[-1]**2*inner.z[-1] == pytest.approx(0.5*star.mass, rel=1e-8)
+    star = CompositeStar.from_soln(1e-6, [{'n': 3., 'theta': 0.5}, {'n': 1.5}], 1e-3, impl=impl)
+    assert star.zone(0).y[-1] == pytest.approx(0.5, abs=1e-12)
+
+
+def test_density_jump(impl):
+    star = CompositeStar.from_soln(1e-6, ZONES, 1e-3, impl=impl)
+    start = star.info['starts'][1]
+    density = star.density()
+    assert density[start]/density[start - 1] == pytest.approx(0.5)
+    pressure = star.pressure()
+    assert pressure[start] == pytest.approx(pressure[start - 1])
+
+
+def test_extend(impl):
+    full = CompositeStar.from_soln(1e-6, ZONES, 1e-3, impl=impl)
+    part = CompositeStar.from_soln(1e-6, ZONES, 1e-3, max_iter=3000, impl=impl)
+    assert part.truncated
+    extended = part.extend(10**5, impl)
+    np.testing.assert_array_equal(extended.x, full.x)
+    np.testing.assert_array_equal(extended.y, full.y)
+    assert extended.xi1 == full.xi1
+
+
+def test_extend_before_outer_zone():
+    part = CompositeStar.from_soln(1e-6, ZONES, 1e-3, max_iter=1000, impl='python')
+    with pytest.raises(ValueError):
+        part.extend(10**5, 'python')
+
+
+def test_dense():
+    star = CompositeStar.from_soln(1e-6, ZONES, 1e-3, impl='python')
+    dense = star.dense
+    start = star.info['starts'][1]
+    # The interface is in both zones; it evaluates in the outer one.
+    np.testing.assert_array_equal(dense(star.x[:start - 1]), star.y[:start - 1])
+    np.testing.assert_array_equal(dense(star.x[start:]), star.y[start:])
+    np.testing.assert_allclose(dense.rho(star.x[start:]), star.density()[start:])
+    assert dense.xi1 == pytest.approx(star.xi1, rel=1e-9)
+    np.testing.assert_array_equal(star.resample_y(star.x[start:]), star.y[start:])
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from polysolver import solve, DenseSolution
+from polysolver.polysolver import analytic_yz
+
+
+@pytest.fixture
+def dense(impl):
+    return solve(1e-10, 1., 0.05, 10**4, impl, analytic=False, dense=True)
+
+
+def test_grid_points(dense):
+    np.testing.assert_array_equal(dense(dense.x), dense.y)
+    np.testing.assert_allclose(dense.theta_prime(dense.x), dense.z, atol=1e-14)
+
+
+def test_between_grid_points():
+    # Exact samples, so only the interpolation error is measured.
+    x = np.linspace(0, 3.1, 63)
+    dense = DenseSolution(x, *analytic_yz(x, 1), 1.)
+    xi = np.linspace(0, 3.1, 1001)
+    y, z = analytic_yz(xi, 1)
+    np.testing.assert_allclose(dense(xi), y, atol=1e-9)
+    np.testing.assert_allclose(dense.theta_prime(xi), z, atol=1e-7)
+    assert np.max(np.abs(np.interp(xi, x, dense.y) - y)) > 1e-4
+
+
+def test_surface(impl):
+    dense = solve(1e-10, 1., 0.01, 10**4, impl, analytic=False, dense=True)
+    assert dense.xi1 == pytest.approx(np.pi, rel=1e-6)
+    assert dense.rho(dense.x[-1]) == 0
+    assert np.isnan(dense.rho(4.))
+
+
+def test_outside(dense):
+    assert np.isnan(dense(dense.x[-1] + 1))
+    assert np.isfinite(dense(dense.x[-1] + 1, extrapolate=True))
+
+
+def test_from_profile():
+    x, y, z = solve(1e-10, 1.5, 1e-2, 10**4, 'python')
+    dense = DenseSolution(x, y, z, 1.5)
+    np.testing.assert_array_equal(dense(x), y)
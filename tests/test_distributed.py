@@ -0,0 +1,79 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from polysolver import distributed, solve_batch, StarEnsemble
+
+N = np.linspace(0.5, 4, 7)
+
+
+@pytest.fixture
+def sweep(tmp_path):
+    root = tmp_path / 'sweep'
+    distributed.create(root, 1e-6, N, 1e-2, 10**4, shard_size=3, profiles=True, impl='python')
+    return root
+
+
+def test_create(sweep):
+    assert distributed.status(sweep) == {'todo': 3, 'claimed': 0, 'done': 0}
+    with pytest.raises(FileExistsError):
+        distributed.create(sweep, 1e-6, N, 1e-2, impl='python')
+
+
+def test_merge_matches_solve_batch(sweep):
+    assert distributed.work(sweep, worker='w0') == 3
+    result = distributed.merge(sweep)
+    ensemble = StarEnsemble(*solve_batch(1e-6, N, 1e-2, 10**4, 'python'), N)
+    np.testing.assert_array_equal(result['n'], N)
+    np.testing.assert_array_equal(result['xi1'], ensemble.xi1)
+    np.testing.assert_array_equal(result['length'], ensemble.lengths)
+    np.testing.assert_array_equal(result['ensemble'].y, ensemble.y)
+
+
+def test_merge_unfinished(sweep):
+    distributed.work(sweep, worker='w0', max_shards=1)
+    with pytest.raises(RuntimeError):
+        distributed.merge(sweep)
+
+
+def test_requeue_stale(sweep):
+    paths = distributed._paths(sweep)
+    claimed = distributed._claim(paths, 'lost')
+    assert distributed.status(sweep)['claimed'] == 1
+    # A fresh claim is left alone.
+    assert distributed.requeue_stale(sweep, lease=60) == 0
+    past = time.time() - 120
+    os.utime(claimed, (past, past))
+    assert distributed.requeue_stale(sweep, lease=60) == 1
+    assert distributed.status(sweep) == {'todo': 3, 'claimed': 0, 'done': 0}
+    assert distributed.work(sweep, worker='w1') == 3
+
+
+def test_requeue_done(sweep):
+    # A shard finished by another worker is dropped, not solved again.
+    paths = distributed._paths(sweep)
+    claimed = distributed._claim(paths, 'slow')
+    distributed.solve_shard(sweep, claimed, distributed.load_settings(sweep))
+    again = claimed.with_name(claimed.name.split('.npz.')[0] + '.npz.lost')
+    again.write_bytes(b'')
+    past = time.time() - 120
+    os.utime(again, (past, past))
+    assert distributed.requeue_stale(sweep, lease=60) == 0
+    assert not again.exists()
+
+
+def test_default_worker(sweep, monkeypatch):
+    monkeypatch.setattr(distributed.socket, 'gethostname', lambda: 'node1.cluster.example')
+    assert distributed.work(sweep, max_shards=1) == 1
+
+
+def test_worker_with_dot(sweep):
+    with pytest.raises(ValueError):
+        distributed.work(sweep, worker='node1.cluster')
+
+
+def test_no_sweep(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        distributed.work(tmp_path, worker='w0')
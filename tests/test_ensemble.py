@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from polysolver import solve, Star, StarEnsemble
+
+NS = [1.5, 3., 2., 5.5]
+
+
+@pytest.fixture
+def ensemble(impl):
+    return StarEnsemble.from_soln(1e-6, NS, 1e-2, 5000, impl, analytic=False)
+
+
+def test_sorted_offsets(ensemble):
+    np.testing.assert_array_equal(ensemble.n, sorted(NS))
+    assert ensemble.offsets[0] == 0
+    assert ensemble.offsets[-1] == len(ensemble.x)
+    np.testing.assert_array_equal(ensemble.lengths, np.diff(ensemble.offsets))
+
+
+def test_members_match_single_solves(ensemble, impl):
+    for i, n in enumerate(ensemble.n):
+        x, y, z = solve(1e-6, n, 1e-2, 5000, impl, analytic=False)
+        member = ensemble[i]
+        np.testing.assert_array_equal(member.x, x)
+        np.testing.assert_array_equal(member.y, y)
+        np.testing.assert_array_equal(member.z, z)
+
+
+def test_views_share_memory(ensemble):
+    assert np.shares_memory(ensemble[1].y, ensemble.y)
+    part = ensemble[1:3]
+    assert np.shares_memory(part.y, ensemble.y)
+    np.testing.assert_array_equal(part.offsets, ensemble.offsets[1:4] - ensemble.offsets[1])
+    np.testing.assert_array_equal(part[0].x, ensemble[1].x)
+    with pytest.raises(ValueError):
+        ensemble[::2]
+
+
+def test_select_n(ensemble):
+    np.testing.assert_array_equal(ensemble.select_n(2., 3.).n, [2., 3.])
+
+
+def test_surface_matches_star(ensemble):
+    for i in range(len(ensemble)):
+        star = ensemble[i]
+        assert ensemble.xi1[i] == pytest.approx(star.xi1, rel=1e-12)
+        assert ensemble.theta_prime[i] == pytest.approx(star.theta_prime, rel=1e-12, abs=0)
+        assert ensemble.rho_c_over_rho[i] == pytest.approx(star.rho_c_over_rho, rel=1e-12)
+
+
+def test_unbounded_members(ensemble):
+    np.testing.assert_array_equal(ensemble.status, ['surface', 'surface', 'surface', 'unbounded'])
+    assert ensemble.xi1[-1] == np.inf
+    assert ensemble.theta_prime[-1] == 0
+    assert ensemble.rho_c_over_rho[-1] == np.inf
+
+
+def test_short_members_are_nan():
+    short = Star(*solve(1e-6, 2., 1e-2, 1, 'python', analytic=False), 2.)
+    full = Star(*solve(1e-6, 1.5, 1e-2, 5000, 'python', analytic=False), 1.5)
+    ensemble = StarEnsemble.from_stars([full, short, full])
+    assert np.isnan(ensemble.xi1[1])
+    assert ensemble.xi1[0] == ensemble.xi1[2] == pytest.approx(full.xi1, rel=1e-12)
+
+
+def test_resample_y_matches_star(ensemble):
+    x = np.linspace(0.5, 3.5, 7)
+    resampled = ensemble.resample_y(x)
+    assert resampled.shape == (len(ensemble), len(x))
+    for i in range(len(ensemble)):
+        np.testing.assert_allclose(resampled[i], ensemble[i].resample_y(x), atol=1e-6)
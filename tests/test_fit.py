@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from polysolver import solve, Star, fit_n
+from polysolver.fit import surface_gradient
+from polysolver.polysolver import solve_sensitivity
+
+TARGETS = ('xi1', 'theta_prime', 'rho_c_over_rho')
+
+
+@pytest.mark.parametrize('n', [1e-3, 1e-2, 0.5, 1.5, 3.])
+def test_sensitivity_surface_matches_fine_solve(impl, n):
+    *_, surface = solve_sensitivity(1e-10, n, 1e-3, 10**5, impl)
+    star = Star(*solve(1e-10, n, 1e-4, 10**6, impl, analytic=False), n)
+    assert surface[0] == pytest.approx(star.xi1, rel=1e-8)
+
+
+@pytest.mark.parametrize('n', [1e-2, 0.2, 0.5, 0.8, 1.5, 3.])
+def test_gradient_matches_finite_difference(impl, n):
+    values, gradients = surface_gradient(1e-10, n, 1e-3, 10**5, impl)
+    dn = 1e-4*n
+    lo, _ = surface_gradient(1e-10, n - dn, 1e-3, 10**5, impl)
+    hi, _ = surface_gradient(1e-10, n + dn, 1e-3, 10**5, impl)
+    for key in TARGETS:
+        fd = (hi[key] - lo[key])/(2*dn)
+        assert gradients[key] == pytest.approx(fd, rel=1e-4)
+
+
+@pytest.mark.parametrize('n', [1e-3, 0.5, 1.5, 3.])
+@pytest.mark.parametrize('target', TARGETS)
+def test_fit_recovers_n(impl, n, target):
+    values, _ = surface_gradient(1e-10, n, 1e-3, 10**5, impl)
+    assert fit_n(target, values[target], impl=impl) == pytest.approx(n, rel=1e-6)
+
+
+def test_fit_small_n(impl):
+    # rho_c/<rho> = 1.001 is reached near n = 7.8e-4.
+    n = fit_n('rho_c_over_rho', 1.001, impl=impl)
+    *_, values = solve(1e-10, n, 1e-4, 10**6, impl, integrals=('mean_density',))
+    assert 1/values['mean_density'] == pytest.approx(1.001, rel=1e-7)
+
+
+def test_sensitivity_unbounded_has_no_surface(impl):
+    x, *_, surface = solve_sensitivity(1e-8, 5., 1e-2, 10**5, impl)
+    assert x[-1] < 20.1
+    assert np.all(np.isnan(surface))
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from polysolver import solve, Star
+
+
+def test_mass_n0(impl):
+    _, _, _, values = solve(1e-8, 0., 1e-3, 10**5, impl, integrals=('mass',))
+    xi1 = np.sqrt(6)
+    assert values['mass'] == pytest.approx(4/3*np.pi*xi1**3, rel=1e-6)
+
+
+@pytest.mark.parametrize('n', [1., 1.5, 3.])
+def test_mass_matches_surface_gradient(impl, n):
+    x, y, z, values = solve(1e-8, n, 1e-3, 10**5, impl, integrals=('mass', 'mean_density'))
+    star = Star(x, y, z, n)
+    mass = 4*np.pi*star.xi1**2*star.theta_prime
+    assert values['mass'] == pytest.approx(mass, rel=1e-6)
+    assert 1/values['mean_density'] == pytest.approx(star.xi1/(3*star.theta_prime), rel=1e-6)
+
+
+def test_moment_of_inertia_n0(impl):
+    _, _, _, values = solve(1e-8, 0., 1e-3, 10**5, impl, integrals=('moment_of_inertia',))
+    # A uniform sphere: I = 2/5 M R^2.
+    xi1 = np.sqrt(6)
+    assert values['moment_of_inertia'] == pytest.approx(2/5*4/3*np.pi*xi1**5, rel=1e-6)
+
+
+def test_keep_profile(impl):
+    full = solve(1e-8, 1.5, 1e-3, 10**5, impl, integrals=('mass',))
+    short = solve(1e-8, 1.5, 1e-3, 10**5, impl, integrals=('mass',), keep_profile=False)
+    assert len(short[0]) == 3
+    np.testing.assert_array_equal(short[0], full[0][-3:])
+    assert short[3]['mass'] == full[3]['mass']
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from polysolver import Star, StarEnsemble, solve_batch
+from polysolver.modes import radial_modes, radial_modes_ensemble, METHODS
+
+
+def pekeris(gamma1, k):
+    """
+    The modes of a homogeneous star.
+    """
+    k = np.arange(k)
+    return gamma1*(k + 1)*(2*k + 3) - 4
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_pekeris(impl, method):
+    star = Star.from_soln(1e-8, 0., 1e-3, 10**5, impl)
+    omega2 = radial_modes(star, k=3, n_grid=4000, method=method)
+    np.testing.assert_allclose(omega2, pekeris(5/3, 3), rtol=1e-3)
+
+
+def test_gamma1_array():
+    star = Star.from_soln(1e-8, 0., 1e-3, 10**5, 'python')
+    gamma1 = np.array([4/3, 1.4, 5/3])
+    omega2 = radial_modes(star, k=2, gamma1=gamma1, n_grid=4000)
+    assert omega2.shape == (3, 2)
+    for row, value in zip(omega2, gamma1):
+        np.testing.assert_allclose(row, pekeris(value, 2), rtol=1e-3, atol=1e-3)
+
+
+def test_n3(impl):
+    # The classical fundamental of the standard model.
+    star = Star.from_soln(1e-8, 3., 1e-3, 10**5, impl)
+    assert radial_modes(star, k=1)[0] == pytest.approx(9.26, abs=0.01)
+
+
+def test_vectors():
+    star = Star.from_soln(1e-8, 1.5, 1e-3, 10**5, 'python')
+    _, xi, zeta = radial_modes(star, k=3, vectors=True)
+    assert xi[-1] == pytest.approx(star.xi1)
+    np.testing.assert_allclose(zeta[:, -1], 1)
+    # The k-th overtone has k nodes.
+    for k in range(3):
+        assert np.count_nonzero(np.diff(np.sign(zeta[k]))) == k
+
+
+def test_ensemble_matches_single(impl):
+    n = np.array([0., 1.5, 3.])
+    ensemble = StarEnsemble(*solve_batch(1e-8, n, 1e-3, 10**5, impl), n)
+    omega2 = radial_modes_ensemble(ensemble, k=2)
+    for row, member in zip(omega2, n):
+        star = Star.from_soln(1e-8, member, 1e-3, 10**5, impl)
+        # The surface values of the ensemble come from its last points.
+        np.testing.assert_allclose(row, radial_modes(star, k=2), rtol=1e-3)
+
+
+def test_requires_surface():
+    star = Star.from_soln(1e-8, 1.5, 1e-3, 100, 'python')
+    with pytest.raises(ValueError):
+        radial_modes(star)
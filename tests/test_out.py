@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from polysolver import solve
+
+
+def test_fills_buffers(impl):
+    x, y, z = solve(1e-6, 1.5, 1e-2, 1000, impl, analytic=False)
+    out = tuple(np.full(1000, np.nan) for _ in range(3))
+    length = solve(1e-6, 1.5, 1e-2, 1000, impl, analytic=False, out=out)
+    assert length == len(x)
+    for arr, want in zip(out, (x, y, z)):
+        np.testing.assert_array_equal(arr[:length], want)
+        assert np.all(np.isnan(arr[length:]))
+
+
+def test_stops_when_full(impl):
+    out = tuple(np.zeros(50) for _ in range(3))
+    assert solve(1e-6, 1.5, 1e-2, 1000, impl, analytic=False, out=out) == 50
+
+
+def test_analytic(impl):
+    out = tuple(np.zeros(1000) for _ in range(3))
+    length = solve(1e-6, 1., 1e-2, 1000, impl, out=out)
+    np.testing.assert_array_equal(out[1][:length], solve(1e-6, 1., 1e-2, 1000, impl)[1])
+
+
+@pytest.mark.parametrize('make', [
+    lambda buf: (buf[:-1], buf[1:], np.zeros(10)),
+    lambda buf: (buf, buf, np.zeros(10)),
+    lambda buf: (buf[::2], np.zeros(10), np.zeros(10)),
+    lambda buf: (buf.astype(np.float32), np.zeros(10), np.zeros(10)),
+])
+def test_rejects_bad_buffers(impl, make):
+    with pytest.raises(ValueError):
+        solve(1e-6, 1.5, 1e-2, 100, impl, analytic=False, out=make(np.zeros(20)))
+
+
+def test_rejects_read_only(impl):
+    x = np.zeros(10)
+    x.flags.writeable = False
+    with pytest.raises(ValueError):
+        solve(1e-6, 1.5, 1e-2, 100, impl, analytic=False, out=(x, np.zeros(10), np.zeros(10)))
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from polysolver import solve
+from polysolver.polysolver import analytic_yz, SCIPY_METHODS
+
+pytest.importorskip('scipy')
+
+
+@pytest.mark.parametrize('method', SCIPY_METHODS)
+def test_n1(method):
+    x, y, z = solve(1e-6, 1., 1e-2, 10**4, 'scipy', analytic=False, method=method)
+    exact_y, exact_z = analytic_yz(x, 1)
+    np.testing.assert_allclose(y, exact_y, atol=1e-7)
+    # The start at x_init has z=0 where the exact -x_init/3 is not.
+    np.testing.assert_allclose(z[1:], exact_z[1:], atol=1e-7)
+    # The surface is the last point.
+    assert x[-1] == pytest.approx(np.pi, abs=1e-7)
+    assert y[-1] == 0
+
+
+def test_matches_rk4():
+    x, y, _ = solve(1e-6, 3., 1e-3, 10**5, 'scipy')
+    rk_x, rk_y, _ = solve(1e-6, 3., 1e-3, 10**5, 'python')
+    np.testing.assert_allclose(x[:-1], rk_x[:len(x) - 1], rtol=1e-12)
+    np.testing.assert_allclose(y[:-1], rk_y[:len(x) - 1], atol=1e-6)
+
+
+def test_max_iter():
+    x, _, _ = solve(1e-6, 3., 1e-2, 100, 'scipy')
+    assert len(x) == 101
+
+
+def test_dense():
+    sol = solve(1e-6, 1.5, 1e-2, 10**4, 'scipy', dense=True)
+    rk = solve(1e-6, 1.5, 1e-3, 10**5, 'python', dense=True)
+    assert sol.xi1 == pytest.approx(rk.xi1, rel=1e-8)
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'stop_at_xi': 1.},
+    {'integrals': ('mass',)},
+    {'out': (np.zeros(10), np.zeros(10), np.zeros(10))},
+    {'coord': 'log'},
+    {'timeout': 1.},
+])
+def test_rejects_unsupported(kwargs):
+    with pytest.raises(ValueError):
+        solve(1e-6, 1.5, 1e-2, 10**4, 'scipy', **kwargs)
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        solve(1e-6, 1.5, 1e-2, 10**4, 'scipy', method='Euler')
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from polysolver import solve
+from polysolver.polysolver import total_mass
+
+
+def test_stop_at_xi(impl):
+    x, y, z = solve(1e-6, 1.5, 1e-2, 10**4, impl, stop_at_xi=1.234)
+    assert x[-1] == pytest.approx(1.234, abs=1e-12)
+    # The points before the event are those of the full solve.
+    full = solve(1e-6, 1.5, 1e-2, 10**4, impl)
+    np.testing.assert_array_equal(x[:-1], full[0][:len(x) - 1])
+
+
+def test_stop_at_theta(impl):
+    _, y, _ = solve(1e-6, 1.5, 1e-2, 10**4, impl, stop_at_theta=0.5)
+    assert y[-1] == pytest.approx(0.5, abs=1e-12)
+    assert np.all(y[:-1] > 0.5)
+
+
+def test_stop_at_mass_fraction(impl):
+    x, _, z = solve(1e-6, 3., 1e-2, 10**4, impl, stop_at_mass_fraction=0.9)
+    mass = -x[-1]**2*z[-1]
+    assert mass == pytest.approx(0.9*total_mass(3., impl), rel=1e-10)
+
+
+def test_first_event_wins(impl):
+    x, y, _ = solve(1e-6, 1.5, 1e-2, 10**4, impl, stop_at_xi=10., stop_at_theta=0.9)
+    assert y[-1] == pytest.approx(0.9, abs=1e-12)
+    assert x[-1] < 10.
+
+
+def test_not_reached(impl):
+    x, y, _ = solve(1e-6, 1.5, 1e-2, 10**4, impl, stop_at_xi=100.)
+    assert y[-1] <= 0
+    assert x[-1] < 100.
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'integrals': ('mass',)},
+    {'coord': 'log'},
+])
+def test_rejects_combinations(kwargs):
+    with pytest.raises(ValueError):
+        solve(1e-6, 1.5, 1e-2, 10**4, 'python', stop_at_xi=1., **kwargs)
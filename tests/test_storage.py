@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from polysolver import Star, CompositeStar, StarEnsemble, solve_batch
+from polysolver import storage
+
+
+@pytest.fixture
+def star():
+    return Star.from_soln(1e-6, 1.5, 1e-2, 10**4, 'python')
+
+
+def test_star_round_trip(star):
+    copy = Star.from_bytes(star.to_bytes())
+    for key in ('x', 'y', 'z'):
+        np.testing.assert_array_equal(getattr(copy, key), getattr(star, key))
+    assert copy.n == star.n
+    assert copy.h == star.h
+    for key in ('xi1', 'theta_prime', 'rho_c_over_rho'):
+        assert getattr(copy, key) == getattr(star, key)
+
+
+def test_uniform_x(star):
+    raw = star.to_bytes(x_encoding='raw')
+    uniform = star.to_bytes(x_encoding='uniform')
+    assert len(uniform) < len(raw)
+    np.testing.assert_array_equal(Star.from_bytes(uniform).x, star.x)
+
+
+def test_uniform_x_analytic():
+    star = Star.from_soln(1e-6, 1., 1e-2, 10**4, 'python')
+    np.testing.assert_array_equal(Star.from_bytes(star.to_bytes(x_encoding='uniform')).x, star.x)
+
+
+def test_uniform_x_rejects_irregular(star):
+    star.x = star.x.copy()
+    star.x[5] += 1e-9
+    with pytest.raises(ValueError):
+        star.to_bytes(x_encoding='uniform')
+
+
+def test_f4(star):
+    copy = Star.from_bytes(star.to_bytes('<f4'))
+    assert copy.y.dtype == np.float32
+    np.testing.assert_allclose(copy.y, star.y, atol=1e-7)
+    # The surface quantities are kept at full precision.
+    assert copy.xi1 == star.xi1
+
+
+def test_integrals():
+    star = Star.from_soln(1e-6, 1.5, 1e-2, 10**4, 'python', integrals=('mass',))
+    copy = Star.from_bytes(star.to_bytes())
+    assert copy.integrals == star.integrals
+
+
+def test_zero_copy(star):
+    buffer = star.to_bytes()
+    copy = Star.from_bytes(buffer)
+    assert not copy.y.flags.writeable
+    assert np.shares_memory(copy.y, np.frombuffer(buffer, np.uint8))
+
+
+def test_save_load(tmp_path, star):
+    path = tmp_path / 'star.plys'
+    star.save(path)
+    for mmap in (True, False):
+        copy = Star.load(path, mmap=mmap)
+        np.testing.assert_array_equal(copy.y, star.y)
+
+
+def test_ensemble_round_trip(tmp_path):
+    n = np.array([0.5, 1.5, 3.])
+    ensemble = StarEnsemble(*solve_batch(1e-6, n, 1e-2, 10**4, 'python'), n)
+    path = tmp_path / 'ens.plys'
+    ensemble.save(path)
+    copy = StarEnsemble.load(path)
+    np.testing.assert_array_equal(copy.offsets, ensemble.offsets)
+    np.testing.assert_array_equal(copy.y, ensemble.y)
+    np.testing.assert_array_equal(copy.n, ensemble.n)
+    np.testing.assert_array_equal(copy.xi1, ensemble.xi1)
+
+
+def test_composite_round_trip():
+    star = CompositeStar.from_soln(1e-6, [{'n': 3., 'xi': 2., 'density_jump': 0.5}, {'n': 1.5}], 1e-2, impl='python')
+    copy = CompositeStar.from_bytes(star.to_bytes())
+    np.testing.assert_array_equal(copy.y, star.y)
+    assert copy.ns == star.ns
+    np.testing.assert_array_equal(copy.info['starts'], star.info['starts'])
+    assert copy.xi1 == star.xi1
+    np.testing.assert_array_equal(copy.density(), star.density())
+
+
+def test_wrong_kind(star):
+    with pytest.raises(ValueError):
+        CompositeStar.from_bytes(star.to_bytes())
+    with pytest.raises(ValueError):
+        StarEnsemble.from_bytes(star.to_bytes())
+
+
+def test_bad_magic(star):
+    with pytest.raises(ValueError):
+        storage.unpack(b'XXXX' + star.to_bytes()[4:])
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from polysolver import solve, Star, derivatives, runge_kutta
+from polysolver.polysolver import analytic_yz, get_status, UNBOUNDED_XI
+
+
+@pytest.mark.parametrize('n,status', [(1.5, 'surface'), (5., 'unbounded'), (6., 'unbounded')])
+def test_status(impl, n, status):
+    x, y, z = solve(1e-6, n, 1e-2, 10**5, impl, analytic=False)
+    star = Star(x, y, z, n)
+    assert star.status == status
+    assert star.unbounded == (status == 'unbounded')
+    if star.unbounded:
+        # The integration ends just past UNBOUNDED_XI instead of running on.
+        assert UNBOUNDED_XI <= x[-1] < UNBOUNDED_XI + 1e-2
+
+
+def test_stopped():
+    assert get_status(np.array([1., 0.5]), 1.5) == 'stopped'
+    assert get_status(np.array([1., 0.5]), 5.) == 'unbounded'
+
+
+def test_surface_values_unbounded(impl):
+    star = Star(*solve(1e-6, 6., 1e-2, 10**5, impl), 6.)
+    assert star.xi1 == np.inf
+    assert star.theta_prime == 0
+    assert star.rho_c_over_rho == np.inf
+
+
+def test_envelope_n5(impl):
+    star = Star(*solve(1e-6, 5., 1e-2, 10**5, impl, analytic=False), 5.)
+    x = np.linspace(UNBOUNDED_XI, 100, 50)
+    envelope = star.envelope(x)
+    np.testing.assert_allclose(envelope.y, analytic_yz(x, 5)[0])
+
+
+def test_envelope_n6(impl):
+    x, y, z = solve(1e-6, 6., 1e-2, 10**5, impl)
+    star = Star(x, y, z, 6.)
+    # Start one step before the last point, so UNBOUNDED_XI is included.
+    envelope = star.envelope(np.linspace(UNBOUNDED_XI, 50, 31))
+    assert np.all(np.isfinite(envelope.y))
+    assert envelope.y[0] == pytest.approx(np.interp(UNBOUNDED_XI, x, y), rel=1e-6)
+    # Continuing with fixed steps in xi gives the same envelope.
+    yprime, zprime = derivatives.get_yprime(), derivatives.get_zprime(6.)
+    state = (x[-1], y[-1], z[-1])
+    for _ in range(int(round((50 - x[-1])/1e-3))):
+        state = runge_kutta.get_next_xyz(yprime, zprime, *state, 1e-3)
+    assert state[0] == pytest.approx(50)
+    assert envelope.y[-1] == pytest.approx(state[1], rel=1e-6)
+
+
+def test_envelope_rejects_early_x(impl):
+    star = Star(*solve(1e-6, 6., 1e-2, 10**5, impl), 6.)
+    with pytest.raises(ValueError):
+        star.envelope(np.array([10., 30.]))
+
+
+def test_envelope_bounded():
+    star = Star(*solve(1e-6, 1.5, 1e-2, 10**5, 'python'), 1.5)
+    with pytest.raises(ValueError):
+        star.envelope(np.array([10.]))